@@ -0,0 +1,13 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Benchmark suite.
+
+Synthetic applications of 10 to 10,000 commands are generated to measure cold and warm startup, parser population,
+parse latency, help rendering time and peak memory. Results are compared to benchmarks/baseline.json and the run
+fails when a measure regresses by more than the tolerance:
+
+    $ python -m benchmarks
+    $ python -m benchmarks --sizes 10 100 --update-baseline
+"""
@@ -0,0 +1,185 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import typing
+
+from benchmarks import apps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# Measures in seconds, but peak_memory in bytes
+MEASURES = ["cold_startup", "warm_startup", "populate", "parse", "help", "peak_memory"]
+
+
+def measure_startup(size: int, repeat: int, directory: str) -> typing.Dict[str, float]:
+    """Wall time of new processes dispatching the deepest command, without then with a populated parser cache."""
+    source, args = apps.generate(size)
+    path = os.path.join(directory, f"bench_{size}.py")
+    with open(path, "w") as file:
+        file.write(source)
+        file.write('\nif __name__ == "__main__":\n    app()\n')
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("BENCH_LAZY", None)
+    env.pop("BENCH_PARSER_CACHE", None)
+    warm_env = dict(env, BENCH_LAZY="1", BENCH_PARSER_CACHE=os.path.join(directory, f"cache_{size}"))
+
+    results = {}
+    for name, environment in (("cold_startup", env), ("warm_startup", warm_env)):
+        # First run compiles the application module and fills the parser cache
+        _run(path, args, environment)
+        results[name] = statistics.median(_run(path, args, environment) for _ in range(repeat))
+    return results
+
+
+def _run(path: str, args: typing.List[str], env: typing.Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, path, *args], env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure_in_process(size: int, repeat: int) -> typing.Dict[str, float]:
+    """Parser population, parse and help rendering times, and peak memory of defining and populating."""
+    source, args = apps.generate(size)
+    code = compile(source, f"<bench_{size}>", "exec")
+
+    populate, help = [], []
+    for _ in range(repeat):
+        app = _define(code)
+        start = time.perf_counter()
+        parser = app._new_parser()
+        app._populate(parser)
+        populate.append(time.perf_counter() - start)
+
+        # Help is rendered once per parser, fresh parsers are needed for every measure
+        start = time.perf_counter()
+        parser.format_help()
+        _subparser(parser, args).format_help()
+        help.append(time.perf_counter() - start)
+
+    number = 100
+    parse = min(timeit.repeat(lambda: parser.parse_args(args), number=number, repeat=repeat)) / number
+
+    tracemalloc.start()
+    try:
+        app = _define(code)
+        app._populate(app._new_parser())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "populate": statistics.median(populate),
+        "parse": parse,
+        "help": statistics.median(help),
+        "peak_memory": peak,
+    }
+
+
+def _define(code) -> typing.Any:
+    namespace = {"__name__": "bench"}
+    exec(code, namespace)
+    return namespace["app"]
+
+
+def _subparser(parser: argparse.ArgumentParser, args: typing.List[str]) -> argparse.ArgumentParser:
+    # Parser of the command selected by args
+    for arg in args:
+        actions = [a for a in parser._actions if isinstance(a, argparse._SubParsersAction)]
+        if len(actions) == 0 or arg not in actions[0].choices:
+            break
+        parser = actions[0].choices[arg]
+    return parser
+
+
+def compare(
+    results: typing.Dict[str, typing.Dict[str, float]],
+    baseline: typing.Dict[str, typing.Dict[str, float]],
+    tolerance: float,
+) -> typing.List[str]:
+    """Describe measures exceeding their baseline value by more than tolerance (a ratio)."""
+    regressions = []
+    for size, measures in results.items():
+        for name, value in measures.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference and value > reference * (1 + tolerance):
+                regressions.append(f"{name} of {size} commands: {_format(name, value)} > {_format(name, reference)}")
+    return regressions
+
+
+def _format(name: str, value: float) -> str:
+    if name == "peak_memory":
+        return f"{value / 1024 ** 2:.2f} MiB"
+    return f"{value * 1e3:.3f} ms"
+
+
+def _print_table(
+    results: typing.Dict[str, typing.Dict[str, float]], baseline: typing.Dict[str, typing.Dict[str, float]]
+):
+    print(f"{'commands':>8}  {'measure':<12}  {'value':>14}  {'baseline':>14}  {'ratio':>6}")
+    for size, measures in results.items():
+        for name in MEASURES:
+            if name not in measures:
+                continue
+            value, reference = measures[name], baseline.get(size, {}).get(name)
+            ratio = f"{value / reference:.2f}" if reference else "-"
+            reference = _format(name, reference) if reference else "-"
+            print(f"{size:>8}  {name:<12}  {_format(name, value):>14}  {reference:>14}  {ratio:>6}")
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run termkit benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="number of commands")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measure (default: %(default)s)")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline results file (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown ratio (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true", help="store results as baseline")
+    parser.add_argument("--no-startup", action="store_true", help="skip startup measures running new processes")
+    parser.add_argument("--output", help="write results to this JSON file")
+    options = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in options.sizes:
+            measures = measure_in_process(size, options.repeat)
+            if not options.no_startup:
+                measures.update(measure_startup(size, options.repeat, directory))
+            results[str(size)] = measures
+
+    _print_table(results, baseline)
+    data = {"python": platform.python_version(), "platform": platform.platform(), "results": results}
+    if options.output is not None:
+        with open(options.output, "w") as file:
+            json.dump(data, file, indent=2)
+    if options.update_baseline:
+        with open(options.baseline, "w") as file:
+            json.dump({**data, "results": {**baseline, **results}}, file, indent=2)
+        return 0
+
+    regressions = compare(results, baseline, options.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Synthetic applications.
+
+Applications of a given number of commands are generated as Python sources, commands are spread over nested
+sub-applications of at most FANOUT children, mixing implicit and annotated arguments of several types, argument
+groups, mutually exclusive groups and callbacks.
+"""
+
+import typing
+
+FANOUT = 10
+
+_HEADER = """\
+import datetime
+import enum
+import os
+import pathlib
+from typing import Annotated, List
+
+from termkit import ArgumentGroup, CounterFlag, Flag, MutuallyExclusiveGroup, Option, Positional, Termkit
+
+
+class Level(enum.Enum):
+    LOW = "low"
+    HIGH = "high"
+
+
+output = ArgumentGroup("output", "Output settings")
+formats = MutuallyExclusiveGroup(parent=output)
+
+app = Termkit(
+    "bench",
+    "Synthetic benchmark application",
+    lazy=os.environ.get("BENCH_LAZY") == "1",
+    parser_cache=os.environ.get("BENCH_PARSER_CACHE") or False,
+)
+"""
+
+_COMMANDS = [
+    '''\
+def {name}(target, count: int = 1, ratio: float = 0.5):
+    """
+    Implicit arguments command.
+
+    Args:
+        target: Target name
+        count: Number of runs
+        ratio: Sampling ratio
+    """
+''',
+    '''\
+def {name}(
+    name: Annotated[str, Positional(metavar="NAME")],
+    limit: Annotated[int, Option("-l", "--limit", group=output)] = 10,
+    json: Annotated[bool, Flag("--json", group=formats)] = False,
+    yaml: Annotated[bool, Flag("--yaml", group=formats)] = False,
+):
+    """
+    Grouped arguments command.
+
+    Args:
+        name: Resource name
+        limit: Maximum number of items
+        json: Print JSON
+        yaml: Print YAML
+    """
+''',
+    '''\
+def {name}(
+    paths: Annotated[List[pathlib.Path], Positional(type=pathlib.Path, nargs="+")],
+    level: Annotated[Level, Option("--level", type=Level, choices=list(Level))] = Level.LOW,
+    verbose: Annotated[int, CounterFlag("-v", "--verbose")] = 0,
+):
+    """
+    Typed arguments command.
+
+    Args:
+        paths: Files to process
+        level: Processing level
+        verbose: Verbosity level
+    """
+''',
+    '''\
+def {name}(
+    day: Annotated[datetime.date, Option("--day", type=datetime.date, required=True)],
+    tags: Annotated[List[str], Option("-t", "--tag", nargs="*")] = None,
+    dry_run: Annotated[bool, Flag("-n", "--dry-run")] = False,
+):
+    """
+    Options only command.
+
+    Args:
+        day: Day of the report
+        tags: Report tags
+        dry_run: Only print actions
+    """
+''',
+]
+
+# Arguments selecting each kind of command
+_COMMAND_ARGS = [
+    ["target", "--count", "3"],
+    ["resource", "--limit", "5", "--json"],
+    ["a.txt", "b.txt", "--level", "high", "-vv"],
+    ["--day", "2023-10-01", "-t", "x", "y", "--dry-run"],
+]
+
+_CALLBACK = '''\
+@{app}.callback()
+def setup_{index}(quiet_{index}: Annotated[bool, Flag("--quiet-{index}")] = False):
+    """
+    Setup sub-application.
+
+    Args:
+        quiet_{index}: Hide progress
+    """
+'''
+
+
+class _Source:
+    def __init__(self):
+        self.lines = [_HEADER]
+        self.commands = 0
+        self.applications = 0
+        self.last_command: typing.List[str] = []
+
+
+def generate(size: int) -> typing.Tuple[str, typing.List[str]]:
+    """
+    Source of an application of size commands, exposed as its app attribute, and arguments dispatching its last
+    (deepest) command.
+    """
+    source = _Source()
+    _generate_application(source, "app", size, [])
+    return "\n".join(source.lines), source.last_command
+
+
+def _generate_application(source: _Source, app: str, size: int, path: typing.List[str]):
+    if len(path) % 2 == 1:
+        source.lines.append(_CALLBACK.format(app=app, index=source.applications))
+
+    if size <= FANOUT:
+        for _ in range(size):
+            index = source.commands
+            source.commands += 1
+            source.lines.append(f'@{app}.command("cmd-{index}")')
+            source.lines.append(_COMMANDS[index % len(_COMMANDS)].format(name=f"command_{index}"))
+            source.last_command = [*path, f"cmd-{index}", *_COMMAND_ARGS[index % len(_COMMANDS)]]
+        return
+
+    # Children are as balanced as possible, the tree gets one level deeper per order of magnitude
+    child_size = -(-size // FANOUT)
+    for start in range(0, size, child_size):
+        index = source.applications
+        source.applications += 1
+        child = f"app_{index}"
+        source.lines.append(f'{child} = Termkit("group-{index}", "Commands group {index}")')
+        _generate_application(source, child, min(child_size, size - start), [*path, f"group-{index}"])
+        source.lines.append(f"{app}.add({child})\n")
@@ -2,12 +2,40 @@
 Copyright 2023, Thomas Mahé <contact@tmahe.dev>
 SPDX-License-Identifier: MIT
 
-The following imports are designed to provide convenient access to frequently used modules and functionality.
-These imports help streamline the code and improve readability by reducing the need to prefix module names.
+The following names are designed to provide convenient access to frequently used modules and functionality.
+These names help streamline the code and improve readability by reducing the need to prefix module names.
+
+Names are resolved on first access so importing termkit does not pull in argparse, inspect or getpass machinery
+until they are actually needed.
 """
 
-from termkit.arguments import Positional  # noqa: F401
-from termkit.arguments import Nargs, CounterFlag, Flag, Option  # noqa: F401
-from termkit.core import Termkit  # noqa: F401
-from termkit.groups import ArgumentGroup, MutuallyExclusiveGroup  # noqa: F401
-from termkit.prompt import Prompt  # noqa: F401
+import importlib
+
+_EXPORTS = {
+    "Positional": "termkit.arguments",
+    "Nargs": "termkit.arguments",
+    "CounterFlag": "termkit.arguments",
+    "Flag": "termkit.arguments",
+    "Option": "termkit.arguments",
+    "Termkit": "termkit.core",
+    "ArgumentGroup": "termkit.groups",
+    "MutuallyExclusiveGroup": "termkit.groups",
+    "Prompt": "termkit.prompt",
+    "Output": "termkit.output",
+    "ResultCache": "termkit.cache",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
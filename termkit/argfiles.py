@@ -0,0 +1,87 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Response files.
+
+Arguments prefixed by "@" are replaced by the arguments stored in the referenced file. Files are memory-mapped and
+tokenized incrementally, either with shell-style quoting (whitespace separated, single and double quotes, backslash
+escapes) or split on a separator such as NUL, tokens are yielded as they are found.
+"""
+
+import mmap
+import os
+import re
+import typing
+
+_SPACE = re.compile(rb"\s*")
+_TOKEN = re.compile(rb"""(?:[^\s'"\\]+|'[^']*'|"(?:[^"\\]|\\.)*"|\\.)+""", re.DOTALL)
+_PART = re.compile(rb"""'([^']*)'|"((?:[^"\\]|\\.)*)"|\\(.)|([^'"\\]+)""", re.DOTALL)
+_DOUBLE_QUOTED_ESCAPE = re.compile(rb'\\([\\"$`\n])')
+
+
+def expand(
+    args: typing.Iterable[str], prefix_chars: str = "@", separator: typing.Optional[str] = None
+) -> typing.Iterator[str]:
+    """Yield args with response files references replaced by their arguments, recursively."""
+    for arg in args:
+        if len(arg) > 0 and arg[0] in prefix_chars:
+            yield from expand(tokenize(arg[1:], separator), prefix_chars, separator)
+        else:
+            yield arg
+
+
+def tokenize(path: str, separator: typing.Optional[str] = None) -> typing.Iterator[str]:
+    """Yield arguments of response file at path, shell-style quoted unless separated by separator."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if separator is None:
+                yield from _split_quoted(data, path)
+            else:
+                yield from _split(data, os.fsencode(separator))
+
+
+def _split(data: mmap.mmap, separator: bytes) -> typing.Iterator[str]:
+    position, size = 0, len(data)
+    while position < size:
+        end = data.find(separator, position)
+        if end < 0:
+            end = size
+        yield os.fsdecode(data[position:end])
+        position = end + len(separator)
+
+
+def _split_quoted(data: mmap.mmap, path: str) -> typing.Iterator[str]:
+    position, size = 0, len(data)
+    while True:
+        position = _SPACE.match(data, position).end()
+        if position >= size:
+            return
+        match = _TOKEN.match(data, position)
+        end = position if match is None else match.end()
+        if end >= size or data[end : end + 1].isspace():
+            yield os.fsdecode(_unquote(match.group()))
+            position = end
+        else:
+            raise ValueError(f"{path}: no closing quotation or escaped character")
+
+
+def _unquote(token: bytes) -> bytes:
+    if not any(char in token for char in b"'\"\\"):
+        return token
+
+    parts = []
+    for match in _PART.finditer(token):
+        single_quoted, double_quoted, escaped, plain = match.groups()
+        if single_quoted is not None:
+            parts.append(single_quoted)
+        elif double_quoted is not None:
+            parts.append(_DOUBLE_QUOTED_ESCAPE.sub(lambda m: b"" if m.group(1) == b"\n" else m.group(1), double_quoted))
+        elif escaped is not None:
+            # Backslash newline is a line continuation
+            parts.append(b"" if escaped == b"\n" else escaped)
+        else:
+            parts.append(plain)
+    return b"".join(parts)
@@ -3,14 +3,18 @@ Copyright 2023, Thomas Mahé <contact@tmahe.dev>
 SPDX-License-Identifier: MIT
 """
 
-import argparse
+from __future__ import annotations
+
 import enum
 import typing
 from abc import abstractmethod
-from typing import Optional, Any
+from typing import Any, Optional
 
 from termkit.groups import _TermkitGroup, get_parser_from_group
 
+if typing.TYPE_CHECKING:
+    import argparse
+
 
 class Nargs(enum.Enum):
     ONE_OR_DEFAULT = "?"
@@ -30,31 +34,73 @@ class _TermkitArgument:
 
     @property
     def argparse_params(self):
+        from termkit.conversions import get_converter
+
         out = self.__dict__.copy()
         for item in self._ignored_params:
             if item in out.keys():
                 del out[item]
+        if "type" in out:
+            out["type"] = get_converter(out["type"])
         return out
 
+    def _lazy_params(self) -> dict:
+        from termkit.conversions import LazyAction
+
+        params = self.argparse_params
+        params.update(action=LazyAction, item_type=params.pop("type"), item_choices=params.pop("choices"))
+        return params
+
 
 class Positional(_TermkitArgument):
+    _ignored_params = ["flags", "group", "stream", "delimiter", "lazy"]
+
     def __init__(
         self,
         type: Optional[type] = str,
         metavar: Optional[str] = None,
         nargs: Optional[typing.Union[int, str]] = None,
         choices: Optional[typing.Container] = None,
+        stream: bool = False,
+        delimiter: str = "\n",
+        lazy: bool = False,
     ):
+        if stream and nargs not in (Nargs.ZERO_OR_MANY, Nargs.ONE_OR_MANY):
+            raise ValueError("Streamed positional expects '*' or '+' nargs.")
+        if stream and lazy:
+            raise ValueError("Streamed positional is already converted lazily.")
         self.type = type
         self.metavar = metavar
         self.nargs = nargs
         self.choices = choices
+        self.stream = stream
+        self.delimiter = delimiter
+        self.lazy = lazy
 
     def _populate(self, parser: argparse.ArgumentParser, dest: str, help: str, default: Any = None):
-        parser.add_argument(dest, **self.argparse_params, help=help)
+        if self.stream:
+            from termkit.inputs import StreamAction
+
+            params = self.argparse_params
+            item_type, item_choices = params.pop("type"), params.pop("choices")
+            parser.add_argument(
+                dest,
+                **params,
+                action=StreamAction,
+                item_type=item_type,
+                item_choices=item_choices,
+                delimiter=self.delimiter,
+                help=help,
+            )
+        elif self.lazy:
+            parser.add_argument(dest, **self._lazy_params(), help=help)
+        else:
+            parser.add_argument(dest, **self.argparse_params, help=help)
 
 
 class Option(_TermkitArgument):
+    _ignored_params = ["flags", "group", "lazy"]
+
     def __init__(
         self,
         *flags: str,
@@ -64,6 +110,7 @@ class Option(_TermkitArgument):
         group: Optional[_TermkitGroup] = None,
         nargs: Optional[typing.Union[int, str]] = None,
         choices: Optional[typing.Container] = None,
+        lazy: bool = False,
     ):
         self.flags = flags
         self.type = type
@@ -72,10 +119,12 @@ class Option(_TermkitArgument):
         self.required = required
         self.group = group
         self.choices = choices
+        self.lazy = lazy
 
     def _populate(self, parser: argparse.ArgumentParser, dest: str, help: str, default: Any = None):
         parser = get_parser_from_group(parser, self.group)
-        parser.add_argument(*sorted(self.flags, key=len), **self.argparse_params, dest=dest, help=help, default=default)
+        params = self._lazy_params() if self.lazy else self.argparse_params
+        parser.add_argument(*sorted(self.flags, key=len), **params, dest=dest, help=help, default=default)
 
 
 class Flag(_TermkitArgument):
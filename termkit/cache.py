@@ -0,0 +1,344 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Command results cache.
+
+Commands added with cache=True (or a ResultCache) memoize their return value and standard output, keyed on the
+command path, its normalized arguments and its version: the modification time and size of the file defining the
+command, along with the version given to ResultCache. Changes of code defined in other files are not detected, give
+a version (such as the application version) or a ttl when results depend on them. Entries are stored in a SQLite
+database shared by every process of the user, expire after ttl seconds and are evicted least recently used first once
+entries of a command exceed max_size bytes. Commands whose arguments cannot be keyed reproducibly (objects without a
+value based repr) are not cached. Caching is bypassed with --termkit-no-cache or the TERMKIT_NO_CACHE environment
+variable. Database connections are closed at the end of each invocation.
+"""
+
+import contextlib
+import contextvars
+import io
+import os
+import sys
+import threading
+import time
+import typing
+
+_bypass = contextvars.ContextVar("termkit_cache_bypass", default=False)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    command TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_lru ON results (command, accessed);
+CREATE TABLE IF NOT EXISTS stats (
+    command TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class CacheStats(typing.NamedTuple):
+    entries: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class ResultCache:
+    def __init__(
+        self,
+        ttl: typing.Optional[float] = None,
+        max_size: int = 64 * 1024 * 1024,
+        path: typing.Optional[str] = None,
+        version: typing.Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version = version
+        self._path = path
+        # Connection of the current process, opened on first use and shared by its threads until the invocation ends
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        if self._path is not None:
+            return self._path
+        from termkit.spec import cache_directory
+
+        return os.path.join(cache_directory(), "results.sqlite")
+
+    def _connect(self) -> typing.Any:
+        # Connections are never used across fork, forked processes open their own
+        if self._connection is None or self._pid != os.getpid():
+            import sqlite3
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    @contextlib.contextmanager
+    def _transaction(self) -> typing.Iterator[typing.Any]:
+        with self._lock:
+            connection = self._connect()
+            # Write lock is taken upfront so concurrent processes never fail upgrading a read lock
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def lookup(self, command: str, key: str) -> typing.Optional[typing.Tuple[typing.Any, str]]:
+        """Stored result and output of command for key, None when missing or expired."""
+        import pickle
+
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute("SELECT created, value FROM results WHERE key = ?", (key,)).fetchone()
+            entry = None
+            if row is not None and (self.ttl is None or row[0] + self.ttl > now):
+                try:
+                    entry = pickle.loads(row[1])
+                except Exception:
+                    # Stale entry, e.g. its result class does not exist anymore
+                    entry = None
+            if entry is None:
+                if row is not None:
+                    connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._count(connection, command, "misses")
+            else:
+                connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                self._count(connection, command, "hits")
+        return entry
+
+    def store(self, command: str, key: str, result: typing.Any, output: str):
+        """Store result and output of command for key, then evict expired and least recently used entries."""
+        import pickle
+
+        try:
+            value = pickle.dumps((result, output))
+        except Exception:
+            # Results that cannot be pickled are not cached
+            return
+
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", (key, command, now, now, len(value), value)
+            )
+            evicted = 0
+            if self.ttl is not None:
+                evicted += connection.execute(
+                    "DELETE FROM results WHERE command = ? AND created + ? <= ?", (command, self.ttl, now)
+                ).rowcount
+            # Least recently used entries beyond max_size bytes
+            evicted += connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM "
+                "(SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS total FROM results WHERE command = ?) "
+                "WHERE total > ?)",
+                (command, self.max_size),
+            ).rowcount
+            if evicted > 0:
+                self._count(connection, command, "evictions", evicted)
+
+    def stats(self, command: str) -> CacheStats:
+        with self._transaction() as connection:
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results WHERE command = ?", (command,)
+            ).fetchone()
+            counters = connection.execute(
+                "SELECT hits, misses, evictions FROM stats WHERE command = ?", (command,)
+            ).fetchone()
+        return CacheStats(entries, size, *(counters or (0, 0, 0)))
+
+    @staticmethod
+    def _count(connection: typing.Any, command: str, counter: str, count: int = 1):
+        connection.execute(
+            f"INSERT INTO stats (command, {counter}) VALUES (?, ?) "
+            f"ON CONFLICT (command) DO UPDATE SET {counter} = {counter} + excluded.{counter}",
+            (command, count),
+        )
+
+    def wrap(self, command: str, plan: typing.Any) -> "CachedPlan":
+        return CachedPlan(self, command, plan)
+
+
+class CachedPlan:
+    """Command plan dispatching through a result cache, same interface as the wrapped plan."""
+
+    def __init__(self, cache: ResultCache, command: str, plan: typing.Any):
+        self.cache = cache
+        self.command = command
+        self.plan = plan
+        self.callback = plan.callback
+        self.parameters = plan.parameters
+        self.is_coroutine = plan.is_coroutine
+        self.version = f"{cache.version or ''}:{callback_version(plan.callback)}"
+
+    def __call__(self, arguments: typing.Any, injector: typing.Any = None):
+        kwargs = self.plan.bind(arguments, injector)
+        if _bypass.get() or os.environ.get("TERMKIT_NO_CACHE"):
+            return self.plan.callback(**kwargs)
+
+        # Pending output of callbacks is not part of the command output
+        outputs = [kwargs[name] for name, _ in self.plan.injections]
+        for output in outputs:
+            output.flush()
+
+        # Injected resources are not part of the key
+        values = {name: kwargs[name] for name in self.plan.parameters if name in arguments.__dict__}
+        try:
+            key = cache_key(self.command, values, self.version)
+        except TypeError:
+            # Arguments without reproducible key
+            return self.plan.callback(**kwargs)
+        try:
+            entry = self.cache.lookup(self.command, key)
+        except Exception:
+            # Unusable store (read-only file system, corrupted database...), the command is run uncached
+            return self.plan.callback(**kwargs)
+        if entry is not None:
+            result, output = entry
+            sys.stdout.write(output)
+            if self.is_coroutine:
+                return _resolved(result)
+            return result
+
+        if self.is_coroutine:
+            return self._call_async(kwargs, outputs, key)
+        with _recording(outputs) as buffer:
+            result = self.plan.callback(**kwargs)
+        self._store(key, result, buffer.getvalue())
+        return result
+
+    async def _call_async(self, kwargs: typing.Dict[str, typing.Any], outputs: typing.List[typing.Any], key: str):
+        with _recording(outputs) as buffer:
+            result = await self.plan.callback(**kwargs)
+        self._store(key, result, buffer.getvalue())
+        return result
+
+    def _store(self, key: str, result: typing.Any, output: str):
+        try:
+            self.cache.store(self.command, key, result, output)
+        except Exception:
+            pass
+
+
+class _Tee:
+    def __init__(self, stream: typing.TextIO, buffer: io.StringIO):
+        self._stream = stream
+        self._buffer = buffer
+
+    def write(self, data: str) -> int:
+        self._buffer.write(data)
+        return self._stream.write(data)
+
+    def writelines(self, lines: typing.Iterable[str]):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+@contextlib.contextmanager
+def _recording(outputs: typing.List[typing.Any]) -> typing.Iterator[io.StringIO]:
+    # Standard output of the current context is still written through while being recorded
+    from termkit import streams
+
+    streams.install()
+    buffer = io.StringIO()
+    with streams.capture(_Tee(sys.stdout.target, buffer), sys.stderr.target):
+        yield buffer
+        for output in outputs:
+            output.flush()
+
+
+async def _resolved(value: typing.Any) -> typing.Any:
+    return value
+
+
+def cache_key(command: str, values: typing.Dict[str, typing.Any], version: str = "") -> str:
+    """
+    Digest of command version and its arguments, equal arguments give equal keys whatever their order and process.
+    Arguments without value based representation raise TypeError.
+    """
+    import hashlib
+
+    normalized = _dumps(values)
+    return hashlib.sha256(f"{command}\0{version}\0{normalized}".encode()).hexdigest()
+
+
+def callback_version(callback: typing.Callable) -> str:
+    """Version of callback code, changed whenever the file defining it changes."""
+    while hasattr(callback, "__wrapped__"):
+        callback = callback.__wrapped__
+    code = getattr(callback, "__code__", None)
+    if code is None:
+        return ""
+    try:
+        stat = os.stat(code.co_filename)
+    except OSError:
+        return code.co_filename
+    return f"{code.co_filename}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _normalize(value: typing.Any) -> typing.Any:
+    import datetime
+    import enum
+    import pathlib
+
+    from termkit.conversions import LazyValue
+
+    if isinstance(value, LazyValue):
+        # Keyed on the given string, conversion is left to the command
+        return ["LazyValue", value._string] if value._string is not None else value()
+    if isinstance(value, (set, frozenset)):
+        return sorted(_dumps(item) for item in value)
+    name = type(value).__qualname__
+    if isinstance(value, enum.Enum):
+        return f"{name}.{value.name}"
+    if isinstance(value, (pathlib.PurePath, datetime.date, datetime.time, datetime.timedelta, bytes)):
+        return f"{name}:{value!r}"
+    if type(value).__repr__ is object.__repr__ or " at 0x" in repr(value):
+        raise TypeError(f"Cannot key argument of type '{name}'.")
+    return f"{name}:{value!r}"
+
+
+def _dumps(value: typing.Any) -> str:
+    import json
+
+    return json.dumps(value, sort_keys=True, default=_normalize)
+
+
+@contextlib.contextmanager
+def bypass() -> typing.Iterator[None]:
+    """Run commands of the current context without reading nor writing their cached results."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
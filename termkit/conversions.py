@@ -0,0 +1,169 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Argument conversions.
+
+Converters registered for common immutable types (pathlib.Path, datetime, enum.Enum, ...) memoize their results so
+repeated values are converted once, memoized results being shared by every invocation and thread. Enum members are
+converted from their value, like argparse does. Lazy arguments are given to commands as LazyValue thunks, converting
+their value on first call and reporting conversion errors like argparse does.
+"""
+
+import argparse
+import datetime
+import enum
+import functools
+import pathlib
+import threading
+import typing
+
+
+class _Missing:
+    def __reduce__(self):
+        # Pickled by reference so spec caches keep the sentinel identity
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+_CONVERTERS: typing.Dict[type, typing.Callable[[str], typing.Any]] = {
+    pathlib.Path: pathlib.Path,
+    pathlib.PurePath: pathlib.PurePath,
+    datetime.datetime: datetime.datetime.fromisoformat,
+    datetime.date: datetime.date.fromisoformat,
+    datetime.time: datetime.time.fromisoformat,
+}
+# Types of registered converters whose results are immutable, thus memoized
+_MEMOIZED: typing.Set[type] = set(_CONVERTERS)
+_converters: typing.Dict[type, "Converter"] = {}
+_converters_lock = threading.Lock()
+_parser = None
+
+
+class Converter:
+    """Memoized conversion to a registered type, named after it so argparse errors are unchanged."""
+
+    def __init__(
+        self, type: type, convert: typing.Callable[[str], typing.Any], maxsize: int = 1024, memoize: bool = True
+    ):
+        self.type = type
+        self.__name__ = type.__name__
+        self._convert = functools.lru_cache(maxsize)(convert) if memoize else convert
+
+    def __call__(self, string: str):
+        return self._convert(string)
+
+    def __reduce__(self):
+        return get_converter, (self.type,)
+
+
+def register_converter(type: type, convert: typing.Callable[[str], typing.Any], memoize: bool = False):
+    """
+    Convert arguments of type with convert. Results are memoized when memoize is set, which is only safe for immutable
+    results as the same object is then returned to every invocation.
+    """
+    with _converters_lock:
+        _CONVERTERS[type] = convert
+        if memoize:
+            _MEMOIZED.add(type)
+        else:
+            _MEMOIZED.discard(type)
+        _converters.pop(type, None)
+
+
+def get_converter(target: typing.Any) -> typing.Any:
+    """Memoized converter registered for target type, target itself when none is registered."""
+    if not isinstance(target, type):
+        return target
+    with _converters_lock:
+        converter = _converters.get(target)
+        if converter is None:
+            if target in _CONVERTERS:
+                converter = Converter(target, _CONVERTERS[target], memoize=target in _MEMOIZED)
+            elif issubclass(target, enum.Enum):
+                # Members are singletons
+                converter = Converter(target, target)
+            else:
+                return target
+            _converters[target] = converter
+        return converter
+
+
+class LazyValue:
+    """Argument value converted on first call, the converted value is memoized."""
+
+    __slots__ = ("_string", "_item", "_parser", "_value")
+
+    def __init__(
+        self,
+        string: typing.Optional[str] = None,
+        item: typing.Optional[argparse.Action] = None,
+        parser: typing.Optional[argparse.ArgumentParser] = None,
+        value: typing.Any = _MISSING,
+    ):
+        self._string = string
+        self._item = item
+        self._parser = parser
+        self._value = value
+
+    def __call__(self) -> typing.Any:
+        if self._value is _MISSING:
+            parser = self._parser if self._parser is not None else _default_parser()
+            try:
+                value = parser._get_value(self._item, self._string)
+                parser._check_value(self._item, value)
+            except argparse.ArgumentError as e:
+                if self._parser is None:
+                    raise
+                self._parser.error(str(e))
+            self._value = value
+        return self._value
+
+    def __repr__(self) -> str:
+        if self._value is _MISSING:
+            return f"LazyValue({self._string!r})"
+        return f"LazyValue({self._string!r}, value={self._value!r})"
+
+
+class LazyAction(argparse._StoreAction):
+    def __init__(
+        self,
+        option_strings: typing.List[str],
+        dest: str,
+        item_type: typing.Optional[typing.Callable] = None,
+        item_choices: typing.Optional[typing.Container] = None,
+        **kwargs,
+    ):
+        super().__init__(option_strings, dest, **kwargs)
+        # Values are converted and checked against this action on first call
+        self.item = argparse.Action(option_strings, dest, type=item_type, choices=item_choices, metavar=self.metavar)
+        if self.nargs in (argparse.ZERO_OR_MORE, argparse.ONE_OR_MORE) or isinstance(self.nargs, int):
+            # Lists hold a thunk per given value, defaults are kept as is
+            return
+        if isinstance(self.default, str):
+            self.default = LazyValue(self.default, self.item)
+        else:
+            self.default = LazyValue(value=self.default)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        if isinstance(values, list):
+            values = [self._wrap(parser, value) for value in values]
+        else:
+            values = self._wrap(parser, values)
+        super().__call__(parser, namespace, values, option_string)
+
+    def _wrap(self, parser: argparse.ArgumentParser, value: typing.Any) -> LazyValue:
+        if isinstance(value, LazyValue):
+            return value
+        if isinstance(value, str):
+            return LazyValue(value, self.item, parser)
+        return LazyValue(value=value)
+
+
+def _default_parser() -> argparse.ArgumentParser:
+    # Converts defaults, which are not bound to the parser they are given by
+    global _parser
+    if _parser is None:
+        _parser = argparse.ArgumentParser(add_help=False)
+    return _parser
@@ -7,29 +7,58 @@ SPDX-License-Identifier: MIT
 from __future__ import annotations
 
 import abc
-import argparse
-import inspect
 import os
 import sys
+import types
 import typing
 
-from termkit.parser import ArgumentHandler, TermkitParser
-from termkit.utils import filter_args, strip_doc
+from termkit.utils import (
+    __RESERVED_PREFIXES__,
+    exit_code,
+    get_completion_args,
+    import_reference,
+    parse_termkit_options,
+    peek_command,
+    run_coroutine,
+)
 
-try:
-    import argcomplete
+if typing.TYPE_CHECKING:
+    import argparse
 
-    __ARGCOMPLETE__ = True
-except ImportError:
-    __ARGCOMPLETE__ = False
+    from termkit.cache import ResultCache
+    from termkit.docstrings import Docstring
+    from termkit.parser import TermkitParser
+    from termkit.resources import Injector, ResourceRegistry
+
+
+def _import_argcomplete():
+    """Import argcomplete only when a completion is requested, None if it is not installed."""
+    if "_ARGCOMPLETE" not in os.environ:
+        return None
+    try:
+        import argcomplete
+    except ImportError:
+        return None
+    return argcomplete
+
+
+def _phase(name: str, cprofile: bool = False) -> typing.ContextManager:
+    # Profiler is imported on first dispatch to keep import time low
+    from termkit.profiler import phase
+
+    return phase(name, cprofile)
 
 
 class _TermkitComponent:
     name: str
     help: str
+    # Single line help given at registration, first help line otherwise
+    _summary: typing.Optional[str] = None
 
     @property
     def single_line_help(self):
+        if self._summary is not None:
+            return self._summary
         return self.help.split("\n")[0]
 
     @abc.abstractmethod
@@ -37,21 +66,143 @@ class _TermkitComponent:
         ...
 
 
+class _CommandPlan:
+    """
+    Immutable dispatch record of a command, parameters are resolved once so binding a parsed namespace to keyword
+    arguments needs neither introspection nor scanning of the namespace keys.
+
+    Parameters missing from the namespace are given the resource matching their name or annotation, if any.
+    """
+
+    __slots__ = ("callback", "parameters", "annotations", "injections", "is_coroutine")
+
+    def __init__(self, callback: typing.Callable):
+        import inspect
+
+        from termkit.output import Output
+
+        parameters, annotations, injections = [], [], []
+        for name, parameter in inspect.signature(callback).parameters.items():
+            if any(prefix in name for prefix in __RESERVED_PREFIXES__):
+                continue
+            if parameter.annotation is Output or parameter.annotation == "Output":
+                injections.append((name, Output))
+            else:
+                parameters.append(name)
+                annotations.append((name, parameter.annotation))
+        object.__setattr__(self, "callback", callback)
+        object.__setattr__(self, "parameters", tuple(parameters))
+        object.__setattr__(self, "annotations", tuple(annotations))
+        object.__setattr__(self, "injections", tuple(injections))
+        object.__setattr__(self, "is_coroutine", inspect.iscoroutinefunction(callback))
+
+    def __setattr__(self, name: str, value: typing.Any):
+        raise AttributeError(f"Cannot set '{name}', command plan is immutable.")
+
+    def bind(
+        self, arguments: argparse.Namespace, injector: typing.Optional[Injector] = None
+    ) -> typing.Dict[str, typing.Any]:
+        """Keyword arguments of the callback, injected objects are created once per invocation by injector."""
+        values = arguments.__dict__
+        kwargs = {name: values[name] for name in self.parameters if name in values}
+        if len(self.injections) > 0 or (injector is not None and len(kwargs) < len(self.parameters)):
+            if injector is None:
+                from termkit.resources import Injector
+
+                injector = Injector()
+            for name, factory in self.injections:
+                kwargs[name] = injector.get(factory)
+            if len(kwargs) < len(self.parameters) + len(self.injections):
+                kwargs.update(injector.resolve((n, a) for n, a in self.annotations if n not in kwargs))
+        return kwargs
+
+    def __call__(self, arguments: argparse.Namespace, injector: typing.Optional[Injector] = None) -> typing.Any:
+        return self.callback(**self.bind(arguments, injector))
+
+
 class _Command(_TermkitComponent):
-    def __init__(self, callback: typing.Callable, name: str = None):
-        self.callback = callback
-        if name is None:
-            name = callback.__name__
+    def __init__(
+        self,
+        callback: typing.Union[typing.Callable, str],
+        name: str = None,
+        help: str = None,
+        cache: typing.Optional[ResultCache] = None,
+        map: typing.Optional[str] = None,
+    ):
+        self._callback = None
+        self._reference = None
+        self._docstring = None
+        self._plan = None
+        self._summary = help
+        self.cache = cache
+        self.map = map
+        self.depends_on = None
+
+        if isinstance(callback, str):
+            module_name, _, attribute = callback.partition(":")
+            if len(module_name) == 0 or len(attribute) == 0:
+                raise ValueError(f"Invalid command reference '{callback}', 'module:function' is expected.")
+            self._reference = callback
+            if name is None:
+                name = attribute.split(".")[-1]
+        else:
+            self._callback = callback
+            if name is None:
+                name = callback.__name__
         self.name = name
+        if map is not None and self._callback is not None:
+            # Referenced commands are checked once imported
+            self._check_map(self._callback)
 
-        self.help = inspect.getdoc(callback)
-        if self.help is None:
-            self.help = ""
+    @property
+    def source(self) -> typing.Tuple[str, str]:
+        """Module and qualified name of the callback, resolved without importing it."""
+        if self._reference is not None:
+            module_name, _, attribute = self._reference.partition(":")
+            return module_name, attribute
+        return self._callback.__module__, self._callback.__qualname__
 
-        self.help = strip_doc(self.help)
+    @property
+    def callback(self) -> typing.Callable:
+        if self._callback is None:
+            callback = import_reference(self._reference)
+            if not callable(callback):
+                raise TypeError(f"Command reference '{self._reference}' does not point to a callable.")
+            if self.map is not None:
+                self._check_map(callback)
+            self._callback = callback
+        return self._callback
 
-    def _populate(self, parser: argparse.ArgumentParser):
-        argument_handler = ArgumentHandler(parser, self.callback)
+    def _check_map(self, callback: typing.Callable):
+        from termkit.fanout import check
+
+        check(callback, self.map)
+
+    @property
+    def docstring(self) -> Docstring:
+        """Docstring of the callback parsed once, shared by help rendering and arguments population."""
+        if self._docstring is None:
+            import inspect
+
+            from termkit.docstrings import parse_docstring
+
+            self._docstring = parse_docstring(inspect.getdoc(self.callback))
+        return self._docstring
+
+    @property
+    def help(self) -> str:
+        return self.docstring.description
+
+    @property
+    def plan(self) -> _CommandPlan:
+        if self._plan is None:
+            self._plan = _CommandPlan(self.callback)
+        return self._plan
+
+    def _populate(self, parser: argparse.ArgumentParser, resources: typing.Optional[ResourceRegistry] = None):
+        from termkit.parser import ArgumentHandler
+
+        argument_handler = ArgumentHandler(parser, self.callback, self.docstring, resources)
         for param_name in argument_handler.parameters.keys():
             argument_handler.parse(param_name)
 
@@ -63,15 +214,33 @@ class Termkit(_TermkitComponent):
         description: typing.Optional[str] = None,
         callbacks: typing.Optional[typing.List[typing.Callable]] = None,
         childs: typing.Optional[typing.Dict] = None,
+        lazy: bool = False,
+        parser_cache: typing.Union[bool, str] = False,
+        loop_factory: typing.Optional[typing.Callable[[], typing.Any]] = None,
+        engine: str = "argparse",
+        response_files: bool = False,
+        response_file_separator: typing.Optional[str] = None,
     ):
+        from termkit.resources import ResourceRegistry
+
         self._childs = []
         self._callbacks = []
-        self._parser = TermkitParser(prog=name, description=description)
-        self._populated = False
+        self._resources = ResourceRegistry()
+        # Definition changes count, parsers built from a previous definition are never reused
+        self._revision = 0
+        self._built = None
+        self._checked = None
+        self._compiled = False
 
         self.name = name
         self.help = description if description is not None else ""
         self.ctx = dict()
+        self.lazy = lazy
+        self.parser_cache = parser_cache
+        self.loop_factory = loop_factory
+        self.engine = engine
+        self.response_files = response_files
+        self.response_file_separator = response_file_separator
 
         if callbacks is not None and isinstance(callbacks, typing.Iterable):
             for callback in callbacks:
@@ -85,12 +254,43 @@ class Termkit(_TermkitComponent):
     def _child_names(self):
         return [c.name for c in self._childs]
 
-    def add(self, app_or_command: typing.Union[Termkit, typing.Callable], name: typing.Optional[str] = None):
+    def add(
+        self,
+        app_or_command: typing.Union[Termkit, typing.Callable, str],
+        name: typing.Optional[str] = None,
+        help: typing.Optional[str] = None,
+        cache: typing.Union[bool, ResultCache] = False,
+        map: typing.Optional[str] = None,
+    ):
+        """
+        Add a sub-application or a command.
+
+        Commands can be given as "module:function" references, module is then imported only when the command is
+        dispatched or its own help is shown. Listing commands imports it too unless help is given, help is then used
+        as single line help in commands listing (of sub-applications as well). Cold builds of the parser cache
+        import every referenced module.
+        Commands with cache memoize their result and output (see termkit.cache), cache=True uses default settings.
+        Commands with map are called once per item of the map parameter (see termkit.fanout).
+        """
+        self._check_not_compiled()
         if isinstance(app_or_command, Termkit):
+            if cache or map is not None:
+                raise ValueError(f"Cannot cache nor map '{app_or_command.name}' sub-application, only commands.")
             child = app_or_command
+            if help is not None:
+                child._summary = help
             self.ctx.update({child.name: child.ctx})
-        elif inspect.isfunction(app_or_command):
-            child = _Command(app_or_command, name)
+            # Resources are shared by the whole application tree
+            self._resources.merge(child._resources)
+            for _, component in child._definition():
+                if isinstance(component, Termkit):
+                    component._resources = self._resources
+        elif isinstance(app_or_command, (types.FunctionType, str)):
+            if cache is True:
+                from termkit.cache import ResultCache
+
+                cache = ResultCache()
+            child = _Command(app_or_command, name, help, cache or None, map)
         else:
             raise TypeError(f"Cannot add object of type '{type(app_or_command)}' to Termkit application.")
 
@@ -101,66 +301,493 @@ class Termkit(_TermkitComponent):
             raise ValueError(f"Name '{child.name}' already taken in '{self.name}' application.")
 
         self._childs.append(child)
+        self._revision += 1
 
-    def command(self, name: str = None):
+    def command(
+        self, name: str = None, cache: typing.Union[bool, ResultCache] = False, map: typing.Optional[str] = None
+    ):
         def decorator(func: typing.Callable):
-            self.add(func, name)
+            self.add(func, name, cache=cache, map=map)
             return func
 
         return decorator
 
-    def add_callback(self, func: typing.Callable):
-        if inspect.isfunction(func):
-            self._callbacks.append(_Command(func, func.__name__ + "_CALLBACK"))
+    def add_callback(
+        self,
+        func: typing.Callable,
+        depends_on: typing.Optional[typing.Sequence[typing.Union[typing.Callable, str]]] = None,
+    ):
+        """
+        Add a callback run before commands of this application.
+
+        Callbacks run one after another unless they declare depends_on, the callbacks (functions or names, including
+        callbacks of parent applications) they need. Callbacks are then run concurrently as soon as those are done,
+        see termkit.scheduler.
+        """
+        self._check_not_compiled()
+        if isinstance(func, types.FunctionType):
+            callback = _Command(func, func.__name__ + "_CALLBACK")
+            if depends_on is not None:
+                invalid = [d for d in depends_on if not isinstance(d, (str, types.FunctionType))]
+                if len(invalid) > 0:
+                    raise TypeError(f"Cannot depend on '{invalid[0]}', callback function or name is required.")
+                callback.depends_on = tuple(depends_on)
+            self._callbacks.append(callback)
+            self._revision += 1
         else:
             raise ValueError(f"Cannot add '{func}' as callback, function is required.")
 
-    def callback(self):
+    def callback(self, depends_on: typing.Optional[typing.Sequence[typing.Union[typing.Callable, str]]] = None):
         def decorator(func: typing.Callable):
-            self.add_callback(func)
+            self.add_callback(func, depends_on)
             return func
 
         return decorator
 
-    def _populate(self, parser: argparse.ArgumentParser):
-        if not self._populated:
-            if len(self._callbacks) > 0:
-                parser.add_argument(
-                    "_TERMKIT_CALLBACKS", action="store_const", const=self._callbacks, help=argparse.SUPPRESS
+    def add_resource(
+        self,
+        factory: typing.Callable,
+        name: typing.Optional[str] = None,
+        type: typing.Optional[type] = None,
+        keep_warm: bool = False,
+    ):
+        """
+        Add a resource injected into callbacks and commands parameters matching its name or type.
+
+        Name defaults to the factory name and type to its return annotation. Resources are created on first use and
+        closed at the end of the invocation, or at exit when kept warm, see termkit.resources.
+        """
+        from termkit.resources import Resource
+
+        self._check_not_compiled()
+        self._resources.register(Resource(factory, name, type, keep_warm))
+        self._revision += 1
+
+    def resource(self, name: typing.Optional[str] = None, type: typing.Optional[type] = None, keep_warm: bool = False):
+        def decorator(func: typing.Callable):
+            self.add_resource(func, name, type, keep_warm)
+            return func
+
+        return decorator
+
+    def close_resources(self):
+        """Close resources kept warm, they are created again on next use."""
+        self._resources.close()
+
+    def compile(self) -> Termkit:
+        """
+        Freeze application and resolve dispatch plan of every callback and command ahead of time, so dispatch
+        involves no introspection. Compiled applications cannot be modified anymore.
+        """
+        for _, component in self._definition():
+            if isinstance(component, _Command):
+                # Resolved plan is kept by the command
+                component.plan
+            else:
+                component._compiled = True
+        return self
+
+    def _check_not_compiled(self):
+        if self._compiled:
+            raise RuntimeError(f"Cannot modify compiled '{self.name}' application.")
+
+    def _populate(
+        self,
+        parser: argparse.ArgumentParser,
+        args: typing.Optional[typing.List[str]] = None,
+        callbacks: typing.Sequence[_Command] = (),
+    ):
+        """
+        Populate parser with callbacks arguments and sub-commands.
+
+        When args is given, only sub-commands along the path selected by args are populated, siblings are
+        registered without their own arguments so help listing and invalid choice errors stay unchanged.
+        """
+        import argparse
+        import functools
+
+        callbacks = [*callbacks, *self._callbacks]
+        if len(callbacks) > 0:
+            parser.add_argument("_TERMKIT_CALLBACKS", action="store_const", const=callbacks, help=argparse.SUPPRESS)
+            for callback in callbacks:
+                callback._populate(parser, self._resources)
+
+        if len(self._childs) > 0:
+            selected, child_args = None, None
+            if args is not None:
+                index = peek_command(parser, args)
+                if index is None:
+                    # Sub-command cannot be located without parsing, fallback to full population
+                    args = None
+                elif index == -2:
+                    # Help only lists sub-commands, no parser is needed for them
+                    from termkit.engine import add_choice
+
+                    sub_parser = parser.add_subparsers(title="Commands", metavar="COMMAND")
+                    for child in self._childs:
+                        add_choice(sub_parser, child.name, child.single_line_help)
+                    return
+                elif index >= 0:
+                    selected = next((c for c in self._childs if c.name == args[index]), None)
+                    child_args = args[index + 1 :]
+
+            sub_parser = parser.add_subparsers(title="Commands", metavar="COMMAND")
+            for child in self._childs:
+                if selected is not None and child is not selected:
+                    continue
+                populate = args is None or child is selected
+                # Commands referenced by "module:function" are imported once dispatched or their help is shown
+                deferred = args is None and isinstance(child, _Command) and child._callback is None
+                command_parser = sub_parser.add_parser(
+                    name=child.name,
+                    help=child.single_line_help,
+                    description=child.help if populate and not deferred else None,
                 )
-                for callback in self._callbacks:
-                    callback._populate(parser)
-
-            if len(self._childs) > 0:
-                sub_parser = parser.add_subparsers(title="Commands", metavar="COMMAND")
-                for child in self._childs:
-                    command_parser = sub_parser.add_parser(
-                        name=child.name, help=child.single_line_help, description=child.help
+                if isinstance(child, _Command):
+                    command_parser.add_argument(
+                        "_TERMKIT_COMMAND",
+                        action="store_const",
+                        const=child,
+                        help=argparse.SUPPRESS,
                     )
-                    if isinstance(child, _Command):
-                        command_parser.add_argument(
-                            "_TERMKIT_COMMAND",
-                            action="store_const",
-                            const=child.callback,
-                            help=argparse.SUPPRESS,
-                        )
-                    if isinstance(child, Termkit):
-                        child._callbacks = self._callbacks + child._callbacks
-
-                    child._populate(command_parser)
 
-        self._populated = True
+                if populate:
+                    if isinstance(child, Termkit):
+                        child._populate(command_parser, child_args, callbacks)
+                    elif deferred:
+                        command_parser.defer(functools.partial(self._populate_command, child))
+                    else:
+                        child._populate(command_parser, self._resources)
+
+    def _populate_command(self, command: _Command, parser: TermkitParser):
+        """Deferred population of a command parser."""
+        parser.description = command.help
+        command._populate(parser, self._resources)
+
+    def _definition(self, path: typing.Tuple[str, ...] = ()) -> typing.Iterator[typing.Tuple[str, _TermkitComponent]]:
+        """Yield every application, callback and command of the tree along with a path based identifier."""
+        identifier = "/".join(path)
+        yield identifier, self
+        for callback in self._callbacks:
+            yield f"{identifier}@{callback.name}", callback
+        for child in self._childs:
+            if isinstance(child, Termkit):
+                yield from child._definition((*path, child.name))
+            else:
+                yield "/".join((*path, child.name)), child
+
+    def _new_parser(self) -> TermkitParser:
+        from termkit.parser import TermkitParser
+
+        return TermkitParser(
+            prog=self.name,
+            description=self.help,
+            engine=self.engine,
+            fromfile_prefix_chars="@" if self.response_files else None,
+            fromfile_separator=self.response_file_separator,
+        )
+
+    def _build_cached_parser(self, args: typing.Optional[typing.List[str]] = None) -> TermkitParser:
+        from termkit import spec
+
+        registry, structure, modules = {}, [self.engine], set()
+        for identifier, component in self._definition():
+            if isinstance(component, _Command):
+                registry[identifier] = component
+                structure.append((identifier, component.source, component._summary))
+                modules.add(component.source[0])
+            else:
+                structure.append((identifier, component.help, component._summary))
+        # Resources are not arguments, adding one changes the parsers
+        structure.append(self._resources.names)
+
+        directory = spec.cache_directory(self.parser_cache if isinstance(self.parser_cache, str) else None)
+        path = os.path.join(directory, self.name.replace(os.sep, "_") + ".spec")
+
+        parser = self._new_parser()
+        cached = spec.read(path, structure, modules, registry)
+        if cached is not None:
+            return spec.load_parser(parser, cached, args)
+
+        self._populate(parser)
+        spec.write(path, structure, modules, spec.dump_parser(parser), registry)
+        return parser
+
+    def _build_parser(self, args: typing.Optional[typing.List[str]]) -> TermkitParser:
+        revisions = self._revisions()
+        if self._checked != revisions:
+            self._check_dependencies()
+            self._checked = revisions
+
+        if self.parser_cache:
+            return self._build_cached_parser(args)
+
+        if args is not None:
+            parser = self._new_parser()
+            self._populate(parser, args)
+            return parser
+
+        # Full parser is kept along with the definition revisions it was built from, it is populated before being
+        # shared so concurrent runs never see a partial parser and at most one is kept whatever the number of builds
+        built = self._built
+        if built is None or built[0] != revisions:
+            parser = self._new_parser()
+            self._populate(parser)
+            built = self._built = (revisions, parser)
+        return built[1]
+
+    def _check_dependencies(self, callbacks: typing.Sequence[_Command] = ()):
+        """Resolve callbacks dependencies along every path of the tree, invalid ones raise ValueError."""
+        callbacks = [*callbacks, *self._callbacks]
+        if any(callback.depends_on is not None for callback in callbacks):
+            from termkit.scheduler import resolve
+
+            resolve(callbacks)
+        for child in self._childs:
+            if isinstance(child, Termkit):
+                child._check_dependencies(callbacks)
+
+    def _revisions(self) -> typing.Tuple[int, ...]:
+        revisions, apps = [], [self]
+        while len(apps) > 0:
+            app = apps.pop()
+            revisions.append(app._revision)
+            apps.extend(c for c in app._childs if isinstance(c, Termkit))
+        return tuple(revisions)
+
+    def run(self, argv: typing.Optional[typing.Sequence[str]] = None) -> int:
+        """Run application with argv (sys.argv[1:] by default) and return its exit code."""
+        return self._run(sys.argv[1:] if argv is None else list(argv))
+
+    def _run(self, args: typing.List[str], parser: typing.Optional["TermkitParser"] = None) -> int:
+        # Fully populated parser is given by the warm server, built for args otherwise
+        try:
+            options, args = parse_termkit_options(args)
+        except ValueError as e:
+            print(f"{self.name}: error: {e}", file=sys.stderr)
+            return 2
+
+        destination = options.get("--termkit-profile", os.environ.get("TERMKIT_PROFILE"))
+        if destination:
+            from termkit.profiler import profile
+
+            with profile(destination, options.get("--termkit-cprofile", os.environ.get("TERMKIT_CPROFILE"))):
+                return self._run_with_options(options, args, parser)
+        return self._run_with_options(options, args, parser)
+
+    def _run_with_options(
+        self,
+        options: typing.Dict[str, typing.Optional[str]],
+        args: typing.List[str],
+        parser: typing.Optional["TermkitParser"] = None,
+    ) -> int:
+        argcomplete = _import_argcomplete()
+        if argcomplete is not None:
+            # Only build the sub-tree matching words already typed on the command line being completed
+            with _phase("argcomplete"):
+                parser = self._build_parser(get_completion_args(os.environ))
+                argcomplete.autocomplete(parser)
+
+        if any(option in options for option in ("--termkit-answers", "--termkit-answers-env", "--termkit-yes")):
+            from termkit.prompt import AnswersFile, AssumeYes, EnvironmentAnswers, Prompt
+
+            providers = []
+            if "--termkit-answers" in options:
+                providers.append(AnswersFile(options["--termkit-answers"]))
+            if "--termkit-answers-env" in options:
+                providers.append(EnvironmentAnswers())
+            if "--termkit-yes" in options:
+                providers.append(AssumeYes())
+            # Unattended run, prompts never wait for the terminal
+            with Prompt.answer_with(*providers, interactive=False):
+                return self._dispatch_args(options, args, parser)
+        return self._dispatch_args(options, args, parser)
+
+    def _dispatch_args(
+        self,
+        options: typing.Dict[str, typing.Optional[str]],
+        args: typing.List[str],
+        parser: typing.Optional["TermkitParser"] = None,
+    ) -> int:
+        if "--termkit-cache-stats" in options:
+            return self._print_cache_stats()
+        import contextlib
+
+        with contextlib.ExitStack() as stack:
+            if "--termkit-no-cache" in options:
+                from termkit.cache import bypass
+
+                stack.enter_context(bypass())
+            jobs = options.get("--termkit-jobs", os.environ.get("TERMKIT_JOBS"))
+            if jobs is not None or "--termkit-fail-fast" in options:
+                from termkit.fanout import configure
+
+                try:
+                    stack.enter_context(configure(int(jobs or 1), fail_fast="--termkit-fail-fast" in options))
+                except ValueError:
+                    print(f"{self.name}: error: argument --termkit-jobs: invalid jobs count: '{jobs}'", file=sys.stderr)
+                    return 2
+
+            if "--termkit-batch" in options:
+                return self._run_batch(
+                    options["--termkit-batch"], fail_fast="--termkit-fail-fast" in options, parser=parser
+                )
 
-    def __call__(self, *args, **kwargs):
-        self._populate(self._parser)
-        if __ARGCOMPLETE__:
-            argcomplete.autocomplete(self._parser)
-        arguments = self._parser.parse_args()
-        if hasattr(arguments, "_TERMKIT_CALLBACKS"):
-            for callback in arguments._TERMKIT_CALLBACKS:
-                callback.callback(**filter_args(arguments, callback.callback))
+            if parser is not None:
+                return self._execute(parser, args)
+
+            if self.lazy and self.response_files and any(arg[:1] == "@" for arg in args):
+                # Expanded before population so the sub-command can be located, parsing finds no file left to read
+                from termkit.argfiles import expand
+
+                try:
+                    args = list(expand(args, "@", self.response_file_separator))
+                except (OSError, ValueError) as e:
+                    print(f"{self.name}: error: {e}", file=sys.stderr)
+                    return 2
+
+            with _phase("populate"):
+                parser = self._build_parser(args if self.lazy else None)
+            return self._execute(parser, args)
+
+    def _cache_identifier(self, command: _Command) -> str:
+        # Results are keyed on the command path, prefixed by the application name
+        identifier = next(i for i, component in self._definition() if component is command)
+        return f"{self.name}/{identifier}"
+
+    def _print_cache_stats(self) -> int:
+        commands = [(i, c) for i, c in self._definition() if isinstance(c, _Command) and c.cache is not None]
+        width = max((len(i) for i, _ in commands), default=7)
+        print(f"{'command':<{width}}  {'entries':>8}  {'size KiB':>10}  {'hits':>8}  {'misses':>8}  {'evictions':>9}")
+        for identifier, command in commands:
+            stats = command.cache.stats(f"{self.name}/{identifier}")
+            command.cache.close()
+            print(
+                f"{identifier:<{width}}  {stats.entries:>8}  {stats.size / 1024:>10.1f}  {stats.hits:>8}  "
+                f"{stats.misses:>8}  {stats.evictions:>9}"
+            )
+        return 0
+
+    def __call__(self, argv: typing.Optional[typing.Sequence[str]] = None):
+        code = self.run(argv)
+        try:
+            sys.stdout.flush()
+        except BrokenPipeError:
+            from termkit.output import broken_pipe
+
+            code = broken_pipe()
+        sys.exit(code)
+
+    def _run_batch(self, path: str, fail_fast: bool = False, parser: typing.Optional["TermkitParser"] = None) -> int:
+        """Dispatch every argv line of path (stdin for "-") through a single populated parser."""
+        import shlex
+        import traceback
+
+        if parser is None:
+            with _phase("populate"):
+                parser = self._build_parser(None)
+        status = 0
+        file = None
+        try:
+            try:
+                file = sys.stdin if path == "-" else open(path)
+            except OSError as e:
+                parser.error(f"argument --termkit-batch: can't open '{path}': {e.strerror}")
+            for number, line in enumerate(file, start=1):
+                line = line.strip()
+                if len(line) == 0 or line.startswith("#"):
+                    continue
+                try:
+                    args = shlex.split(line)
+                except ValueError as e:
+                    print(f"{self.name}: error: {e}", file=sys.stderr)
+                    args, code = None, 2
+
+                if args is not None:
+                    try:
+                        code = self._execute(parser, args)
+                    except Exception:
+                        traceback.print_exc()
+                        code = 1
+                sys.stdout.flush()
+                print(f"{self.name}: line {number}: exit {code}", file=sys.stderr)
+                if code != 0 and status == 0:
+                    status = code
+                if code != 0 and fail_fast:
+                    break
+        except SystemExit as e:
+            return exit_code(e)
+        finally:
+            if file is not None and file is not sys.stdin:
+                file.close()
+        return status
+
+    def _execute(self, parser: argparse.ArgumentParser, args: typing.List[str]) -> int:
+        from termkit.resources import Injector
+
+        injector = Injector(self._resources)
+        cache = None
+        try:
+            try:
+                with _phase("parse"):
+                    arguments = parser.parse_args(args)
+                callbacks = getattr(arguments, "_TERMKIT_CALLBACKS", [])
+                steps = [(f"callback:{c.plan.callback.__name__}", c.plan) for c in callbacks]
+                if hasattr(arguments, "_TERMKIT_COMMAND"):
+                    command = arguments._TERMKIT_COMMAND
+                    plan = command.plan
+                    if command.cache is not None:
+                        cache = command.cache
+                        plan = cache.wrap(self._cache_identifier(command), plan)
+                    if command.map is not None:
+                        from termkit.fanout import MapPlan
+
+                        plan = MapPlan(plan, command.map)
+                    steps.append((f"command:{command.name}", plan))
+
+                if any(callback.depends_on is not None for callback in callbacks):
+                    run_coroutine(self._dispatch_graph(callbacks, steps, arguments, injector), self.loop_factory)
+                elif any(plan.is_coroutine for _, plan in steps):
+                    # Callbacks and command share a single event loop
+                    run_coroutine(self._dispatch_async(steps, arguments, injector), self.loop_factory)
+                else:
+                    for name, plan in steps:
+                        with _phase(name, cprofile=name.startswith("command:")):
+                            plan(arguments, injector)
+            finally:
+                # Flushes injected outputs and closes resources of the invocation
+                injector.close()
+                if cache is not None:
+                    cache.close()
+        except SystemExit as e:
+            return exit_code(e)
+        except BrokenPipeError:
+            from termkit.output import broken_pipe
+
+            return broken_pipe()
+        return 0
+
+    @staticmethod
+    async def _dispatch_graph(
+        callbacks: typing.List[_Command],
+        steps: typing.List[typing.Tuple[str, _CommandPlan]],
+        arguments: argparse.Namespace,
+        injector: Injector,
+    ):
+        from termkit.scheduler import resolve, run_graph
 
-        if hasattr(arguments, "_TERMKIT_COMMAND"):
-            arguments._TERMKIT_COMMAND(**filter_args(arguments, arguments._TERMKIT_COMMAND))
+        # Callbacks run concurrently along their dependencies, then the command
+        await run_graph(steps[: len(callbacks)], resolve(callbacks), arguments, injector)
+        await Termkit._dispatch_async(steps[len(callbacks) :], arguments, injector)
 
-        sys.exit(0)
+    @staticmethod
+    async def _dispatch_async(
+        steps: typing.List[typing.Tuple[str, _CommandPlan]],
+        arguments: argparse.Namespace,
+        injector: Injector,
+    ):
+        for name, plan in steps:
+            with _phase(name, cprofile=name.startswith("command:")):
+                result = plan(arguments, injector)
+                if plan.is_coroutine:
+                    await result
@@ -0,0 +1,137 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Single pass docstring parser.
+
+Splits a docstring into its description and an index of parameters help, parameters can be documented with reST
+fields (":param name: help", continued on indented lines), Google "Args:" sections or NumPy "Parameters" sections.
+Other sections, such as examples or notes, are kept in the description.
+"""
+
+import re
+import typing
+
+_PARAMETERS_SECTIONS = {
+    "args",
+    "arguments",
+    "parameters",
+    "params",
+    "keyword args",
+    "keyword arguments",
+    "other parameters",
+}
+
+_REST_FIELD = re.compile(r"^:(?:param|parameter|arg|argument|key|keyword)\s+(?:[^:]*\s)?\**(\w+)\s*:(.*)$")
+_GOOGLE_ENTRY = re.compile(r"^\**(\w+)\s*(?:\([^)]*\))?\s*:(.*)$")
+_NUMPY_ENTRY = re.compile(r"^(\**\w+(?:\s*,\s*\**\w+)*)\s*(?::.*)?$")
+_NUMPY_HEADER = re.compile(r"^\w[\w ]*$")
+# Blank lines left by removed sections
+_BLANK_LINES = re.compile(r"\n(?:[ \t]*\n)+")
+
+
+class Docstring:
+    __slots__ = ("description", "params")
+
+    def __init__(self, description: str, params: typing.Dict[str, str]):
+        self.description = description
+        self.params = params
+
+
+def parse_docstring(doc: typing.Optional[str]) -> Docstring:
+    """
+    Parse a cleaned docstring (see inspect.getdoc) in a single pass over its lines. Parameters sections and reST
+    fields are left out of the description, other sections (Returns, Examples, Notes...) are kept in it.
+    """
+    lines = (doc or "").expandtabs().splitlines()
+    description = []
+    params = {}
+
+    section, section_indent = None, 0
+    entry_indent = None
+    current, current_indent = [], 0
+
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+        indent = len(line) - len(line.lstrip())
+        following = lines[index + 1].strip() if index + 1 < len(lines) else ""
+        index += 1
+
+        # NumPy section header, underlined with dashes
+        if _NUMPY_HEADER.match(stripped) and len(following) >= 3 and set(following) == {"-"}:
+            current, entry_indent = [], None
+            if stripped.lower() in _PARAMETERS_SECTIONS:
+                section, section_indent = "numpy", indent
+                index += 1
+                continue
+            section = None
+
+        # Google section header
+        elif stripped.endswith(":") and stripped[:-1].lower() in _PARAMETERS_SECTIONS:
+            section, section_indent = "google", indent
+            current, entry_indent = [], None
+            continue
+
+        # reST field, continued on indented lines
+        elif stripped.startswith(":") and section in (None, "field"):
+            match = _REST_FIELD.match(stripped)
+            current, current_indent = [], indent
+            if match is not None:
+                current = [match.group(1)]
+                params[match.group(1)] = [match.group(2).strip()]
+            section = "field"
+            continue
+
+        if len(stripped) == 0:
+            if section != "numpy" and section != "google":
+                section, current = None, []
+                description.append(line)
+            continue
+
+        if section == "google":
+            if indent > section_indent:
+                if entry_indent is None or indent <= entry_indent:
+                    match = _GOOGLE_ENTRY.match(stripped)
+                    if match is not None:
+                        entry_indent = indent
+                        current = [match.group(1)]
+                        params[match.group(1)] = [match.group(2).strip()]
+                else:
+                    _extend(params, current, stripped)
+                continue
+            section, current = None, []
+
+        elif section == "numpy":
+            if indent <= section_indent:
+                match = _NUMPY_ENTRY.match(stripped)
+                current = [] if match is None else [name.strip().lstrip("*") for name in match.group(1).split(",")]
+                for name in current:
+                    params[name] = []
+            else:
+                _extend(params, current, stripped)
+            continue
+
+        elif section == "field":
+            if indent > current_indent:
+                _extend(params, current, stripped)
+                continue
+            section, current = None, []
+
+        description.append(line)
+
+    return Docstring(
+        _BLANK_LINES.sub("\n\n", "\n".join(description)).strip("\n").rstrip(),
+        {name: _format_help(" ".join(p for p in parts if p)) for name, parts in params.items()},
+    )
+
+
+def _extend(params: typing.Dict[str, typing.List[str]], names: typing.List[str], text: str):
+    for name in names:
+        params[name].append(text)
+
+
+def _format_help(text: str) -> str:
+    # Explicit "\n" sequences break lines in help, following lines are indented
+    return "\n  ".join(line.strip() for line in text.replace("\\n", "\n").splitlines())
@@ -0,0 +1,289 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Trie based parsing engine.
+
+Option strings of a parser are compiled once into a trie resolving exact option strings and unique abbreviations, argv
+is then classified in a single pass and arguments are dispatched to the same actions, in the same order and with the
+same errors as the argparse parsing loop. Argv the engine does not handle (separator "--", ambiguous abbreviations or
+remainder arguments) is left to argparse.
+
+The engine mirrors the parsing loop of the argparse versions it has been verified against (see SUPPORTED), every argv
+is left to argparse on other Python versions. Other uses of argparse internals are kept here behind the same guard.
+"""
+
+import argparse
+import sys
+import typing
+
+# Python versions whose argparse parsing loop the engine is verified against by the differential tests
+SUPPORTED = (3, 9) <= sys.version_info[:2] <= (3, 12)
+
+
+class OptionTrie:
+    def __init__(self, option_strings: typing.Iterable[str]):
+        self._root = {}
+        for option_string in option_strings:
+            node = self._root
+            for char in option_string:
+                node = node.setdefault(char, {})
+            node[None] = option_string
+
+    def complete(self, prefix: str, limit: int = 2) -> typing.List[str]:
+        """Option strings starting with prefix, at most limit of them."""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        found, nodes = [], [node]
+        while len(nodes) > 0 and len(found) < limit:
+            node = nodes.pop()
+            for char, child in node.items():
+                if char is None:
+                    found.append(child)
+                else:
+                    nodes.append(child)
+        return found[:limit]
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Halt(Exception):
+    def __init__(self, error: argparse.ArgumentError):
+        super().__init__(error)
+        self.error = error
+
+
+def get_trie(parser: argparse.ArgumentParser) -> OptionTrie:
+    """Trie of parser option strings, compiled again only when options are added."""
+    size = len(parser._option_string_actions)
+    cached = parser.__dict__.get("_option_trie")
+    if cached is None or cached[0] != size:
+        cached = (size, OptionTrie(parser._option_string_actions))
+        parser._option_trie = cached
+    return cached[1]
+
+
+def parse_known_args(
+    parser: argparse.ArgumentParser, arg_strings: typing.List[str], namespace: argparse.Namespace
+) -> typing.Optional[typing.Tuple[argparse.Namespace, typing.List[str]]]:
+    """
+    Parse arg_strings into namespace like ArgumentParser._parse_known_args, None is returned without side effects
+    when arg_strings have to be parsed by argparse.
+    """
+    if not SUPPORTED:
+        return None
+    try:
+        steps, extras = _plan(parser, arg_strings)
+    except _Unsupported:
+        return None
+
+    action_conflicts = {}
+    for mutex_group in parser._mutually_exclusive_groups:
+        group_actions = mutex_group._group_actions
+        for i, mutex_action in enumerate(group_actions):
+            conflicts = action_conflicts.setdefault(mutex_action, [])
+            conflicts.extend(group_actions[:i])
+            conflicts.extend(group_actions[i + 1 :])
+
+    seen_actions = set()
+    seen_non_default_actions = set()
+    for step in steps:
+        if isinstance(step, argparse.ArgumentError):
+            raise step
+
+        action, argument_strings, option_string = step
+        seen_actions.add(action)
+        argument_values = parser._get_values(action, argument_strings)
+        if argument_values is not action.default:
+            seen_non_default_actions.add(action)
+            for conflict_action in action_conflicts.get(action, []):
+                if conflict_action in seen_non_default_actions:
+                    msg = argparse._("not allowed with argument %s")
+                    raise argparse.ArgumentError(action, msg % argparse._get_action_name(conflict_action))
+        if argument_values is not argparse.SUPPRESS:
+            action(parser, namespace, argument_values, option_string)
+
+    required_actions = []
+    for action in parser._actions:
+        if action not in seen_actions:
+            if action.required:
+                required_actions.append(argparse._get_action_name(action))
+            elif isinstance(action.default, str) and action.default is getattr(namespace, action.dest, None):
+                setattr(namespace, action.dest, parser._get_value(action, action.default))
+
+    if required_actions:
+        parser.error(argparse._("the following arguments are required: %s") % ", ".join(required_actions))
+
+    for group in parser._mutually_exclusive_groups:
+        if group.required and not any(action in seen_non_default_actions for action in group._group_actions):
+            names = [argparse._get_action_name(a) for a in group._group_actions if a.help is not argparse.SUPPRESS]
+            parser.error(argparse._("one of the arguments %s is required") % " ".join(names))
+
+    return namespace, extras
+
+
+def _plan(parser: argparse.ArgumentParser, arg_strings: typing.List[str]) -> typing.Tuple[list, typing.List[str]]:
+    """
+    Actions to take along with their argument strings, in argparse order. Planning has no side effect, an error
+    argparse would raise while consuming arguments ends the plan.
+    """
+    if any(action.nargs == argparse.REMAINDER for action in parser._actions):
+        raise _Unsupported()
+
+    trie = get_trie(parser)
+    option_string_indices = {}
+    pattern_parts = []
+    for index, arg_string in enumerate(arg_strings):
+        if arg_string == "--":
+            raise _Unsupported()
+        option_tuple = _parse_optional(parser, trie, arg_string)
+        if option_tuple is None:
+            pattern_parts.append("A")
+        else:
+            option_string_indices[index] = option_tuple
+            pattern_parts.append("O")
+    pattern = "".join(pattern_parts)
+
+    # Index of the next option string at or after each index
+    size = len(arg_strings)
+    next_options = [size] * (size + 1)
+    for index in range(size - 1, -1, -1):
+        next_options[index] = index if index in option_string_indices else next_options[index + 1]
+
+    steps, extras = [], []
+    positionals = parser._get_positional_actions()
+
+    def consume_positionals(start_index: int) -> int:
+        # Positionals never match option strings, but sub-commands take every following argument
+        if any(action.nargs == argparse.PARSER for action in positionals):
+            selected_pattern = pattern[start_index:]
+        else:
+            selected_pattern = pattern[start_index : next_options[start_index] + 1]
+        arg_counts = parser._match_arguments_partial(positionals, selected_pattern)
+        for action, arg_count in zip(positionals, arg_counts):
+            steps.append((action, arg_strings[start_index : start_index + arg_count], None))
+            start_index += arg_count
+        positionals[:] = positionals[len(arg_counts) :]
+        return start_index
+
+    def consume_optional(start_index: int) -> int:
+        action, option_string, explicit_arg = option_string_indices[start_index]
+        action_tuples = []
+        while True:
+            if action is None:
+                extras.append(arg_strings[start_index])
+                return start_index + 1
+
+            if explicit_arg is not None:
+                arg_count = _match_argument(parser, action, "A")
+                if arg_count == 0 and option_string[1] not in parser.prefix_chars and explicit_arg != "":
+                    # Single-dash flags concatenated in a single argument
+                    action_tuples.append((action, [], option_string))
+                    option_string = option_string[0] + explicit_arg[0]
+                    if option_string not in parser._option_string_actions:
+                        msg = argparse._("ignored explicit argument %r")
+                        raise _Halt(argparse.ArgumentError(action, msg % explicit_arg))
+                    action = parser._option_string_actions[option_string]
+                    explicit_arg = explicit_arg[1:] or None
+                elif arg_count == 1:
+                    stop = start_index + 1
+                    action_tuples.append((action, [explicit_arg], option_string))
+                    break
+                else:
+                    msg = argparse._("ignored explicit argument %r")
+                    raise _Halt(argparse.ArgumentError(action, msg % explicit_arg))
+            else:
+                start = start_index + 1
+                arg_count = _match_argument(parser, action, pattern[start : next_options[start] + 1])
+                stop = start + arg_count
+                action_tuples.append((action, arg_strings[start:stop], option_string))
+                break
+
+        steps.extend(action_tuples)
+        return stop
+
+    try:
+        start_index = 0
+        max_option_string_index = max(option_string_indices) if option_string_indices else -1
+        while start_index <= max_option_string_index:
+            next_option_string_index = next_options[start_index]
+            if start_index != next_option_string_index:
+                positionals_end_index = consume_positionals(start_index)
+                if positionals_end_index > start_index:
+                    start_index = positionals_end_index
+                    continue
+                start_index = positionals_end_index
+
+            if start_index not in option_string_indices:
+                extras.extend(arg_strings[start_index:next_option_string_index])
+                start_index = next_option_string_index
+
+            start_index = consume_optional(start_index)
+
+        stop_index = consume_positionals(start_index)
+        extras.extend(arg_strings[stop_index:])
+    except _Halt as halt:
+        steps.append(halt.error)
+    return steps, extras
+
+
+def _parse_optional(parser: argparse.ArgumentParser, trie: OptionTrie, arg_string: str) -> typing.Optional[tuple]:
+    if not arg_string or arg_string[0] not in parser.prefix_chars:
+        return None
+
+    option_string_actions = parser._option_string_actions
+    if arg_string in option_string_actions:
+        return option_string_actions[arg_string], arg_string, None
+
+    if len(arg_string) == 1:
+        return None
+
+    if "=" in arg_string:
+        option_string, explicit_arg = arg_string.split("=", 1)
+        if option_string in option_string_actions:
+            return option_string_actions[option_string], option_string, explicit_arg
+
+    if arg_string[1] in parser.prefix_chars:
+        option_tuples = []
+        if parser.allow_abbrev:
+            option_prefix, explicit_arg = arg_string.split("=", 1) if "=" in arg_string else (arg_string, None)
+            for option_string in trie.complete(option_prefix):
+                option_tuples.append((option_string_actions[option_string], option_string, explicit_arg))
+    else:
+        option_tuples = [(option_string_actions[o], o, None) for o in trie.complete(arg_string)]
+        short_option_prefix = arg_string[:2]
+        if short_option_prefix in option_string_actions:
+            option_tuples.append((option_string_actions[short_option_prefix], short_option_prefix, arg_string[2:]))
+
+    if len(option_tuples) > 1:
+        # Ambiguous, reported by argparse
+        raise _Unsupported()
+    if len(option_tuples) == 1:
+        return option_tuples[0]
+
+    if parser._negative_number_matcher.match(arg_string) and not parser._has_negative_number_optionals:
+        return None
+    if " " in arg_string:
+        return None
+    return None, arg_string, None
+
+
+def _match_argument(parser: argparse.ArgumentParser, action: argparse.Action, pattern: str) -> int:
+    try:
+        return parser._match_argument(action, pattern)
+    except argparse.ArgumentError as error:
+        raise _Halt(error)
+
+
+def add_choice(action: argparse._SubParsersAction, name: str, help: typing.Optional[str]):
+    """List sub-command name with help in usage of action, without creating its parser on verified versions."""
+    if SUPPORTED:
+        action._choices_actions.append(action._ChoicesPseudoAction(name, (), help))
+    else:
+        action.add_parser(name, help=help)
@@ -0,0 +1,237 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Fan-out execution.
+
+Commands added with map="parameter" are called once per item of that parameter, up to --termkit-jobs calls at a time
+(threads for functions, tasks for coroutine functions). Standard output and error of every call are captured apart
+and written in items order, failed calls report their exit code and the command exits with the first non-zero one.
+Remaining items are skipped after a failure with --termkit-fail-fast, every item is run otherwise.
+"""
+
+import argparse
+import collections
+import collections.abc
+import contextlib
+import contextvars
+import io
+import sys
+import typing
+
+if typing.TYPE_CHECKING:
+    from termkit.resources import Injector
+
+_settings = contextvars.ContextVar("termkit_fanout", default=(1, False))
+_END = object()
+
+
+class _Outcome:
+    __slots__ = ("result", "code", "stdout", "stderr")
+
+    def __init__(self):
+        self.result = None
+        self.code = 0
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+
+
+def check(callback: typing.Callable, parameter: str):
+    """Raise ValueError unless parameter of callback is parsed as a sequence of items it can be mapped over."""
+    import inspect
+
+    signature = inspect.signature(callback)
+    if parameter not in signature.parameters:
+        raise ValueError(f"Cannot map unknown parameter '{parameter}' of '{callback.__name__}'.")
+    annotation = signature.parameters[parameter].annotation
+    if typing.get_origin(annotation) is typing.Annotated:
+        from termkit.arguments import _TermkitArgument
+
+        argument = next((a for a in annotation.__metadata__ if isinstance(a, _TermkitArgument)), None)
+        nargs = getattr(argument, "nargs", None)
+        if nargs is not None and nargs != "?":
+            return
+        annotation = annotation.__origin__
+    origin = typing.get_origin(annotation) or annotation
+    sequence = isinstance(origin, type) and issubclass(origin, collections.abc.Iterable)
+    if not sequence or issubclass(origin, (str, bytes)):
+        raise ValueError(f"Cannot map parameter '{parameter}' of '{callback.__name__}', it is not a sequence.")
+
+
+class MapPlan:
+    """Command plan called once per item of its map parameter, same interface as the wrapped plan."""
+
+    def __init__(self, plan: typing.Any, parameter: str):
+        if parameter not in plan.parameters:
+            raise ValueError(f"Cannot map unknown parameter '{parameter}' of '{plan.callback.__name__}'.")
+        self.plan = plan
+        self.parameter = parameter
+        self.is_coroutine = plan.is_coroutine
+
+    def __call__(self, arguments: argparse.Namespace, injector: typing.Optional["Injector"] = None):
+        # Objects are injected per item (see _call) so their output is captured along with the item one, resources
+        # are shared by every item
+        jobs, fail_fast = _settings.get()
+        items = _items(getattr(arguments, self.parameter))
+        if self.is_coroutine:
+            return self._map_async(arguments, items, jobs, fail_fast, injector)
+        return self._map(arguments, items, jobs, fail_fast, injector)
+
+    def _map(
+        self,
+        arguments: argparse.Namespace,
+        items: typing.Iterable,
+        jobs: int,
+        fail_fast: bool,
+        injector: typing.Optional["Injector"] = None,
+    ) -> list:
+        collector = _Collector(fail_fast)
+        if jobs == 1:
+            for item in items:
+                if not collector.add(self._call(arguments, item, injector)):
+                    break
+            return collector.finish()
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(jobs) as executor:
+            pending = collections.deque()
+            iterator = iter(items)
+            while True:
+                # Items are taken as calls complete, streamed parameters are never read all at once
+                while collector.running and len(pending) < 2 * jobs:
+                    item = next(iterator, _END)
+                    if item is _END:
+                        break
+                    context = contextvars.copy_context()
+                    pending.append(executor.submit(context.run, self._call, arguments, item, injector))
+                if len(pending) == 0:
+                    break
+                collector.add(pending.popleft().result())
+                if not collector.running:
+                    for future in pending:
+                        future.cancel()
+                    # Calls already running are waited for and reported
+                    for future in pending:
+                        if not future.cancelled():
+                            collector.add(future.result())
+                    break
+        return collector.finish()
+
+    async def _map_async(
+        self,
+        arguments: argparse.Namespace,
+        items: typing.Iterable,
+        jobs: int,
+        fail_fast: bool,
+        injector: typing.Optional["Injector"] = None,
+    ):
+        import asyncio
+
+        collector = _Collector(fail_fast)
+        pending = collections.deque()
+        iterator = iter(items)
+        try:
+            while True:
+                while collector.running and len(pending) < jobs:
+                    item = next(iterator, _END)
+                    if item is _END:
+                        break
+                    pending.append(asyncio.ensure_future(self._call_async(arguments, item, injector)))
+                if len(pending) == 0:
+                    break
+                collector.add(await pending.popleft())
+        finally:
+            for task in pending:
+                task.cancel()
+        return collector.finish()
+
+    def _call(self, arguments: argparse.Namespace, item: typing.Any, parent: typing.Optional["Injector"]) -> _Outcome:
+        from termkit.resources import Injector
+
+        injector = Injector(parent=parent)
+        with _capture(injector) as outcome:
+            outcome.result = self.plan(_with_item(arguments, self.parameter, item), injector)
+        return outcome
+
+    async def _call_async(
+        self, arguments: argparse.Namespace, item: typing.Any, parent: typing.Optional["Injector"]
+    ) -> _Outcome:
+        from termkit.resources import Injector
+
+        injector = Injector(parent=parent)
+        with _capture(injector) as outcome:
+            outcome.result = await self.plan(_with_item(arguments, self.parameter, item), injector)
+        return outcome
+
+
+class _Collector:
+    """Write outcomes in items order and aggregate their results and exit codes."""
+
+    def __init__(self, fail_fast: bool):
+        self.fail_fast = fail_fast
+        self.results = []
+        self.status = 0
+
+    @property
+    def running(self) -> bool:
+        return not self.fail_fast or self.status == 0
+
+    def add(self, outcome: _Outcome) -> bool:
+        sys.stdout.write(outcome.stdout.getvalue())
+        sys.stderr.write(outcome.stderr.getvalue())
+        self.results.append(outcome.result)
+        if outcome.code != 0 and self.status == 0:
+            self.status = outcome.code
+        return self.running
+
+    def finish(self) -> list:
+        if self.status != 0:
+            raise SystemExit(self.status)
+        return self.results
+
+
+@contextlib.contextmanager
+def _capture(injector: "Injector") -> typing.Iterator[_Outcome]:
+    """Capture output and exit code of a call, exceptions are reported as they would be for a whole command."""
+    import traceback
+
+    from termkit import streams
+    from termkit.utils import exit_code
+
+    outcome = _Outcome()
+    with streams.capture(outcome.stdout, outcome.stderr):
+        try:
+            try:
+                yield outcome
+            finally:
+                injector.close()
+        except SystemExit as e:
+            outcome.code = exit_code(e)
+        except Exception:
+            traceback.print_exc()
+            outcome.code = 1
+
+
+def _items(value: typing.Any) -> typing.Iterable:
+    if isinstance(value, (str, bytes)) or not isinstance(value, typing.Iterable):
+        return (value,)
+    return value
+
+
+def _with_item(arguments: argparse.Namespace, parameter: str, item: typing.Any) -> argparse.Namespace:
+    namespace = argparse.Namespace(**vars(arguments))
+    setattr(namespace, parameter, item)
+    return namespace
+
+
+@contextlib.contextmanager
+def configure(jobs: int = 1, fail_fast: bool = False) -> typing.Iterator[None]:
+    """Run mapped commands of the current context with up to jobs calls at a time."""
+    if jobs < 1:
+        raise ValueError(f"invalid jobs count: {jobs}")
+    token = _settings.set((jobs, fail_fast))
+    try:
+        yield
+    finally:
+        _settings.reset(token)
@@ -32,6 +32,16 @@ class TermkitDefaultFormatter(argparse.RawTextHelpFormatter):
         else:
             return super(TermkitDefaultFormatter, self)._format_action(action)
 
+    def _iter_indented_subactions(self, action):
+        # Sub-command lines are laid out by _format_action, their indentation never widens the help position (it does
+        # since Python 3.13)
+        try:
+            get_subactions = action._get_subactions
+        except AttributeError:
+            pass
+        else:
+            yield from get_subactions()
+
     def _format_action_invocation(self, action):
         if not action.option_strings:
             (metavar,) = self._metavar_formatter(action, action.dest)(1)
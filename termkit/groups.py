@@ -1,13 +1,24 @@
-import argparse
+from __future__ import annotations
+
 import typing
+import weakref
+
+if typing.TYPE_CHECKING:
+    import argparse
 
 
 class _TermkitGroup:
     def __init__(self):
-        self.reg = dict()
+        # Argparse groups of every parser built from this group, both are weakly referenced as argparse groups refer
+        # to their parser: registrations go away along with the parser
+        self.reg = weakref.WeakKeyDictionary()
 
     def register(self, parser, argparse_group):
-        self.reg[id(parser)] = argparse_group
+        self.reg[parser] = weakref.ref(argparse_group)
+
+    def lookup(self, parser):
+        argparse_group = self.reg.get(parser)
+        return argparse_group() if argparse_group is not None else None
 
 
 class ArgumentGroup(_TermkitGroup):
@@ -29,17 +40,17 @@ def get_parser_from_group(parser: argparse.ArgumentParser, group: typing.Optiona
         return parser
 
     if isinstance(group, ArgumentGroup):
-        if group.reg.get(id(parser), None) is None:
+        if group.lookup(parser) is None:
             argparse_group = parser.add_argument_group(group.name, group.description)
             # Add new group before options
             parser._action_groups.insert(-2, parser._action_groups.pop(-1))
             # Keep positionals in top group
             parser._action_groups.insert(0, parser._action_groups.pop(parser._action_groups.index(parser._positionals)))
             group.register(parser, argparse_group)
-        return group.reg.get(id(parser))
+        return group.lookup(parser)
 
     if isinstance(group, MutuallyExclusiveGroup):
-        if group.reg.get(id(parser), None) is None:
+        if group.lookup(parser) is None:
             if group.parent is not None:
                 parent_group = get_parser_from_group(parser, group.parent)
                 argparse_group = parent_group.add_mutually_exclusive_group(required=group.required)
@@ -48,4 +59,4 @@ def get_parser_from_group(parser: argparse.ArgumentParser, group: typing.Optiona
             else:
                 argparse_group = parser.add_mutually_exclusive_group(required=group.required)
                 group.register(parser, argparse_group)
-        return group.reg.get(id(parser))
+        return group.lookup(parser)
@@ -0,0 +1,75 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Streaming positional inputs.
+
+A streamed positional is given to its command as a single pass iterator converting values while the command consumes
+them, "-" values are replaced by items read from standard input, delimited by newlines or NUL characters.
+"""
+
+import argparse
+import sys
+import typing
+
+_CHUNK_SIZE = 65536
+
+
+class StreamAction(argparse.Action):
+    def __init__(
+        self,
+        option_strings: typing.List[str],
+        dest: str,
+        item_type: typing.Optional[typing.Callable] = None,
+        item_choices: typing.Optional[typing.Container] = None,
+        delimiter: str = "\n",
+        **kwargs,
+    ):
+        super().__init__(option_strings, dest, **kwargs)
+        self.delimiter = delimiter
+        # Items are converted and checked one by one against this action while iterating
+        self.item = argparse.Action(option_strings, dest, type=item_type, choices=item_choices, metavar=self.metavar)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, InputStream(parser, self, values))
+
+
+class InputStream:
+    def __init__(self, parser: argparse.ArgumentParser, action: StreamAction, values: typing.Iterable[str]):
+        self._iterator = self._convert(parser, action, values)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    @staticmethod
+    def _convert(parser: argparse.ArgumentParser, action: StreamAction, values: typing.Iterable[str]):
+        for value in values:
+            items = read_items(sys.stdin, action.delimiter) if value == "-" else (value,)
+            for item in items:
+                try:
+                    converted = parser._get_value(action.item, item)
+                    parser._check_value(action.item, converted)
+                except argparse.ArgumentError as e:
+                    parser.error(str(e))
+                yield converted
+
+
+def read_items(stream: typing.TextIO, delimiter: str = "\n") -> typing.Iterator[str]:
+    """Yield items of stream separated by delimiter without reading it all at once."""
+    if delimiter == "\n":
+        for line in stream:
+            yield line[:-1] if line.endswith("\n") else line
+        return
+
+    pending = ""
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        *items, pending = (pending + chunk).split(delimiter)
+        yield from items
+    if len(pending) > 0:
+        yield pending
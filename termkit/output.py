@@ -0,0 +1,68 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Block buffered output.
+
+Commands taking an Output parameter get a writer collecting text in a reusable buffer, written to the standard output
+of the current context in a single call once buffer_size characters are pending and when the command returns. Closed
+pipes (e.g. output piped into head) end the invocation with exit code 141, as a process killed by SIGPIPE would.
+"""
+
+import os
+import sys
+import typing
+
+BROKEN_PIPE_EXIT_CODE = 128 + 13
+
+
+class Output:
+    def __init__(self, buffer_size: int = 65536, stream: typing.Optional[typing.TextIO] = None):
+        self.buffer_size = buffer_size
+        self._stream = stream
+        self._chunks = []
+        self._size = 0
+
+    @property
+    def stream(self) -> typing.TextIO:
+        # Resolved on each flush so context-local standard streams are honored
+        return sys.stdout if self._stream is None else self._stream
+
+    def write(self, text: str) -> int:
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self._write_pending()
+        return len(text)
+
+    def writelines(self, lines: typing.Iterable[str]):
+        for line in lines:
+            self.write(line)
+
+    def print(self, *values: typing.Any, sep: str = " ", end: str = "\n"):
+        self.write(sep.join(map(str, values)) + end)
+
+    def flush(self):
+        self._write_pending()
+        self.stream.flush()
+
+    def _write_pending(self):
+        if self._size > 0:
+            data = "".join(self._chunks)
+            self._chunks.clear()
+            self._size = 0
+            self.stream.write(data)
+
+
+def broken_pipe() -> int:
+    """Silence standard output after its pipe has been closed and return the matching exit code."""
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(devnull, sys.stdout.fileno())
+        finally:
+            os.close(devnull)
+    except (OSError, ValueError, AttributeError):
+        # Not backed by a file descriptor, e.g. captured output
+        pass
+    return BROKEN_PIPE_EXIT_CODE
@@ -4,18 +4,29 @@ SPDX-License-Identifier: MIT
 """
 
 import argparse
-import inspect
+import functools
+import threading
 import typing
 
-from termkit.arguments import _TermkitArgument, Positional
+from termkit.arguments import Positional, _TermkitArgument
+from termkit.docstrings import Docstring, parse_docstring
 from termkit.formatters import TermkitDefaultFormatter
-from termkit.utils import get_param_help
+
+if typing.TYPE_CHECKING:
+    from termkit.resources import ResourceRegistry
 
 __BUILTIN_TYPES__ = [str, int, float, complex, bool]
 
+# Deferred populations of every parser, threads using a parser being filled wait for it
+_fill_lock = threading.RLock()
+
 
 class TermkitParser(argparse.ArgumentParser):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, engine: str = "argparse", fromfile_separator: typing.Optional[str] = None, **kwargs):
+        if engine not in ("argparse", "trie"):
+            raise ValueError(f"Unknown engine '{engine}', 'argparse' or 'trie' is expected.")
+        self.engine = engine
+        self.fromfile_separator = fromfile_separator
         super().__init__(*args, **kwargs, add_help=False)
 
         self._optionals.title = "Options"
@@ -28,17 +39,121 @@ class TermkitParser(argparse.ArgumentParser):
         if kwargs.get("formatter_class", None) is None:
             self.formatter_class = TermkitDefaultFormatter
 
+        self._formatted_help = None
+        self._deferred = None
+
+    def defer(self, populate: typing.Callable[["TermkitParser"], None]):
+        """Populate parser with populate only once it is used to parse arguments or render help."""
+        self._deferred = populate
+
+    def fill(self, recursive: bool = False):
+        """Run deferred population of the parser, and of every sub-command parser when recursive."""
+        if self._deferred is not None:
+            with _fill_lock:
+                populate = self._deferred
+                if populate is not None:
+                    populate(self)
+                    # Cleared once filled, other threads never see a partially populated parser
+                    self._deferred = None
+        if recursive and self._subparsers is not None:
+            for action in self._subparsers._group_actions:
+                for child in getattr(action, "_name_parser_map", {}).values():
+                    if isinstance(child, TermkitParser):
+                        child.fill(recursive=True)
+
+    def parse_known_args(self, args=None, namespace=None):
+        self.fill()
+        return super().parse_known_args(args, namespace)
+
+    def _parse_known_args2(self, *args, **kwargs):
+        # Entry point of sub-command parsers since Python 3.13
+        self.fill()
+        return super()._parse_known_args2(*args, **kwargs)
+
+    def format_usage(self) -> str:
+        self.fill()
+        return super().format_usage()
+
+    def help_key(self) -> tuple:
+        """Key of parser attributes and arguments rendered help depends on."""
+        return (
+            self.prog,
+            self.usage,
+            self.description,
+            self.epilog,
+            self.formatter_class,
+            tuple(len(a.choices) if isinstance(a, argparse._SubParsersAction) else id(a) for a in self._actions),
+        )
+
+    def format_help(self) -> str:
+        self.fill()
+        # Rendered once per parser, rendered again only when arguments or sub-commands are added
+        key = self.help_key()
+        if self._formatted_help is None or self._formatted_help[0] != key:
+            self._formatted_help = (key, super().format_help())
+        return self._formatted_help[1]
+
+    def add_subparsers(self, **kwargs):
+        # Sub-command parsers share the parsing engine
+        kwargs.setdefault("parser_class", functools.partial(type(self), engine=self.engine))
+        return super().add_subparsers(**kwargs)
+
+    def _read_args_from_files(self, arg_strings):
+        # Response files are shell-style quoted, or split on fromfile_separator, instead of one argument per line
+        from termkit.argfiles import expand
+
+        try:
+            return list(expand(arg_strings, self.fromfile_prefix_chars, self.fromfile_separator))
+        except (OSError, ValueError) as e:
+            self.error(str(e))
+
+    def _parse_known_args(self, arg_strings, namespace, *args):
+        # argparse expands response files itself, the trie engine needs them expanded beforehand
+        if self.engine == "trie" and len(args) == 0:
+            from termkit import engine
+
+            if engine.SUPPORTED:
+                if self.fromfile_prefix_chars is not None:
+                    # Expansion is recursive, argparse finds no file to read again on fallback
+                    arg_strings = self._read_args_from_files(arg_strings)
+                result = engine.parse_known_args(self, arg_strings, namespace)
+                if result is not None:
+                    return result
+        return super()._parse_known_args(arg_strings, namespace, *args)
+
+    def set_help(self, text: str):
+        """Serve text as rendered help until arguments or sub-commands are added."""
+        self._formatted_help = (self.help_key(), text)
+
 
 class ArgumentHandler:
-    def __init__(self, parser: argparse.ArgumentParser, func: typing.Callable):
+    def __init__(
+        self,
+        parser: argparse.ArgumentParser,
+        func: typing.Callable,
+        docstring: typing.Optional[Docstring] = None,
+        resources: typing.Optional["ResourceRegistry"] = None,
+    ):
+        # inspect is only needed while populating, parsers rebuilt from cache never import it
+        import inspect
+
         self.parser = parser
         self._func = func
+        self._resources = resources
         self.parameters = inspect.signature(func).parameters
+        if docstring is None:
+            docstring = parse_docstring(inspect.getdoc(func))
+        self._params_help = docstring.params
 
     def parse(self, param_name: str):
+        import inspect
+
         param = self.parameters.get(param_name)
+        if self._resources is not None and self._resources.lookup(param_name, param.annotation) is not None:
+            # Injected resource, not an argument
+            return
         param_type = self._get_parameter_type(param_name)
-        param_help = get_param_help(inspect.getdoc(self._func), param_name)
+        param_help = self._params_help.get(param_name, "")
 
         # f(param (= ...))
         if param.annotation is inspect.Parameter.empty:
@@ -79,6 +194,8 @@ class ArgumentHandler:
         self.parser.add_argument(f"--{param_name}", type=param_type, default=param.default, help=help)
 
     def _get_parameter_type(self, param_name: str):
+        import inspect
+
         param = self.parameters.get(param_name)
 
         # f(param (= ...))
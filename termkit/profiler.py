@@ -0,0 +1,166 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Phase profiler.
+
+While profiling (--termkit-profile DESTINATION or TERMKIT_PROFILE environment variable), wall time, CPU time and
+tracemalloc peak are recorded for every phase of an invocation: startup (imports done before running), parser
+population, argcomplete, parsing, each callback and the command. The report is printed to stderr for "-", or written
+as JSON, or as a Chrome trace-event file for destinations ending with ".trace.json". The command phase can also be
+profiled with cProfile (--termkit-cprofile FILE or TERMKIT_CPROFILE). Tracemalloc peak is process wide, it is not
+reported for phases overlapping others such as concurrent callbacks.
+"""
+
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+import typing
+
+_current = contextvars.ContextVar("termkit_profiler", default=None)
+_NO_PHASE = contextlib.nullcontext()
+
+
+class Phase:
+    __slots__ = ("name", "start", "wall", "cpu", "peak")
+
+    def __init__(self, name: str, start: float, wall: float, cpu: float, peak: typing.Optional[int]):
+        self.name = name
+        self.start = start
+        self.wall = wall
+        self.cpu = cpu
+        self.peak = peak
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "start": self.start, "wall": self.wall, "cpu": self.cpu, "peak": self.peak}
+
+
+class Profiler:
+    def __init__(self, cprofile_path: typing.Optional[str] = None):
+        self.cprofile_path = cprofile_path
+        self.phases: typing.List[Phase] = []
+        self._origin = time.perf_counter()
+        # Phases running, and those which ran alongside another one
+        self._running: typing.Set[object] = set()
+        self._overlapping: typing.Set[object] = set()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, cprofile: bool = False):
+        import tracemalloc
+
+        profile = None
+        if cprofile and self.cprofile_path is not None:
+            import cProfile
+
+            profile = cProfile.Profile()
+        token = object()
+        with self._lock:
+            if len(self._running) > 0:
+                self._overlapping.update(self._running)
+                self._overlapping.add(token)
+            elif tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            self._running.add(token)
+        start, cpu = time.perf_counter(), time.thread_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.cprofile_path)
+            wall, cpu = time.perf_counter() - start, time.thread_time() - cpu
+            with self._lock:
+                self._running.discard(token)
+                overlapping = token in self._overlapping
+                self._overlapping.discard(token)
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() and not overlapping else None
+            self.phases.append(Phase(name, start - self._origin, wall, cpu, peak))
+
+    def report(self, destination: str):
+        if destination == "-":
+            self._print_report(sys.stderr)
+            return
+
+        import json
+
+        if destination.endswith(".trace.json"):
+            events = [
+                {
+                    "name": p.name,
+                    "ph": "X",
+                    "ts": p.start * 1e6,
+                    "dur": p.wall * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                    "args": {"cpu_ms": p.cpu * 1e3, "peak_bytes": p.peak},
+                }
+                for p in self.phases
+            ]
+            data = {"traceEvents": events, "displayTimeUnit": "ms"}
+        else:
+            data = {"phases": [p.as_dict() for p in self.phases]}
+        with open(destination, "w") as file:
+            json.dump(data, file, indent=2)
+
+    def _print_report(self, stream: typing.TextIO):
+        width = max((len(p.name) for p in self.phases), default=5)
+        print(f"{'phase':<{width}}  {'wall ms':>10}  {'cpu ms':>10}  {'peak KiB':>10}", file=stream)
+        for p in self.phases:
+            peak = "-" if p.peak is None else f"{p.peak / 1024:.1f}"
+            print(f"{p.name:<{width}}  {p.wall * 1e3:>10.3f}  {p.cpu * 1e3:>10.3f}  {peak:>10}", file=stream)
+
+
+def phase(name: str, cprofile: bool = False) -> typing.ContextManager:
+    """Record name phase when profiling, no-op otherwise."""
+    profiler = _current.get()
+    if profiler is None:
+        return _NO_PHASE
+    return profiler.phase(name, cprofile)
+
+
+@contextlib.contextmanager
+def profile(destination: str, cprofile_path: typing.Optional[str] = None) -> typing.Iterator[Profiler]:
+    """Profile phases run in the current context and report them to destination on exit."""
+    import tracemalloc
+
+    profiler = Profiler(cprofile_path)
+    startup = _process_age()
+    if startup is not None:
+        # Phases are timed from the process start
+        profiler._origin -= startup
+        profiler.phases.append(Phase("startup", 0.0, startup, time.process_time(), None))
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _current.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            profiler.report(destination)
+        except OSError as e:
+            # Never masks the outcome of the command
+            print(f"termkit: warning: cannot write profile report: {e}", file=sys.stderr)
+
+
+def _process_age() -> typing.Optional[float]:
+    # Wall time elapsed since the process started, only known on Linux
+    try:
+        import os
+
+        with open("/proc/self/stat") as file:
+            start_ticks = int(file.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as file:
+            uptime = float(file.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
@@ -1,21 +1,207 @@
+import contextlib
+import contextvars
+import os
+import re
 import sys
-from getpass import getpass
-from typing import Optional, Union
+from typing import Any, Iterator, Optional, Sequence, Union
+
+_YES = ["y", "yes"]
+
+
+class AnswersFile:
+    """Answers read from a JSON object mapping prompt keys (prompt text by default) to answers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._answers = None
+
+    def answer(self, key: str, confirm: bool = False, secret: bool = False) -> Optional[Union[bool, str]]:
+        if self._answers is None:
+            import json
+
+            with open(self.path) as file:
+                self._answers = json.load(file)
+        return self._answers.get(key)
+
+
+class EnvironmentAnswers:
+    """Answers read from environment variables named after prompt keys, e.g. TERMKIT_ANSWER_USER_NAME."""
+
+    def __init__(self, prefix: str = "TERMKIT_ANSWER_"):
+        self.prefix = prefix
+
+    def answer(self, key: str, confirm: bool = False, secret: bool = False) -> Optional[Union[bool, str]]:
+        return os.environ.get(self.prefix + re.sub(r"\W+", "_", key).strip("_").upper())
+
+
+class AssumeYes:
+    """Confirm every confirmation prompt."""
+
+    def answer(self, key: str, confirm: bool = False, secret: bool = False) -> Optional[Union[bool, str]]:
+        return True if confirm else None
+
+
+# Prompts are only answered by providers explicitly given, environment answers included
+_answers = contextvars.ContextVar("termkit_prompt_answers", default=((), True))
 
 
 class Prompt:
+    """
+    Prompts are answered by the answer providers of the current context first, then interactively unless prompts
+    are not interactive. Prompts left without answer take their default, or abort.
+    """
+
+    @staticmethod
+    @contextlib.contextmanager
+    def answer_with(*providers: Any, interactive: bool = False) -> Iterator[None]:
+        """Answer prompts of the current context (thread or asyncio task) with providers, in order."""
+        token = _answers.set((providers, interactive))
+        try:
+            yield
+        finally:
+            _answers.reset(token)
 
     @staticmethod
-    def ask(prompt: Optional[str] = None, confirm: Optional[bool] = False) -> Union[bool, str]:
+    def ask(
+        prompt: Optional[str] = None,
+        confirm: Optional[bool] = False,
+        default: Optional[str] = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+    ) -> Union[bool, str]:
         if confirm:
-            if input(prompt + " [Y/n] ").lower() not in ["y", "yes"]:
+            answer = Prompt._answer(prompt, " [Y/n] ", key, default, timeout, confirm=True)
+            if answer is not True and str(answer).lower() not in _YES:
                 print("Aborted.", file=sys.stderr)
                 sys.exit(1)
             else:
                 return True
         else:
-            return input(f"{prompt} ")
+            return Prompt._answer(prompt, " ", key, default, timeout)
+
+    @staticmethod
+    def ask_secret(
+        prompt: Optional[str] = None,
+        default: Optional[str] = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+    ) -> str:
+        return Prompt._answer(prompt, " ", key, default, timeout, secret=True)
+
+    @staticmethod
+    async def ask_async(
+        prompt: Optional[str] = None,
+        confirm: Optional[bool] = False,
+        default: Optional[str] = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+        secret: bool = False,
+    ) -> Union[bool, str]:
+        """Prompt without blocking the event loop, interactive answers are read from a worker thread."""
+        import asyncio
+        import functools
+
+        if secret:
+            ask = functools.partial(Prompt.ask_secret, prompt, default, timeout, key)
+        else:
+            ask = functools.partial(Prompt.ask, prompt, confirm, default, timeout, key)
+        providers, interactive = _answers.get()
+        if not interactive or Prompt._provided(providers, key or prompt, confirm, secret) is not None:
+            return ask()
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, context.run, ask)
 
     @staticmethod
-    def ask_secret(prompt: Optional[str] = None):
-        return getpass(f"{prompt} ")
+    def _answer(
+        prompt: Optional[str],
+        suffix: str,
+        key: Optional[str],
+        default: Optional[str],
+        timeout: Optional[float],
+        confirm: bool = False,
+        secret: bool = False,
+    ) -> Union[bool, str]:
+        providers, interactive = _answers.get()
+        answer = Prompt._provided(providers, key or prompt, confirm, secret)
+        if answer is None and interactive:
+            answer = _read_line(f"{prompt}{suffix}", timeout, secret)
+        if answer in (None, "") and default is not None:
+            answer = default
+        if answer is None:
+            print(f"No answer for prompt '{prompt}'.", file=sys.stderr)
+            sys.exit(1)
+        return answer
+
+    @staticmethod
+    def _provided(providers: Sequence[Any], key: Optional[str], confirm: bool, secret: bool):
+        for provider in providers:
+            answer = provider.answer(key or "", confirm=confirm, secret=secret)
+            if answer is not None:
+                return answer
+        return None
+
+
+def _read_line(prompt: str, timeout: Optional[float], secret: bool) -> Optional[str]:
+    """
+    Read an answer from stdin, None when none is given within timeout seconds. Timeouts rely on select and are
+    ignored where it cannot wait for stdin (Windows, stdin without file descriptor).
+    """
+    fd = _fileno(sys.stdin) if timeout is not None and os.name == "posix" else None
+    if fd is None:
+        if secret:
+            from getpass import getpass
+
+            return getpass(prompt)
+        return input(prompt)
+
+    import select
+
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    attributes = None
+    if secret and sys.stdin.isatty():
+        import termios
+
+        attributes = termios.tcgetattr(fd)
+        silent = termios.tcgetattr(fd)
+        silent[3] &= ~termios.ECHO
+        termios.tcsetattr(fd, termios.TCSAFLUSH, silent)
+    try:
+        # Input already buffered by stdin is never seen by select, it is read first
+        line = _read_available(fd)
+        if not line.endswith("\n"):
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if ready:
+                line += sys.stdin.readline()
+            elif len(line) == 0:
+                line = None
+    finally:
+        if attributes is not None:
+            termios.tcsetattr(fd, termios.TCSAFLUSH, attributes)
+            sys.stdout.write("\n")
+
+    if line is None:
+        sys.stdout.write("\n")
+        return None
+    if len(line) == 0:
+        raise EOFError()
+    return line[:-1] if line.endswith("\n") else line
+
+
+def _fileno(stream: Any) -> Optional[int]:
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _read_available(fd: int) -> str:
+    """Line or start of line readable from stdin without blocking, empty when there is none."""
+    blocking = os.get_blocking(fd)
+    os.set_blocking(fd, False)
+    try:
+        return sys.stdin.readline()
+    except (BlockingIOError, TypeError):
+        return ""
+    finally:
+        os.set_blocking(fd, blocking)
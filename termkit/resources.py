@@ -0,0 +1,201 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Resources.
+
+Resources are factories declared once on an application (HTTP sessions, database pools, SDK clients...) and injected
+into callbacks and commands parameters by name or by type annotation. They are created on first use, shared by the
+callbacks and the command of an invocation and closed when it ends, in reverse creation order: generator factories
+resume after their yield, other resources are closed with their close() method when they have one. Resources kept
+warm are created once per process and closed at exit, or by Termkit.close_resources().
+
+Factories can take other resources as parameters, resolved the same way. Parameters named after a resource are
+injected unless annotated with another type, which is an error: they would be arguments otherwise.
+"""
+
+import builtins
+import contextlib
+import threading
+import typing
+
+
+class Resource:
+    __slots__ = ("factory", "name", "type", "keep_warm", "_parameters")
+
+    def __init__(
+        self,
+        factory: typing.Callable,
+        name: typing.Optional[str] = None,
+        type: typing.Optional[type] = None,
+        keep_warm: bool = False,
+    ):
+        if type is None:
+            import inspect
+
+            annotation = inspect.signature(factory).return_annotation
+            if isinstance(annotation, builtins.type) and annotation is not inspect.Signature.empty:
+                type = annotation
+        self.factory = factory
+        self.name = factory.__name__ if name is None else name
+        self.type = type
+        self.keep_warm = keep_warm
+        self._parameters = None
+
+    @property
+    def parameters(self) -> typing.List[typing.Tuple[str, typing.Any]]:
+        if self._parameters is None:
+            import inspect
+
+            self._parameters = [(n, p.annotation) for n, p in inspect.signature(self.factory).parameters.items()]
+        return self._parameters
+
+    def create(self, stack: contextlib.ExitStack, kwargs: typing.Dict[str, typing.Any]) -> typing.Any:
+        import inspect
+
+        if inspect.isgeneratorfunction(self.factory):
+            return stack.enter_context(contextlib.contextmanager(self.factory)(**kwargs))
+        value = self.factory(**kwargs)
+        if callable(getattr(value, "close", None)):
+            stack.callback(value.close)
+        return value
+
+
+class ResourceRegistry:
+    """Resources of an application tree, sub-applications share the registry of the application they are added to."""
+
+    def __init__(self):
+        self._by_name: typing.Dict[str, Resource] = {}
+        self._by_type: typing.Dict[type, Resource] = {}
+        self._warm: typing.Dict[Resource, typing.Any] = {}
+        self._warming: typing.Set[Resource] = set()
+        self._warm_stack = contextlib.ExitStack()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    @property
+    def names(self) -> typing.List[str]:
+        return sorted(self._by_name)
+
+    def register(self, resource: Resource):
+        if resource.name in self._by_name:
+            raise ValueError(f"Resource name '{resource.name}' already taken.")
+        if resource.type is not None and resource.type in self._by_type:
+            raise ValueError(f"Resource of type '{resource.type.__name__}' already declared.")
+        self._by_name[resource.name] = resource
+        if resource.type is not None:
+            self._by_type[resource.type] = resource
+
+    def merge(self, other: "ResourceRegistry"):
+        for resource in other._by_name.values():
+            self.register(resource)
+
+    def lookup(self, name: str, annotation: typing.Any = None) -> typing.Optional[Resource]:
+        """
+        Resource injected into a parameter, matched by name first then by annotation. Parameters named after a
+        resource must be left unannotated or be annotated with its type, other annotations declare arguments and
+        raise ValueError.
+        """
+        import inspect
+
+        annotated = annotation is not None and annotation is not inspect.Parameter.empty
+        resource = self._by_name.get(name)
+        if resource is not None:
+            if annotated and not _matches(resource, annotation):
+                raise ValueError(f"Parameter '{name}' is annotated as an argument but named after a resource.")
+            return resource
+        if isinstance(annotation, type):
+            return self._by_type.get(annotation)
+        if isinstance(annotation, str):
+            # Postponed annotation
+            return next((r for r in self._by_type.values() if r.type.__name__ == annotation), None)
+        return None
+
+    def warm(self, resource: Resource) -> typing.Any:
+        with self._lock:
+            if resource not in self._warm:
+                if resource in self._warming:
+                    raise ValueError(f"Circular dependency of resource '{resource.name}'.")
+                self._warming.add(resource)
+                try:
+                    kwargs = {}
+                    for name, annotation in resource.parameters:
+                        dependency = self.lookup(name, annotation)
+                        if dependency is None:
+                            continue
+                        if not dependency.keep_warm:
+                            raise ValueError(f"Warm resource '{resource.name}' cannot depend on '{dependency.name}'.")
+                        kwargs[name] = self.warm(dependency)
+                    if len(self._warm) == 0:
+                        import atexit
+
+                        atexit.register(self.close)
+                    self._warm[resource] = resource.create(self._warm_stack, kwargs)
+                finally:
+                    self._warming.discard(resource)
+            return self._warm[resource]
+
+    def close(self):
+        """Close resources kept warm, they are created again on next use."""
+        with self._lock:
+            self._warm.clear()
+            self._warm_stack.close()
+
+
+class Injector:
+    """Objects injected during one invocation, closed in reverse creation order by close()."""
+
+    def __init__(self, registry: typing.Optional[ResourceRegistry] = None, parent: typing.Optional["Injector"] = None):
+        self.registry = registry if registry is not None or parent is None else parent.registry
+        self.parent = parent
+        self._values: typing.Dict[typing.Any, typing.Any] = {}
+        self._creating: typing.Set[Resource] = set()
+        self._stack = contextlib.ExitStack()
+        self._lock = threading.RLock()
+
+    def get(self, factory: typing.Any) -> typing.Any:
+        """Object created by factory (a Resource or a class such as Output) for this invocation."""
+        if isinstance(factory, Resource):
+            if self.parent is not None:
+                # Resources are shared with the parent invocation, other objects are not
+                return self.parent.get(factory)
+            if factory.keep_warm:
+                return self.registry.warm(factory)
+        with self._lock:
+            if factory not in self._values:
+                if isinstance(factory, Resource):
+                    if factory in self._creating:
+                        raise ValueError(f"Circular dependency of resource '{factory.name}'.")
+                    self._creating.add(factory)
+                    try:
+                        self._values[factory] = factory.create(self._stack, self.resolve(factory.parameters))
+                    finally:
+                        self._creating.discard(factory)
+                else:
+                    value = self._values[factory] = factory()
+                    if callable(getattr(value, "flush", None)):
+                        self._stack.callback(value.flush)
+            return self._values[factory]
+
+    def resolve(self, parameters: typing.Iterable[typing.Tuple[str, typing.Any]]) -> typing.Dict[str, typing.Any]:
+        """Resources injected into parameters given as (name, annotation) pairs."""
+        kwargs = {}
+        if self.registry is not None and len(self.registry) > 0:
+            for name, annotation in parameters:
+                resource = self.registry.lookup(name, annotation)
+                if resource is not None:
+                    kwargs[name] = self.get(resource)
+        return kwargs
+
+    def close(self):
+        self._stack.close()
+
+
+def _matches(resource: Resource, annotation: typing.Any) -> bool:
+    if resource.type is None:
+        return False
+    if isinstance(annotation, str):
+        return annotation == resource.type.__name__
+    return isinstance(annotation, type) and issubclass(resource.type, annotation)
@@ -0,0 +1,118 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Concurrent callbacks.
+
+Callbacks declaring their dependencies (depends_on) only wait for those, callbacks declaring none wait for every
+callback added before them as they always did. Callbacks ready to run are run concurrently, functions in worker
+threads and coroutine functions as tasks. The first failure cancels callbacks not started yet and is raised, the
+command is not run.
+"""
+
+import asyncio
+import contextvars
+import functools
+import typing
+
+
+class _Exit(Exception):
+    # Carries SystemExit out of tasks, asyncio would otherwise stop the event loop
+    def __init__(self, exit: SystemExit):
+        super().__init__()
+        self.exit = exit
+
+
+def resolve(callbacks: typing.Sequence[typing.Any]) -> typing.List[typing.Tuple[int, ...]]:
+    """
+    Indexes of the callbacks each callback waits for. Dependencies given as functions are matched by identity, given
+    as names they must match a single callback. Unknown, ambiguous and circular dependencies raise ValueError.
+    """
+    functions = [callback.callback for callback in callbacks]
+    dependencies = []
+    for index, callback in enumerate(callbacks):
+        if callback.depends_on is None:
+            dependencies.append(tuple(range(index)))
+            continue
+        indexes = []
+        for dependency in callback.depends_on:
+            if isinstance(dependency, str):
+                matches = [i for i, function in enumerate(functions) if function.__name__ == dependency]
+            else:
+                matches = [i for i, function in enumerate(functions) if function is dependency]
+            name = dependency if isinstance(dependency, str) else dependency.__name__
+            if len(matches) == 0:
+                raise ValueError(f"Callback '{functions[index].__name__}' depends on unknown '{name}'.")
+            if len(matches) > 1:
+                raise ValueError(f"Callback '{functions[index].__name__}' depends on ambiguous '{name}'.")
+            indexes.append(matches[0])
+        dependencies.append(tuple(indexes))
+
+    visited, visiting = set(), set()
+
+    def visit(index: int):
+        if index in visiting:
+            raise ValueError(f"Circular dependency of callback '{functions[index].__name__}'.")
+        if index not in visited:
+            visiting.add(index)
+            for dependency in dependencies[index]:
+                visit(dependency)
+            visiting.discard(index)
+            visited.add(index)
+
+    for index in range(len(callbacks)):
+        visit(index)
+    return dependencies
+
+
+async def run_graph(
+    steps: typing.Sequence[typing.Tuple[str, typing.Any]],
+    dependencies: typing.Sequence[typing.Tuple[int, ...]],
+    arguments: typing.Any,
+    injector: typing.Any,
+):
+    """Run callback steps as soon as the steps they depend on are done."""
+    from termkit.core import _phase
+
+    loop = asyncio.get_running_loop()
+    tasks: typing.Dict[int, asyncio.Task] = {}
+
+    async def run(index: int):
+        await asyncio.gather(*(tasks[dependency] for dependency in dependencies[index]))
+        name, plan = steps[index]
+        # Bound on the event loop thread, injected objects are never created concurrently
+        kwargs = plan.bind(arguments, injector)
+        with _phase(name):
+            try:
+                if plan.is_coroutine:
+                    await plan.callback(**kwargs)
+                else:
+                    call = functools.partial(plan.callback, **kwargs)
+                    await loop.run_in_executor(None, contextvars.copy_context().run, call)
+            except SystemExit as e:
+                raise _Exit(e) from None
+
+    def schedule(index: int) -> asyncio.Task:
+        if index not in tasks:
+            for dependency in dependencies[index]:
+                schedule(dependency)
+            tasks[index] = asyncio.ensure_future(run(index))
+        return tasks[index]
+
+    for index in range(len(steps)):
+        schedule(index)
+    if len(tasks) == 0:
+        return
+
+    done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+    failed = [task for task in tasks.values() if task in done and not task.cancelled() and task.exception()]
+    if len(failed) == 0:
+        return
+
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    error = failed[0].exception()
+    if isinstance(error, _Exit):
+        raise error.exit
+    raise error
@@ -0,0 +1,133 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Warm server mode.
+
+serve() keeps a fully populated application resident behind a Unix socket and forks a process per request, the
+forked process takes over the client standard streams, environment and working directory before dispatching. On the
+client side, forward() sends argv along with its standard streams file descriptors and exits with the code returned by
+the server, falling back to in-process execution when no server is listening or it goes away before receiving the
+request. Forwarded --termkit-* options are handled by the server like by in-process runs.
+
+This module only relies on lightweight imports so clients stay fast to start.
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+import typing
+
+from termkit.utils import import_reference
+
+_HEADER_SIZE = 4
+
+
+def serve(app, path: str, backlog: int = 128):
+    """Serve app on Unix socket at path until interrupted."""
+    parser = app._build_parser(None)
+    # Every command is imported and populated ahead of requests
+    parser.fill(recursive=True)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Forked children are reaped by the system
+    previous_handler = signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    try:
+        server.bind(path)
+        server.listen(backlog)
+        while True:
+            connection, _ = server.accept()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                code = 1
+                try:
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    server.close()
+                    code = _handle(app, parser, connection)
+                finally:
+                    os._exit(code)
+            connection.close()
+    finally:
+        signal.signal(signal.SIGCHLD, previous_handler)
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def forward(
+    path: str,
+    fallback: typing.Union[typing.Callable, str],
+    argv: typing.Optional[typing.Sequence[str]] = None,
+):
+    """
+    Forward invocation to the server listening at path and exit with its exit code.
+
+    When no server is running, fallback application (or its "module:attribute" reference) is called in-process.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with connection:
+        try:
+            connection.connect(path)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            payload = json.dumps({"argv": argv, "env": dict(os.environ), "cwd": os.getcwd()}).encode()
+            socket.send_fds(connection, [len(payload).to_bytes(_HEADER_SIZE, "big")], [0, 1, 2])
+            connection.sendall(payload)
+        except (FileNotFoundError, ConnectionRefusedError, ConnectionResetError, BrokenPipeError, socket.timeout):
+            # No server, or one going away before receiving the request, nothing has run yet
+            connection.close()
+            app = import_reference(fallback) if isinstance(fallback, str) else fallback
+            return app(argv)
+        response = _receive(connection, _HEADER_SIZE)
+
+    # Server process died before replying
+    if len(response) < _HEADER_SIZE:
+        sys.exit(1)
+    sys.exit(int.from_bytes(response, "big", signed=True))
+
+
+def _handle(app, parser, connection: socket.socket) -> int:
+    header, fds, _, _ = socket.recv_fds(connection, _HEADER_SIZE, 3)
+    request = json.loads(_receive(connection, int.from_bytes(header, "big")))
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+
+    try:
+        # Same handling of termkit options as in-process runs
+        code = app._run(request["argv"], parser)
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    connection.sendall(code.to_bytes(_HEADER_SIZE, "big", signed=True))
+    return code
+
+
+def _receive(connection: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
@@ -0,0 +1,285 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+On-disk cache of populated parsers.
+
+A populated parser tree is dumped as a compact spec (argument groups, actions attributes differing from argparse
+defaults and sub-commands) and pickled under the user cache directory along with a fingerprint of the sources it has
+been built from: termkit itself, command modules and modules of every object referenced by the spec (types,
+converters, choices, defaults...). Warm starts rebuild parsers from that spec without introspecting commands.
+
+Spec files are only read when they and their directory are owned by the current user and not writable by others,
+their content can only refer to registered commands and to globals of the modules recorded when they were written.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import io
+import os
+import pickle
+import sys
+import tempfile
+import typing
+
+from termkit.utils import peek_command
+
+_CACHE_ERRORS = (OSError, EOFError, pickle.PickleError, AttributeError, ImportError, KeyError, TypeError, ValueError)
+
+# Attributes of an action built with argparse defaults, only differing ones are dumped
+_ACTION_DEFAULTS = vars(argparse.Action(option_strings=[], dest=""))
+
+_BUILTINS = {"str", "int", "float", "complex", "bool", "bytes", "list", "tuple", "dict", "set", "frozenset", "slice"}
+
+
+class _Pickler(pickle.Pickler):
+    """Pickler storing registered commands by identifier."""
+
+    def __init__(self, file: typing.BinaryIO, registry: typing.Dict[str, typing.Any]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._identifiers = {id(obj): identifier for identifier, obj in registry.items()}
+
+    def persistent_id(self, obj: typing.Any) -> typing.Optional[str]:
+        return self._identifiers.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler restoring registered commands and globals of allowed modules only, every module when None."""
+
+    def __init__(
+        self,
+        file: typing.BinaryIO,
+        registry: typing.Dict[str, typing.Any],
+        modules: typing.Optional[typing.Collection[str]] = (),
+    ):
+        super().__init__(file)
+        self.registry = registry
+        self.modules = modules
+        self.found = set()
+
+    def persistent_load(self, identifier: str) -> typing.Any:
+        return self.registry[identifier]
+
+    def find_class(self, module: str, name: str) -> typing.Any:
+        allowed = self.modules is None or module in self.modules
+        if not allowed or (module == "builtins" and name not in _BUILTINS):
+            raise pickle.UnpicklingError(f"Global '{module}.{name}' is not allowed.")
+        self.found.add(module)
+        return super().find_class(module, name)
+
+
+def cache_directory(directory: typing.Optional[str] = None) -> str:
+    if directory is not None:
+        return directory
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "termkit")
+
+
+def fingerprint(structure: typing.Iterable, modules: typing.Iterable[str]) -> str:
+    digest = hashlib.sha256(repr((sys.version, *structure)).encode())
+    package = os.path.dirname(os.path.abspath(__file__))
+    files = {os.path.join(package, f) for f in os.listdir(package) if f.endswith(".py")}
+    for module_name in modules:
+        files.add(_module_file(module_name))
+    for file in sorted(f for f in files if f is not None):
+        try:
+            stat = os.stat(file)
+            digest.update(f"{file}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        except OSError:
+            digest.update(f"{file}:missing".encode())
+    return digest.hexdigest()
+
+
+def dump_parser(parser: argparse.ArgumentParser) -> dict:
+    if hasattr(parser, "fill"):
+        # Deferred command parsers are dumped populated
+        parser.fill()
+    groups = []
+    for group in parser._action_groups:
+        if group is parser._positionals:
+            groups.append("positionals")
+        elif group is parser._optionals:
+            groups.append("optionals")
+        else:
+            groups.append((group.title, group.description))
+
+    mutually_exclusive_groups = []
+    for group in parser._mutually_exclusive_groups:
+        container = group._container
+        container_index = None if container is parser else parser._action_groups.index(container)
+        mutually_exclusive_groups.append((container_index, group.required))
+
+    actions = []
+    for action in parser._actions:
+        if isinstance(action, argparse._HelpAction):
+            continue
+        group_index = next(i for i, g in enumerate(parser._action_groups) if action in g._group_actions)
+        exclusive_index = next(
+            (i for i, g in enumerate(parser._mutually_exclusive_groups) if action in g._group_actions), None
+        )
+        attributes = {
+            k: v
+            for k, v in action.__dict__.items()
+            if k != "container" and (k not in _ACTION_DEFAULTS or v is not _ACTION_DEFAULTS[k])
+        }
+        childs = None
+        if isinstance(action, argparse._SubParsersAction):
+            for key in ("_name_parser_map", "choices", "_choices_actions"):
+                del attributes[key]
+            helps = {a.dest: a.help for a in action._choices_actions}
+            childs = [
+                (name, helps.get(name), child.description, dump_parser(child))
+                for name, child in action._name_parser_map.items()
+            ]
+        actions.append((group_index, exclusive_index, type(action), attributes, childs))
+
+    # Groups help is kept rendered so it can be served without rebuilding sub-commands
+    help = parser.format_help() if parser._subparsers is not None else None
+    return {"groups": groups, "exclusive_groups": mutually_exclusive_groups, "actions": actions, "help": help}
+
+
+def load_parser(
+    parser: argparse.ArgumentParser, spec: dict, args: typing.Optional[typing.List[str]] = None
+) -> argparse.ArgumentParser:
+    """
+    Fill parser from spec, when args is given only sub-commands along the path selected by args are rebuilt.
+    None are rebuilt when args request help of a group, its rendered help is restored instead.
+    """
+    help_requested = False
+    groups = []
+    for group in spec["groups"]:
+        if group == "positionals":
+            groups.append(parser._positionals)
+        elif group == "optionals":
+            groups.append(parser._optionals)
+        else:
+            groups.append(parser.add_argument_group(*group))
+
+    exclusive_groups = []
+    for container_index, required in spec["exclusive_groups"]:
+        container = parser if container_index is None else groups[container_index]
+        exclusive_groups.append(container.add_mutually_exclusive_group(required=required))
+
+    for group_index, exclusive_index, action_class, attributes, childs in spec["actions"]:
+        action = action_class.__new__(action_class)
+        action.__dict__.update(_ACTION_DEFAULTS)
+        action.__dict__.update(attributes)
+        for name, value in attributes.items():
+            # argparse checks SUPPRESS by identity
+            if isinstance(value, str) and value == argparse.SUPPRESS:
+                setattr(action, name, argparse.SUPPRESS)
+        if exclusive_index is not None:
+            exclusive_groups[exclusive_index]._add_action(action)
+        elif groups[group_index] in (parser._positionals, parser._optionals):
+            parser._add_action(action)
+        else:
+            groups[group_index]._add_action(action)
+
+        if childs is not None:
+            action._name_parser_map = {}
+            action._choices_actions = []
+            action.choices = action._name_parser_map
+            parser._subparsers = groups[group_index]
+
+            selected, child_args = None, None
+            if args is not None:
+                index = peek_command(parser, args)
+                if index is None:
+                    args = None
+                elif index == -2 and spec.get("help") is not None:
+                    help_requested = True
+                    continue
+                elif index >= 0:
+                    selected = next((c for c in childs if c[0] == args[index]), None)
+                    child_args = args[index + 1 :]
+
+            for child in childs:
+                if selected is not None and child is not selected:
+                    continue
+                name, help, description, child_spec = child
+                populate = args is None or child is selected
+                child_parser = action.add_parser(name, help=help, description=description if populate else None)
+                if populate:
+                    load_parser(child_parser, child_spec, child_args)
+
+    parser._action_groups[:] = groups
+    if help_requested:
+        parser.set_help(spec["help"])
+    return parser
+
+
+def read(
+    path: str, structure: typing.Iterable, modules: typing.Iterable[str], registry: typing.Dict[str, typing.Any]
+) -> typing.Optional[dict]:
+    """Spec cached at path if it was built from the same structure and sources, None otherwise."""
+    try:
+        with open(path, "rb") as file:
+            if not _trusted(file, os.path.dirname(path)):
+                return None
+            key, spec_modules = _Unpickler(file, registry).load()
+            if key != fingerprint(structure, {*modules, *spec_modules}):
+                return None
+            return _Unpickler(file, registry, frozenset(spec_modules)).load()
+    except _CACHE_ERRORS:
+        return None
+
+
+def write(
+    path: str,
+    structure: typing.Iterable,
+    modules: typing.Iterable[str],
+    spec: dict,
+    registry: typing.Dict[str, typing.Any],
+) -> bool:
+    structure = list(structure)
+    try:
+        buffer = io.BytesIO()
+        _Pickler(buffer, registry).dump(spec)
+        # Modules referenced by the spec are part of its fingerprint and the only ones it may refer to when read
+        recorder = _Unpickler(io.BytesIO(buffer.getvalue()), registry, None)
+        recorder.load()
+        spec_modules = sorted(recorder.found)
+    except _CACHE_ERRORS:
+        return False
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        file = tempfile.NamedTemporaryFile("wb", dir=directory, delete=False)
+    except OSError:
+        return False
+
+    try:
+        with file:
+            pickle.dump((fingerprint(structure, {*modules, *spec_modules}), spec_modules), file)
+            file.write(buffer.getvalue())
+        os.replace(file.name, path)
+    except (OSError, pickle.PickleError):
+        try:
+            os.unlink(file.name)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def _trusted(file: typing.BinaryIO, directory: str) -> bool:
+    """Whether file and its directory are owned by the current user and not writable by others."""
+    if not hasattr(os, "geteuid"):
+        return True
+    for stat in (os.fstat(file.fileno()), os.stat(directory or ".")):
+        if stat.st_uid != os.geteuid() or stat.st_mode & 0o022:
+            return False
+    return True
+
+
+def _module_file(module_name: str) -> typing.Optional[str]:
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return getattr(module, "__file__", None)
+    try:
+        module_spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+    return None if module_spec is None else module_spec.origin
@@ -0,0 +1,68 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+
+Context-local standard streams.
+
+Once installed, sys.stdout and sys.stderr are proxies writing to the stream captured by the current context (thread or
+asyncio task) and to the original stream otherwise, so output can be captured per invocation without swapping
+process-wide streams.
+"""
+
+import contextlib
+import contextvars
+import sys
+import threading
+import typing
+
+_stdout = contextvars.ContextVar("termkit_stdout", default=None)
+_stderr = contextvars.ContextVar("termkit_stderr", default=None)
+_install_lock = threading.Lock()
+
+
+class ContextStream:
+    def __init__(self, variable: contextvars.ContextVar, fallback: typing.TextIO):
+        self._variable = variable
+        self._fallback = fallback
+
+    @property
+    def target(self) -> typing.TextIO:
+        stream = self._variable.get()
+        return self._fallback if stream is None else stream
+
+    def write(self, data: str) -> int:
+        return self.target.write(data)
+
+    def writelines(self, lines: typing.Iterable[str]):
+        self.target.writelines(lines)
+
+    def flush(self):
+        self.target.flush()
+
+    def isatty(self) -> bool:
+        return self.target.isatty()
+
+    def __getattr__(self, name: str):
+        return getattr(self.target, name)
+
+
+def install():
+    """Replace sys.stdout and sys.stderr by context-local proxies, unless already done."""
+    with _install_lock:
+        if not isinstance(sys.stdout, ContextStream):
+            sys.stdout = ContextStream(_stdout, sys.stdout)
+        if not isinstance(sys.stderr, ContextStream):
+            sys.stderr = ContextStream(_stderr, sys.stderr)
+
+
+@contextlib.contextmanager
+def capture(stdout: typing.TextIO, stderr: typing.Optional[typing.TextIO] = None):
+    """Redirect standard streams of the current context only, stderr defaults to stdout."""
+    install()
+    stdout_token = _stdout.set(stdout)
+    stderr_token = _stderr.set(stdout if stderr is None else stderr)
+    try:
+        yield
+    finally:
+        _stderr.reset(stderr_token)
+        _stdout.reset(stdout_token)
@@ -4,14 +4,29 @@ SPDX-License-Identifier: MIT
 """
 
 import io
-import sys
-from contextlib import redirect_stderr, redirect_stdout
-from typing import Union
+from typing import Iterable, List, Optional, Sequence, Union
 
 from termkit.core import Termkit
+from termkit.streams import capture
+
+
+class TermkitResult:
+    captured_output: str
+    exception: Optional[Union[Exception, SystemExit]]
+    exit_code: Optional[int]
+
+    def __init__(self):
+        self.captured_output = ""
+        self.exception = None
+        self.exit_code = None
 
 
 class TermkitRunner:
+    """
+    Run application with explicit argv, output is captured through context-local streams so runs can happen
+    concurrently from several threads on the same application.
+    """
+
     captured_output: str
     exception: Union[Exception, SystemExit]
     exit_code: int
@@ -20,16 +35,61 @@ class TermkitRunner:
     def __init__(self, app: Termkit):
         self.app = app
 
-    def run(self, *args):
+    def run(self, *args) -> TermkitResult:
+        result = self.invoke(args)
+        self.captured_output = result.captured_output
+        self.exception = result.exception
+        self.exit_code = result.exit_code
+        return result
+
+    def invoke(self, args: Sequence[str]) -> TermkitResult:
+        result = TermkitResult()
         captured_output = io.StringIO()
-        sys.argv = ["termkit-runner", *args]
-        with redirect_stdout(captured_output), redirect_stderr(captured_output):
+        with capture(captured_output):
             try:
-                self.app()
+                self.app(list(args))
             except SystemExit as e:
-                self.exit_code = e.code
-                self.exception = e
+                result.exit_code = e.code
+                result.exception = e
             except Exception as e:
-                self.exception = e
+                result.exception = e
             finally:
-                self.captured_output = captured_output.getvalue()
+                result.captured_output = captured_output.getvalue()
+        return result
+
+    def run_many(
+        self, invocations: Iterable[Sequence[str]], executor: str = "thread", max_workers: Optional[int] = None
+    ) -> List[TermkitResult]:
+        """
+        Run every argv of invocations over a thread or process pool, results are returned in invocations order.
+        Process pools rely on the fork start method to share the application with workers.
+        """
+        import concurrent.futures
+
+        invocations = [list(args) for args in invocations]
+        if executor == "thread":
+            with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+                return list(pool.map(self.invoke, invocations))
+
+        if executor == "process":
+            import multiprocessing
+
+            global _PROCESS_RUNNER
+            if "fork" not in multiprocessing.get_all_start_methods():
+                raise ValueError("Process executor requires 'fork' start method.")
+            _PROCESS_RUNNER = self
+            try:
+                context = multiprocessing.get_context("fork")
+                with concurrent.futures.ProcessPoolExecutor(max_workers, mp_context=context) as pool:
+                    return list(pool.map(_invoke_in_process, invocations))
+            finally:
+                _PROCESS_RUNNER = None
+
+        raise ValueError(f"Unknown executor '{executor}', 'thread' or 'process' is expected.")
+
+
+_PROCESS_RUNNER: Optional[TermkitRunner] = None
+
+
+def _invoke_in_process(args: Sequence[str]) -> TermkitResult:
+    return _PROCESS_RUNNER.invoke(args)
@@ -3,14 +3,35 @@ Copyright 2023, Thomas Mahé <contact@tmahe.dev>
 SPDX-License-Identifier: MIT
 """
 
-import argparse
-import inspect
+from __future__ import annotations
+
+import importlib
+import sys
 import typing
 
+if typing.TYPE_CHECKING:
+    import argparse
+
 __RESERVED_PREFIXES__ = ["_TERMKIT_"]
 
+# Hidden global options, value tells whether option expects an argument
+__TERMKIT_OPTIONS__ = {
+    "--termkit-batch": True,
+    "--termkit-fail-fast": False,
+    "--termkit-answers": True,
+    "--termkit-answers-env": False,
+    "--termkit-yes": False,
+    "--termkit-profile": True,
+    "--termkit-cprofile": True,
+    "--termkit-no-cache": False,
+    "--termkit-cache-stats": False,
+    "--termkit-jobs": True,
+}
+
 
 def filter_args(ns: argparse.Namespace, callback: typing.Callable) -> typing.Dict:
+    import inspect
+
     out = ns.__dict__.copy()
     params = inspect.signature(callback).parameters.keys()
     for arg in ns.__dict__.keys():
@@ -20,20 +41,145 @@ def filter_args(ns: argparse.Namespace, callback: typing.Callable) -> typing.Dic
     return out
 
 
-def strip_doc(doc: str) -> str:
-    out = []
-    for line in doc.splitlines():
-        if len(line) > 0 and line[0] == ":":
+def parse_termkit_options(
+    args: typing.List[str],
+) -> typing.Tuple[typing.Dict[str, typing.Optional[str]], typing.List[str]]:
+    """Split hidden --termkit-* options leading args from the application arguments."""
+    options = {}
+    index = 0
+    while index < len(args):
+        option, _, value = args[index].partition("=")
+        if option not in __TERMKIT_OPTIONS__:
             break
-        out.append(line)
-    return "\n".join(out)
+        if __TERMKIT_OPTIONS__[option] and "=" not in args[index]:
+            index += 1
+            if index >= len(args):
+                raise ValueError(f"argument {option}: expected one argument")
+            value = args[index]
+        options[option] = value if __TERMKIT_OPTIONS__[option] else None
+        index += 1
+    return options, args[index:]
+
+
+def exit_code(exit: SystemExit) -> int:
+    """Process exit code matching a SystemExit, non integer codes are printed to stderr."""
+    if exit.code is None:
+        return 0
+    if isinstance(exit.code, int):
+        return exit.code
+    print(exit.code, file=sys.stderr)
+    return 1
+
+
+def import_reference(reference: str) -> typing.Any:
+    module_name, _, attribute = reference.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def run_coroutine(coroutine: typing.Coroutine, loop_factory: typing.Optional[typing.Callable] = None) -> typing.Any:
+    """
+    Run coroutine until completion in a new event loop created by loop_factory (asyncio default loop otherwise),
+    pending tasks, asynchronous generators and default executor are shut down before closing it. The event loop set
+    for the current thread beforehand is set back afterward.
+    """
+    import asyncio
+
+    # Read without get_event_loop(), which creates a loop when none is set
+    previous = getattr(getattr(asyncio.get_event_loop_policy(), "_local", None), "_loop", None)
+    loop = asyncio.new_event_loop() if loop_factory is None else loop_factory()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+    finally:
+        try:
+            tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(previous)
+            loop.close()
+
+
+def strip_doc(doc: str) -> str:
+    from termkit.docstrings import parse_docstring
+
+    return parse_docstring(doc).description
 
 
 def get_param_help(doc: str, dest: str) -> str:
-    if doc is None:
-        return ""
-    for line in doc.splitlines():
-        pre = f":param {dest}:"
-        if pre == line[: len(pre)]:
-            return "\n  ".join(list(map(lambda o: o.strip(), line[len(pre) :].replace("\\n", "\n").splitlines())))
-    return ""
+    from termkit.docstrings import parse_docstring
+
+    return parse_docstring(doc).params.get(dest, "")
+
+
+def peek_command(parser: argparse.ArgumentParser, args: typing.Sequence[str]) -> typing.Optional[int]:
+    """
+    Locate sub-command token in args without parsing them.
+
+    Returns index of the sub-command token, -1 when args select no sub-command, -2 when they request help before it
+    and None when it cannot be told apart from option values without a full parse.
+    """
+    import argparse
+
+    for action in parser._actions:
+        if not action.option_strings and action.nargs not in (0, argparse.PARSER):
+            return None
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--" or (parser.fromfile_prefix_chars and arg[:1] and arg[0] in parser.fromfile_prefix_chars):
+            return None
+        if len(arg) < 2 or arg[0] not in parser.prefix_chars:
+            return index
+
+        option_string, explicit_value = arg, False
+        if "=" in arg:
+            option_string, explicit_value = arg.split("=", 1)[0], True
+
+        action = parser._option_string_actions.get(option_string)
+        if action is None:
+            return None
+        if isinstance(action, argparse._HelpAction):
+            return -2
+
+        if not explicit_value:
+            if action.nargs is None:
+                index += 1
+            elif isinstance(action.nargs, int):
+                index += action.nargs
+            else:
+                return None
+        index += 1
+    return -1
+
+
+def get_completion_args(environ: typing.Mapping[str, str]) -> typing.List[str]:
+    """
+    Words fully typed on the command line being completed by argcomplete, program name and word under completion
+    are left out.
+    """
+    import shlex
+
+    line = environ.get("COMP_LINE", "")
+    line = line[: int(environ.get("COMP_POINT", len(line)))]
+
+    lexer = shlex.shlex(line, posix=True)
+    lexer.whitespace_split = True
+    words = []
+    try:
+        for word in lexer:
+            words.append(word)
+    except ValueError:
+        # Unterminated quote, word under completion has not been yielded
+        return words[1:]
+
+    if len(line) > 0 and not line[-1].isspace():
+        words = words[:-1]
+    return words[1:]
@@ -0,0 +1,106 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import os
+import tempfile
+from typing import Annotated
+from unittest import TestCase, mock
+
+from termkit import argfiles
+from termkit.argfiles import expand, tokenize
+from termkit.arguments import Nargs, Positional
+from termkit.core import Termkit
+from termkit.tests import TermkitRunner
+
+
+class TestResponseFiles(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        return path
+
+    def test_tokenize_quoted(self):
+        content = b'plain  \'single quoted\'\n"double \\"quoted\\" \\n" esc\\ aped a\\\nb x\'y\'"z"\n'
+        path = self.write("args", content)
+        expected = ["plain", "single quoted", 'double "quoted" \\n', "esc aped", "ab", "xyz"]
+        self.assertEqual(expected, list(tokenize(path)))
+        self.assertEqual([], list(tokenize(self.write("empty", b""))))
+
+    def test_tokenize_unterminated(self):
+        for content in (b"valid 'unterminated", b'valid "unterminated', b"valid escape\\"):
+            tokens = tokenize(self.write("args", content))
+            self.assertEqual("valid", next(tokens))
+            with self.assertRaises(ValueError):
+                next(tokens)
+
+    def test_tokenize_separator(self):
+        path = self.write("args", b"first item\0second 'item'\0\0last")
+        self.assertEqual(["first item", "second 'item'", "", "last"], list(tokenize(path, "\0")))
+
+    def test_expand(self):
+        nested = self.write("nested", b"c d")
+        path = self.write("args", f"b @{nested} e".encode())
+        self.assertEqual(["a", "b", "c", "d", "e", "f"], list(expand(["a", f"@{path}", "f"])))
+
+    def test_app(self):
+        for lazy in (False, True):
+            app = Termkit("my-app", response_files=True, lazy=lazy, engine="trie")
+
+            @app.command()
+            def count(values: Annotated[list, Positional(nargs=Nargs.ONE_OR_MANY)]):
+                print(len(values), values[-1])
+
+            path = self.write("args", b" ".join(b"'value %d'" % i for i in range(10_000)))
+            runner = TermkitRunner(app)
+            runner.run("count", f"@{path}")
+            self.assertEqual("10000 value 9999\n", runner.captured_output)
+
+            runner.run(f"@{self.write('command', b'count single')}")
+            self.assertEqual("1 single\n", runner.captured_output)
+
+            runner.run("count", "@missing")
+            self.assertEqual(2, runner.exit_code)
+            self.assertIn("No such file or directory: 'missing'", runner.captured_output)
+
+    def test_read_once(self):
+        path = self.write("args", b"count a b")
+        for engine in ("argparse", "trie"):
+            for lazy in (False, True):
+                with self.subTest(engine=engine, lazy=lazy):
+                    app = Termkit("my-app", response_files=True, lazy=lazy, engine=engine)
+
+                    @app.command()
+                    def count(values: Annotated[list, Positional(nargs=Nargs.ONE_OR_MANY)]):
+                        print(len(values))
+
+                    runner = TermkitRunner(app)
+                    with mock.patch.object(argfiles, "tokenize", wraps=tokenize) as tokenized:
+                        runner.run(f"@{path}")
+                    self.assertEqual("2\n", runner.captured_output)
+                    self.assertEqual(1, tokenized.call_count)
+
+    def test_lazy_population(self):
+        app = Termkit("my-app", response_files=True, lazy=True)
+
+        @app.command()
+        def first(value: str):
+            print(value)
+
+        @app.command()
+        def second(value: str):
+            print(value)
+
+        runner = TermkitRunner(app)
+        with mock.patch.object(app, "_build_parser", wraps=app._build_parser) as build:
+            runner.run(f"@{self.write('args', b'second value')}")
+        self.assertEqual("value\n", runner.captured_output)
+        # Sub-command is located in expanded arguments, only its parser is populated
+        build.assert_called_once_with(["second", "value"])
@@ -0,0 +1,36 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+from unittest import TestCase
+
+from benchmarks import apps
+from benchmarks.__main__ import compare, measure_in_process
+from termkit.tests import TermkitRunner
+
+
+class TestBenchmarks(TestCase):
+    def test_generated_application(self):
+        # Smallest sizes dispatch each kind of command once
+        for size in (*range(1, len(apps._COMMANDS) + 1), 10, 25, 100):
+            with self.subTest(size=size):
+                source, args = apps.generate(size)
+                namespace = {"__name__": "bench"}
+                exec(compile(source, "<bench>", "exec"), namespace)
+
+                runner = TermkitRunner(namespace["app"])
+                runner.run(*args)
+                self.assertEqual(0, runner.exit_code, runner.captured_output)
+                self.assertEqual(size, source.count('.command("cmd-'))
+
+    def test_measure_in_process(self):
+        measures = measure_in_process(10, repeat=1)
+        self.assertEqual({"populate", "parse", "help", "peak_memory"}, set(measures))
+        self.assertTrue(all(value > 0 for value in measures.values()))
+
+    def test_compare(self):
+        baseline = {"10": {"parse": 0.001, "peak_memory": 1024**2}}
+        results = {"10": {"parse": 0.0014, "peak_memory": 2 * 1024**2, "help": 1.0}, "100": {"parse": 9.0}}
+        self.assertEqual(["peak_memory of 10 commands: 2.00 MiB > 1.00 MiB"], compare(results, baseline, 0.5))
+        self.assertEqual([], compare(results, baseline, 1.0))
@@ -0,0 +1,196 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import types
+from typing import Annotated
+from unittest import TestCase, mock
+
+from termkit.arguments import Positional
+from termkit.cache import ResultCache, cache_key, callback_version
+from termkit.conversions import LazyValue
+from termkit.core import Termkit
+from termkit.output import Output
+from termkit.tests import TermkitRunner
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "results.sqlite")
+        self.calls = []
+
+    def make_app(self, cache: ResultCache) -> Termkit:
+        app = Termkit("my-app")
+        sub_app = Termkit("report")
+
+        @sub_app.command(cache=cache)
+        def render(day: str, out: Output, limit: int = 10):
+            self.calls.append(day)
+            out.print(f"report of {day}")
+            return {"day": day}
+
+        @app.callback()
+        def setup(out: Output):
+            out.print("setup")
+
+        app.add(sub_app)
+        return app
+
+    def test_cached_output(self):
+        runner = TermkitRunner(self.make_app(ResultCache(path=self.path)))
+        for _ in range(2):
+            runner.run("report", "render", "2023-10-01")
+            self.assertEqual(0, runner.exit_code)
+            self.assertEqual("setup\nreport of 2023-10-01\n", runner.captured_output)
+        self.assertEqual(["2023-10-01"], self.calls)
+
+        runner.run("report", "render", "2023-10-02")
+        runner.run("report", "render", "2023-10-01", "--limit", "5")
+        self.assertEqual(["2023-10-01", "2023-10-02", "2023-10-01"], self.calls)
+
+    def test_stored_result(self):
+        cache = ResultCache(path=self.path)
+        self.addCleanup(cache.close)
+        runner = TermkitRunner(self.make_app(cache))
+        runner.run("report", "render", "2023-10-01")
+        # Connection is closed once the invocation ends
+        self.assertIsNone(cache._connection)
+
+        # Commands defined in this file share its version
+        version = f":{callback_version(self.make_app)}"
+        key = cache_key("my-app/report/render", {"day": "2023-10-01", "limit": 10}, version)
+        self.assertEqual(({"day": "2023-10-01"}, "report of 2023-10-01\n"), cache.lookup("my-app/report/render", key))
+
+    def test_ttl(self):
+        runner = TermkitRunner(self.make_app(ResultCache(ttl=60, path=self.path)))
+        now = time.time()
+        with mock.patch("time.time", return_value=now):
+            runner.run("report", "render", "2023-10-01")
+        with mock.patch("time.time", return_value=now + 30):
+            runner.run("report", "render", "2023-10-01")
+        self.assertEqual(1, len(self.calls))
+        with mock.patch("time.time", return_value=now + 61):
+            runner.run("report", "render", "2023-10-01")
+        self.assertEqual(2, len(self.calls))
+
+    def test_lru_eviction(self):
+        # Room for two results, all of the same size
+        size = len(pickle.dumps(({"day": "1"}, "report of 1\n")))
+        runner = TermkitRunner(self.make_app(ResultCache(max_size=2 * size + 1, path=self.path)))
+        for day in ["1", "2", "1", "3", "1", "2"]:
+            runner.run("report", "render", day)
+        # "2" is least recently used when "3" is stored
+        self.assertEqual(["1", "2", "3", "2"], self.calls)
+
+        runner.run("--termkit-cache-stats")
+        header, line = runner.captured_output.splitlines()
+        self.assertEqual(["command", "entries", "size", "KiB", "hits", "misses", "evictions"], header.split())
+        values = line.split()
+        self.assertEqual("report/render", values[0])
+        self.assertEqual(["2", "2", "4", "2"], [values[1], values[3], values[4], values[5]])
+
+    def test_version(self):
+        for version in ("1", "1", "2"):
+            TermkitRunner(self.make_app(ResultCache(path=self.path, version=version))).run("report", "render", "a")
+        self.assertEqual(["a", "a"], self.calls)
+
+        # Results of modified code are not reused
+        runner = TermkitRunner(self.make_app(ResultCache(path=self.path, version="2")))
+        stat = os.stat(__file__)
+        modified = types.SimpleNamespace(st_mtime_ns=stat.st_mtime_ns + 1, st_size=stat.st_size)
+        with mock.patch("os.stat", return_value=modified):
+            runner.run("report", "render", "a")
+        self.assertEqual(["a", "a", "a"], self.calls)
+
+    def test_bypass(self):
+        runner = TermkitRunner(self.make_app(ResultCache(path=self.path)))
+        runner.run("report", "render", "2023-10-01")
+        runner.run("--termkit-no-cache", "report", "render", "2023-10-01")
+        self.assertEqual("setup\nreport of 2023-10-01\n", runner.captured_output)
+        with mock.patch.dict(os.environ, {"TERMKIT_NO_CACHE": "1"}):
+            runner.run("report", "render", "2023-10-01")
+        self.assertEqual(3, len(self.calls))
+
+    def test_async_command(self):
+        app = Termkit("my-app")
+
+        @app.command(cache=ResultCache(path=self.path))
+        async def fetch(name: str):
+            self.calls.append(name)
+            print(f"fetched {name}")
+
+        runner = TermkitRunner(app)
+        for _ in range(2):
+            runner.run("fetch", "inventory")
+            self.assertEqual("fetched inventory\n", runner.captured_output)
+        self.assertEqual(["inventory"], self.calls)
+
+    def test_not_cached(self):
+        app = Termkit("my-app")
+
+        @app.command(cache=ResultCache(path=self.path))
+        def generator(name: str):
+            self.calls.append(name)
+            return (c for c in name)
+
+        @app.command(cache=ResultCache(path=self.path))
+        def fail(name: str):
+            self.calls.append(name)
+            sys.exit(3)
+
+        runner = TermkitRunner(app)
+        for args in [("generator", "a"), ("generator", "a"), ("fail", "b"), ("fail", "b")]:
+            runner.run(*args)
+        self.assertEqual(3, runner.exit_code)
+        self.assertEqual(["a", "a", "b", "b"], self.calls)
+
+    def test_key(self):
+        # Lazy arguments are keyed on their given string without conversion
+        value = LazyValue("1", None)
+        self.assertEqual(cache_key("run", {"x": LazyValue("1", None)}), cache_key("run", {"x": value}))
+        self.assertNotEqual(cache_key("run", {"x": LazyValue("1.0", None)}), cache_key("run", {"x": value}))
+        self.assertEqual("LazyValue('1')", repr(value))
+
+        self.assertEqual(cache_key("run", {"x": {"b", "a"}}), cache_key("run", {"x": {"a", "b"}}))
+        with self.assertRaisesRegex(TypeError, "Cannot key argument of type 'lock'"):
+            cache_key("run", {"x": threading.Lock()})
+        with self.assertRaisesRegex(TypeError, "Cannot key argument of type 'object'"):
+            cache_key("run", {"x": object()})
+
+    def test_uncacheable_argument(self):
+        app = Termkit("my-app")
+
+        class Host:
+            def __init__(self, name: str):
+                self.name = name
+
+        @app.command(cache=ResultCache(path=self.path))
+        def run(name: str, host: Annotated[Host, Positional(type=Host)]):
+            self.calls.append(name)
+
+        runner = TermkitRunner(app)
+        for _ in range(2):
+            runner.run("run", "a", "localhost")
+            self.assertEqual(0, runner.exit_code, runner.captured_output)
+        self.assertEqual(["a", "a"], self.calls)
+
+    def test_connection_reused(self):
+        cache = ResultCache(path=self.path)
+        self.addCleanup(cache.close)
+        cache.store("run", "key", 1, "")
+        connection = cache._connection
+        self.assertEqual((1, ""), cache.lookup("run", "key"))
+        self.assertIs(connection, cache._connection)
+
+    def test_sub_application(self):
+        with self.assertRaises(ValueError):
+            Termkit("my-app").add(Termkit("sub-app"), cache=True)
@@ -0,0 +1,131 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import datetime
+import enum
+import pathlib
+import pickle
+import tempfile
+from typing import Annotated, Callable
+from unittest import TestCase
+
+from termkit.arguments import Nargs, Option, Positional
+from termkit.conversions import LazyValue, get_converter, register_converter
+from termkit.core import Termkit
+from termkit.tests import TermkitRunner
+
+
+class Color(enum.Enum):
+    RED = "r"
+    GREEN = "g"
+
+
+class Point:
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+
+class TestConverters(TestCase):
+    def test_registered_types(self):
+        self.assertEqual(pathlib.Path("a/b"), get_converter(pathlib.Path)("a/b"))
+        self.assertEqual(datetime.date(2023, 1, 2), get_converter(datetime.date)("2023-01-02"))
+        self.assertEqual(Color.GREEN, get_converter(Color)("g"))
+        with self.assertRaises(ValueError):
+            get_converter(Color)("GREEN")
+        self.assertIs(int, get_converter(int))
+        self.assertIs(get_converter(Color), pickle.loads(pickle.dumps(get_converter(Color))))
+
+    def test_memoized(self):
+        calls = []
+
+        def convert(string):
+            calls.append(string)
+            return Point(*map(int, string.split(",")))
+
+        # Mutable results are converted again for every argument
+        register_converter(Point, convert)
+        converter = get_converter(Point)
+        self.assertIsNot(converter("1,2"), converter("1,2"))
+        self.assertEqual(["1,2", "1,2"], calls)
+        self.assertEqual("Point", converter.__name__)
+
+        calls.clear()
+        register_converter(Point, convert, memoize=True)
+        converter = get_converter(Point)
+        self.assertIs(converter("1,2"), converter("1,2"))
+        self.assertEqual(["1,2"], calls)
+
+    def test_eager_error(self):
+        app = Termkit("app-name")
+
+        @app.command()
+        def func(color: Annotated[Color, Option("--color", type=Color)] = Color.RED):
+            print(color)
+
+        runner = TermkitRunner(app)
+        # Members are given by value, like without converter
+        runner.run("func", "--color", "g")
+        self.assertEqual("Color.GREEN\n", runner.captured_output)
+
+        runner.run("func", "--color", "GREEN")
+        self.assertEqual(2, runner.exit_code)
+        self.assertIn("argument --color: invalid Color value: 'GREEN'", runner.captured_output)
+
+
+class TestLazyConversion(TestCase):
+    def test_lazy_option(self):
+        app = Termkit("app-name")
+        calls = []
+
+        def load(string):
+            calls.append(string)
+            return int(string)
+
+        @app.command()
+        def func(
+            value: Annotated[Callable, Option("--value", type=load, lazy=True)] = "3",
+            other: Annotated[Callable, Option("--other", type=load, lazy=True)] = None,
+            skipped: Annotated[Callable, Option("--skipped", type=load, lazy=True)] = "x",
+            values: Annotated[list, Positional(type=load, nargs=Nargs.ZERO_OR_MANY, choices=[1, 2], lazy=True)] = None,
+        ):
+            print(calls)
+            print(value(), value(), other(), [v() for v in values], calls)
+
+        runner = TermkitRunner(app)
+        runner.run("func", "1", "2")
+        self.assertEqual("[]\n3 3 None [1, 2] ['3', '1', '2']\n", runner.captured_output)
+
+        calls.clear()
+        runner.run("func", "--value", "5", "--skipped", "nope")
+        self.assertEqual("[]\n5 5 None [] ['5']\n", runner.captured_output)
+
+        runner.run("func", "--value", "x")
+        self.assertEqual(2, runner.exit_code)
+        self.assertIn("app-name func: error: argument --value: invalid load value: 'x'", runner.captured_output)
+
+        runner.run("func", "3")
+        self.assertEqual(2, runner.exit_code)
+        self.assertIn("argument values: invalid choice: 3 (choose from 1, 2)", runner.captured_output)
+
+    def test_lazy_option_parser_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        for _ in range(2):
+            app = Termkit("app-name", parser_cache=directory.name)
+
+            @app.command()
+            def func(path: Annotated[Callable, Option("--path", type=pathlib.Path, lazy=True)] = "a/b"):
+                print(repr(path()))
+
+            runner = TermkitRunner(app)
+            runner.run("func")
+            self.assertEqual(f"{pathlib.Path('a/b')!r}\n", runner.captured_output)
+
+    def test_lazy_value(self):
+        self.assertEqual(3, LazyValue(value=3)())
+        with self.assertRaises(ValueError):
+            Positional(nargs=Nargs.ONE_OR_MANY, stream=True, lazy=True)
@@ -3,11 +3,22 @@ Copyright 2023, Thomas Mahé <contact@tmahe.dev>
 SPDX-License-Identifier: MIT
 """
 
+import asyncio
+import gc
+import io
+import os
+import sys
+import tempfile
 import textwrap
-from unittest import TestCase
+import threading
+from typing import Annotated
+from unittest import TestCase, mock
 
-from termkit.core import Termkit
+from termkit.arguments import Flag
+from termkit.core import Termkit, _Command
+from termkit.groups import ArgumentGroup, MutuallyExclusiveGroup
 from termkit.tests import TermkitRunner
+from termkit.utils import get_completion_args
 
 
 class TestCore(TestCase):
@@ -164,3 +175,330 @@ class TestCore(TestCase):
         self.assertEqual(stdout, runner.captured_output)
         self.assertEqual(0, runner.exit_code)
         self.assertEqual(SystemExit, type(runner.exception))
+
+    def test_lazy_population(self):
+        app = Termkit("my-app", lazy=True)
+        second_app = Termkit("sub-app", description="First line help")
+        app.add(second_app)
+        populated = []
+
+        @app.command()
+        def command(value=1):
+            """Top level command"""
+            populated.append("command")
+
+        @second_app.command()
+        def func(name):
+            """Nested command"""
+            print(name)
+
+        @second_app.command()
+        def other(name):
+            populated.append("other")
+
+        runner = TermkitRunner(app)
+        with mock.patch.object(_Command, "_populate", autospec=True, side_effect=_Command._populate) as populate:
+            runner.run("sub-app", "func", "Hello")
+            self.assertEqual(["func"], [c.args[0].name for c in populate.call_args_list])
+
+        self.assertEqual("Hello\n", runner.captured_output)
+        self.assertEqual(0, runner.exit_code)
+
+        # Sub-command parsers are not created on verified argparse versions
+        with mock.patch("termkit.engine.SUPPORTED", True), mock.patch(
+            "argparse._SubParsersAction.add_parser"
+        ) as add_parser:
+            runner.run("--help")
+            add_parser.assert_not_called()
+        stdout = textwrap.dedent(
+            """\
+        usage: my-app [-h] COMMAND ...
+
+        Options:
+          -h, --help  Show this help message and exit
+
+        Commands:
+          sub-app .... First line help
+          command .... Top level command
+        """
+        )
+        self.assertEqual(stdout, runner.captured_output)
+
+        # Sub-command parsers are created when argparse internals are not verified
+        with mock.patch("termkit.engine.SUPPORTED", False):
+            runner.run("--help")
+        self.assertEqual(stdout, runner.captured_output)
+
+        runner.run("sub-app", "unknown")
+        self.assertIn("invalid choice: 'unknown'", runner.captured_output)
+        self.assertEqual(2, runner.exit_code)
+
+        runner.run("command", "--value", "3")
+        self.assertEqual(["command"], populated)
+
+    def test_add_command_reference(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "termkit_lazy_commands.py"), "w") as module:
+                module.write('def greet(name):\n    """Greet someone\n\n    Long help\n    """\n    print(name)\n')
+            sys.path.insert(0, directory)
+            self.addCleanup(sys.path.remove, directory)
+            self.addCleanup(sys.modules.pop, "termkit_lazy_commands", None)
+
+            app = Termkit("my-app", lazy=True)
+            app.add("termkit_lazy_commands:greet", help="Greet someone")
+            app.add("termkit_lazy_commands:greet", name="hello", help="Say hello")
+            runner = TermkitRunner(app)
+
+            runner.run("--help")
+            self.assertIn("greet .... Greet someone", runner.captured_output)
+            self.assertNotIn("termkit_lazy_commands", sys.modules)
+
+            runner.run("greet", "World")
+            self.assertEqual("World\n", runner.captured_output)
+            self.assertIn("termkit_lazy_commands", sys.modules)
+
+    def test_add_command_reference_full_population(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "termkit_eager_commands.py"), "w") as module:
+                module.write('def greet(name):\n    """Greet someone\n\n    Long help\n    """\n    print(name)\n')
+            sys.path.insert(0, directory)
+            self.addCleanup(sys.path.remove, directory)
+            self.addCleanup(sys.modules.pop, "termkit_eager_commands", None)
+
+            app = Termkit("my-app")
+            sub_app = Termkit("sub-app", description="Sub application\n\nLong description")
+            app.add(sub_app, help="Short help")
+            app.add("termkit_eager_commands:greet", help="Greet someone")
+
+            @app.command()
+            def other():
+                print("other")
+
+            runner = TermkitRunner(app)
+            runner.run("other")
+            self.assertEqual("other\n", runner.captured_output)
+            runner.run("--help")
+            self.assertIn("sub-app .... Short help", runner.captured_output)
+            self.assertNotIn("termkit_eager_commands", sys.modules)
+
+            runner.run("greet", "--help")
+            self.assertIn("Long help", runner.captured_output)
+            self.assertIn("termkit_eager_commands", sys.modules)
+            runner.run("greet", "World")
+            self.assertEqual("World\n", runner.captured_output)
+
+    def test_add_invalid_command_reference(self):
+        app = Termkit("app-name")
+        with self.assertRaises(ValueError) as e:
+            app.add("module.without.function")
+        self.assertEqual(
+            ("Invalid command reference 'module.without.function', 'module:function' is expected.",), e.exception.args
+        )
+
+    def test_completion_args(self):
+        self.assertEqual([], get_completion_args({"COMP_LINE": "my-app ", "COMP_POINT": "7"}))
+        self.assertEqual([], get_completion_args({"COMP_LINE": "my-app sub", "COMP_POINT": "10"}))
+        self.assertEqual(["sub"], get_completion_args({"COMP_LINE": "my-app sub ", "COMP_POINT": "11"}))
+        self.assertEqual(["sub"], get_completion_args({"COMP_LINE": "my-app sub fu --flag", "COMP_POINT": "13"}))
+        self.assertEqual(["sub", "a b"], get_completion_args({"COMP_LINE": "my-app sub 'a b' 'c"}))
+
+    def test_completion_populates_selected_path(self):
+        app = Termkit("my-app")
+        second_app = Termkit("sub-app")
+        app.add(second_app)
+
+        @app.command()
+        def command(value=1):
+            ...
+
+        @second_app.command()
+        def func(name):
+            ...
+
+        completed = []
+        argcomplete = mock.Mock()
+        argcomplete.autocomplete.side_effect = lambda parser: completed.append(parser) or sys.exit(0)
+        environ = {"_ARGCOMPLETE": "1", "COMP_LINE": "my-app sub-app func --", "COMP_POINT": "23"}
+
+        with mock.patch.dict(os.environ, environ), mock.patch("termkit.core._import_argcomplete") as import_:
+            import_.return_value = argcomplete
+            with mock.patch.object(_Command, "_populate", autospec=True, side_effect=_Command._populate) as populate:
+                with self.assertRaises(SystemExit):
+                    app()
+                self.assertEqual(["func"], [c.args[0].name for c in populate.call_args_list])
+
+        sub_parsers = completed[0]._subparsers._group_actions[0].choices
+        self.assertEqual(["sub-app"], list(sub_parsers))
+
+    def test_async_command(self):
+        loops = []
+        factory = mock.Mock(side_effect=asyncio.new_event_loop)
+        app = Termkit("app-name", loop_factory=factory)
+
+        @app.callback()
+        async def setup():
+            loops.append(asyncio.get_running_loop())
+
+        @app.callback()
+        def sync_setup():
+            loops.append(asyncio.get_running_loop())
+
+        @app.command()
+        async def command(name):
+            await asyncio.sleep(0)
+            loops.append(asyncio.get_running_loop())
+            print(name)
+
+        runner = TermkitRunner(app)
+        runner.run("command", "Hello")
+
+        self.assertEqual("Hello\n", runner.captured_output)
+        self.assertEqual(0, runner.exit_code)
+        self.assertEqual(1, factory.call_count)
+        self.assertEqual(3, len(loops))
+        self.assertEqual(1, len(set(map(id, loops))))
+        self.assertTrue(loops[0].is_closed())
+
+    def test_async_command_keeps_event_loop(self):
+        previous = asyncio.new_event_loop()
+        self.addCleanup(previous.close)
+        asyncio.set_event_loop(previous)
+        self.addCleanup(asyncio.set_event_loop, None)
+        app = Termkit("app-name")
+
+        @app.command()
+        async def command():
+            self.assertIsNot(previous, asyncio.get_running_loop())
+
+        self.assertEqual(0, app.run(["command"]))
+        self.assertIs(previous, asyncio.get_event_loop_policy().get_event_loop())
+
+    def test_sync_command_without_event_loop(self):
+        app = Termkit("app-name")
+
+        @app.command()
+        def command():
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            print("sync")
+
+        runner = TermkitRunner(app)
+        runner.run("command")
+        self.assertEqual("sync\n", runner.captured_output)
+
+    def test_run_exit_code(self):
+        app = Termkit("app-name")
+
+        @app.command()
+        def command(code: int):
+            sys.exit(code)
+
+        self.assertEqual(0, app.run(["command", "0"]))
+        self.assertEqual(3, app.run(["command", "3"]))
+        with mock.patch("sys.stderr"):
+            self.assertEqual(2, app.run(["unknown"]))
+
+    def test_batch(self):
+        app = Termkit("app-name")
+
+        @app.command()
+        def command(name, code: int = 0):
+            print(name)
+            sys.exit(code)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as batch:
+            batch.write("command first\n\n# comment\ncommand 'second line' --code 4\nunknown\ncommand third\n")
+        self.addCleanup(os.unlink, batch.name)
+
+        runner = TermkitRunner(app)
+        runner.run("--termkit-batch", batch.name)
+        self.assertEqual(4, runner.exit_code)
+        lines = runner.captured_output.splitlines()
+        self.assertEqual(["first", "app-name: line 1: exit 0", "second line", "app-name: line 4: exit 4"], lines[:4])
+        self.assertEqual(["third", "app-name: line 6: exit 0"], lines[-2:])
+        self.assertIn("app-name: line 5: exit 2", lines)
+
+        with mock.patch("sys.stdin", io.StringIO("command first\ncommand second --code 1\ncommand third\n")):
+            runner.run("--termkit-batch=-", "--termkit-fail-fast")
+        self.assertEqual(1, runner.exit_code)
+        self.assertEqual(
+            "first\napp-name: line 1: exit 0\nsecond\napp-name: line 2: exit 1\n",
+            runner.captured_output,
+        )
+
+        runner.run("--termkit-batch", os.path.join(os.path.dirname(batch.name), "missing", "batch.txt"))
+        self.assertEqual(2, runner.exit_code)
+        self.assertIn("app-name: error: argument --termkit-batch: can't open", runner.captured_output)
+        self.assertIn("No such file or directory", runner.captured_output)
+
+    def test_compile(self):
+        app = Termkit("app-name")
+        sub_app = Termkit("sub-app")
+        app.add(sub_app)
+
+        @app.callback()
+        def setup(verbose=False, _TERMKIT_HIDDEN=None):
+            print("setup", verbose, _TERMKIT_HIDDEN)
+
+        @sub_app.command()
+        def command(name, count=1):
+            print(name * count)
+
+        self.assertIs(app, app.compile())
+        runner = TermkitRunner(app)
+        # Populate parser ahead, only dispatch has to be introspection free
+        runner.run("--help")
+        with mock.patch("inspect.signature", side_effect=AssertionError("introspection during dispatch")):
+            runner.run("sub-app", "--verbose", "True", "command", "a", "--count", "2")
+        self.assertEqual("setup True None\naa\n", runner.captured_output)
+
+        with self.assertRaises(RuntimeError) as e:
+            sub_app.add(command, "other")
+        self.assertEqual(("Cannot modify compiled 'sub-app' application.",), e.exception.args)
+        with self.assertRaises(RuntimeError):
+            app.add_callback(setup)
+
+    def test_rebuild(self):
+        app = Termkit("my-app")
+        sub_app = Termkit("sub-app")
+        group = ArgumentGroup("Output")
+        exclusive = MutuallyExclusiveGroup(parent=group)
+
+        @sub_app.command()
+        def show(
+            json: Annotated[bool, Flag("--json", group=exclusive)] = False,
+            yaml: Annotated[bool, Flag("--yaml", group=exclusive)] = False,
+        ):
+            print(json, yaml)
+
+        app.add(sub_app)
+        runner = TermkitRunner(app)
+        runner.run("sub-app", "show", "--json")
+        self.assertEqual("True False\n", runner.captured_output)
+        parser = app._build_parser(None)
+        self.assertIs(parser, app._build_parser(None))
+
+        # Parsers are rebuilt once the definition changes, sub-applications included
+        @sub_app.command()
+        def other():
+            print("other")
+
+        runner.run("sub-app", "other")
+        self.assertEqual("other\n", runner.captured_output)
+        self.assertIsNot(parser, app._build_parser(None))
+
+        # Concurrent builds are independent, groups registrations go away along with their parser
+        def build():
+            parser = app._new_parser()
+            app._populate(parser)
+            parser.parse_args(["sub-app", "show", "--yaml"])
+
+        threads = [threading.Thread(target=build) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del parser
+        gc.collect()
+        self.assertEqual(1, len(group.reg))
+        self.assertEqual(1, len(exclusive.reg))
@@ -0,0 +1,152 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import inspect
+import textwrap
+from unittest import TestCase
+
+from termkit.core import Termkit
+from termkit.docstrings import parse_docstring
+from termkit.tests import TermkitRunner
+
+
+class TestParseDocstring(TestCase):
+    def test_rest(self):
+        def func(name, count, verbose):
+            """
+            Greet someone
+
+            Longer description.
+
+            :param name: Name to greet,
+                on several lines
+            :param int count: Number of greetings\\nRepeated greetings
+            :param verbose:
+            :return: Nothing
+            """
+
+        docstring = parse_docstring(inspect.getdoc(func))
+        self.assertEqual("Greet someone\n\nLonger description.", docstring.description)
+        self.assertEqual(
+            {
+                "name": "Name to greet, on several lines",
+                "count": "Number of greetings\n  Repeated greetings",
+                "verbose": "",
+            },
+            docstring.params,
+        )
+
+    def test_google(self):
+        def func(name, count, *args, **kwargs):
+            """
+            Greet someone
+
+            Args:
+                name (str): Name to greet,
+                    on several lines
+                count: Number of greetings
+                *args: Extra names
+                **kwargs: Options
+
+            Returns:
+                count: Not a parameter
+            """
+
+        docstring = parse_docstring(inspect.getdoc(func))
+        # Sections other than parameters stay in the description
+        self.assertEqual("Greet someone\n\nReturns:\n    count: Not a parameter", docstring.description)
+        self.assertEqual(
+            {
+                "name": "Name to greet, on several lines",
+                "count": "Number of greetings",
+                "args": "Extra names",
+                "kwargs": "Options",
+            },
+            docstring.params,
+        )
+
+    def test_numpy(self):
+        def func(name, first, second):
+            """
+            Greet someone
+
+            Parameters
+            ----------
+            name : str
+                Name to greet,
+                on several lines
+            first, second : int, optional
+                Bounds
+
+            Returns
+            -------
+            other : int
+                Not a parameter
+            """
+
+        docstring = parse_docstring(inspect.getdoc(func))
+        self.assertEqual("Greet someone\n\nReturns\n-------\nother : int\n    Not a parameter", docstring.description)
+        self.assertEqual(
+            {"name": "Name to greet, on several lines", "first": "Bounds", "second": "Bounds"}, docstring.params
+        )
+
+    def test_other_sections(self):
+        def func(name):
+            """
+            Greet someone
+
+            Args:
+                name: Name to greet
+
+            Examples:
+                greet World
+
+            :param name: Overridden
+            :return: Nothing
+
+            Note:
+                Be polite.
+            """
+
+        docstring = parse_docstring(inspect.getdoc(func))
+        self.assertEqual("Greet someone\n\nExamples:\n    greet World\n\nNote:\n    Be polite.", docstring.description)
+        self.assertEqual({"name": "Overridden"}, docstring.params)
+
+    def test_empty(self):
+        docstring = parse_docstring(None)
+        self.assertEqual("", docstring.description)
+        self.assertEqual({}, docstring.params)
+
+    def test_help_rendering(self):
+        app = Termkit("app-name")
+
+        @app.command()
+        def func(name, count=1):
+            """
+            Greet someone
+
+            Args:
+                name: Name to greet
+                count: Number of greetings
+            """
+
+        runner = TermkitRunner(app)
+        runner.run("func", "--help")
+
+        output = textwrap.dedent(
+            """\
+        usage: app-name func [-h] [--count COUNT] name
+
+        Greet someone
+
+        Positionals:
+          name           Name to greet
+
+        Options:
+          -h, --help     Show this help message and exit
+          --count COUNT  Number of greetings
+        """
+        )
+        self.assertEqual(output, runner.captured_output)
@@ -0,0 +1,194 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import argparse
+import contextlib
+import io
+from typing import Annotated
+from unittest import TestCase, mock, skipUnless
+
+from termkit import engine
+from termkit.arguments import CounterFlag, Flag, Nargs, Option, Positional
+from termkit.core import Termkit
+from termkit.engine import OptionTrie
+from termkit.groups import MutuallyExclusiveGroup
+from termkit.parser import ArgumentHandler, TermkitParser
+from termkit.tests import TermkitRunner
+
+
+def command(
+    source: Annotated[str, Positional()],
+    targets: Annotated[list, Positional(type=int, nargs=Nargs.ZERO_OR_MANY)],
+    mode: Annotated[str, Option("-m", "--mode", choices=["fast", "slow"])] = "fast",
+    values: Annotated[list, Option("--values", nargs=Nargs.ONE_OR_MANY, type=float)] = None,
+    limit: Annotated[int, Option("-l", "--limit", type=int)] = 10,
+    label: Annotated[str, Option("--label", nargs=Nargs.ONE_OR_DEFAULT)] = "none",
+    verbose: Annotated[int, CounterFlag("-v", "--verbose")] = 0,
+    force: Annotated[bool, Flag("-f", "--force")] = False,
+    json: Annotated[bool, Flag("--json", group=MutuallyExclusiveGroup())] = False,
+):
+    ...
+
+
+def build_parser(engine: str, func) -> TermkitParser:
+    parser = TermkitParser(prog="prog", engine=engine)
+    handler = ArgumentHandler(parser, func)
+    for name in handler.parameters:
+        handler.parse(name)
+    return parser
+
+
+def build_exclusive_parser(engine: str) -> TermkitParser:
+    parser = TermkitParser(prog="prog", engine=engine)
+    exclusive = parser.add_mutually_exclusive_group(required=True)
+    exclusive.add_argument("--json", action="store_true")
+    exclusive.add_argument("--yaml", action="store_true")
+    parser.add_argument("name")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--pair", nargs=2)
+    parser.add_argument("--default-type", type=int, default="3")
+    return parser
+
+
+def build_tree_parser(engine: str) -> TermkitParser:
+    parser = TermkitParser(prog="prog", engine=engine)
+    parser.add_argument("--verbose", action="store_true")
+    sub_parsers = parser.add_subparsers(title="Commands", dest="command")
+    first = sub_parsers.add_parser("first")
+    first.add_argument("files", nargs="+")
+    first.add_argument("--count", type=int, default=1)
+    second = sub_parsers.add_parser("second")
+    second.add_argument("value", type=int)
+    second.add_argument("-x", action="store_true")
+    second.add_argument("-y", action="count", default=0)
+    return parser
+
+
+def parse(parser: argparse.ArgumentParser, argv):
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        try:
+            namespace, extras = parser.parse_known_args(argv)
+            return vars(namespace), extras
+        except SystemExit as e:
+            return e.code, stderr.getvalue()
+
+
+ARGV = {
+    build_tree_parser: [
+        [],
+        ["first", "a", "b", "--count", "2"],
+        ["--verbose", "first", "a"],
+        ["--verb", "second", "3", "-xyy"],
+        ["second", "3", "-yx"],
+        ["second", "3", "-xz"],
+        ["second", "-3"],
+        ["second", "abc"],
+        ["third"],
+        ["first"],
+        ["first", "a", "--count"],
+        ["first", "a", "--count=4", "--unknown", "b"],
+        ["--unknown", "first", "a"],
+        ["second", "3", "-x=1"],
+    ],
+    build_exclusive_parser: [
+        ["name", "--json", "--token", "t"],
+        ["name", "--json", "--yaml", "--token", "t"],
+        ["name", "--token", "t"],
+        ["name", "--json"],
+        ["--json", "--tok=t", "name", "--pair", "a", "b"],
+        ["--json", "--token", "t", "name", "--pair", "a"],
+        ["--json", "--token", "t", "name", "--default-type", "x"],
+        ["--json", "--token", "t"],
+        ["--json", "--token", "t", "a", "b"],
+        ["--json", "--token", "t", "--", "--name"],
+    ],
+    lambda engine: build_parser(engine, command): [
+        ["src"],
+        ["src", "1", "2", "3", "-vvv", "--force"],
+        ["src", "1", "--limit", "3", "2", "3"],
+        ["-l3", "src", "-mslow", "--mode=fast", "1"],
+        ["src", "--values", "1.5", "-2", "3", "--label"],
+        ["src", "--label", "x", "-v", "4"],
+        ["src", "--val", "1"],
+        ["src", "--l", "1"],
+        ["src", "-m", "other"],
+        ["src", "--limit", "x"],
+        ["src", "--values"],
+        ["src", "--force=1"],
+        ["src", "-fv3"],
+        ["src", "-1", "a"],
+        ["src", "with space", "-fv"],
+        ["--json", "src", "--json"],
+        [],
+    ],
+}
+
+
+class TestOptionTrie(TestCase):
+    def test_complete(self):
+        trie = OptionTrie(["--verbose", "--version", "--value", "-v"])
+        self.assertEqual(["--value"], trie.complete("--val"))
+        self.assertEqual(2, len(trie.complete("--ver")))
+        self.assertEqual(["--verbose"], trie.complete("--verb"))
+        self.assertEqual([], trie.complete("--other"))
+
+
+class TestTrieEngine(TestCase):
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            TermkitParser(engine="unknown")
+
+    def test_differential(self):
+        for build, invocations in ARGV.items():
+            for argv in invocations:
+                with self.subTest(argv=argv):
+                    self.assertEqual(parse(build("argparse"), argv), parse(build("trie"), argv))
+
+    def test_sub_parsers_share_engine(self):
+        parser = build_tree_parser("trie")
+        self.assertEqual("trie", parser._subparsers._group_actions[0].choices["first"].engine)
+
+    def test_unsupported_version(self):
+        parse_known_args = argparse.ArgumentParser._parse_known_args
+        with mock.patch("termkit.engine.SUPPORTED", False), mock.patch.object(
+            argparse.ArgumentParser, "_parse_known_args", autospec=True, side_effect=parse_known_args
+        ) as fallback:
+            for build, invocations in ARGV.items():
+                for argv in invocations:
+                    with self.subTest(argv=argv):
+                        self.assertEqual(parse(build("argparse"), argv), parse(build("trie"), argv))
+            fallback.assert_called()
+
+    @skipUnless(engine.SUPPORTED, "engine falls back to argparse on this Python version")
+    def test_no_fallback(self):
+        parser = build_tree_parser("trie")
+        argv = ["--verbose", "first", *map(str, range(10_000)), "--count", "2"]
+        with mock.patch.object(argparse.ArgumentParser, "_parse_known_args") as fallback:
+            namespace = parser.parse_args(argv)
+            fallback.assert_not_called()
+        self.assertEqual(10_000, len(namespace.files))
+
+    @skipUnless(engine.SUPPORTED, "engine falls back to argparse on this Python version")
+    def test_fallback(self):
+        parser = build_tree_parser("trie")
+        parse_known_args = argparse.ArgumentParser._parse_known_args
+        with mock.patch.object(
+            argparse.ArgumentParser, "_parse_known_args", autospec=True, side_effect=parse_known_args
+        ) as fallback:
+            namespace = parser.parse_args(["first", "--", "--count"])
+            self.assertEqual(2, fallback.call_count)
+        self.assertEqual(["--count"], namespace.files)
+
+    def test_app_engine(self):
+        app = Termkit("my-app", engine="trie")
+
+        @app.command()
+        def add(values: Annotated[list, Positional(type=int, nargs=Nargs.ONE_OR_MANY)]):
+            print(sum(values))
+
+        runner = TermkitRunner(app)
+        runner.run("add", *map(str, range(1000)))
+        self.assertEqual("499500\n", runner.captured_output)
@@ -0,0 +1,104 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import asyncio
+import collections
+import sys
+import threading
+from typing import Annotated, List
+from unittest import TestCase
+
+from termkit.arguments import Positional
+from termkit.core import Termkit
+from termkit.fanout import MapPlan, configure
+from termkit.output import Output
+from termkit.tests import TermkitRunner
+
+
+class TestFanout(TestCase):
+    def setUp(self):
+        self.app = Termkit("my-app")
+        self.threads = set()
+        self.done = collections.defaultdict(threading.Event)
+        # Created on first access, from the event loop running the command
+        self.fetched = collections.defaultdict(asyncio.Event)
+        # Item each item waits for before completing, so that later items complete first
+        self.following = {}
+
+        @self.app.command(map="hosts")
+        def ping(hosts: Annotated[List[str], Positional(nargs="+")], count: int = 1):
+            self.threads.add(threading.get_ident())
+            try:
+                if hosts in self.following:
+                    self.assertTrue(self.done[self.following[hosts]].wait(5))
+                if hosts.startswith("down"):
+                    print(f"{hosts} unreachable", file=sys.stderr)
+                    sys.exit(2)
+                print(f"{hosts} x{count}")
+                return hosts
+            finally:
+                self.done[hosts].set()
+
+        @self.app.command(map="names")
+        async def fetch(names: Annotated[List[str], Positional(nargs="+")], out: Output):
+            if names in self.following:
+                await asyncio.wait_for(self.fetched[self.following[names]].wait(), 5)
+            out.print(f"fetched {names}")
+            self.fetched[names].set()
+
+        self.runner = TermkitRunner(self.app)
+
+    def test_ordered_output(self):
+        for jobs in ("1", "4"):
+            with self.subTest(jobs=jobs):
+                self.threads.clear()
+                self.done.clear()
+                self.following = {} if jobs == "1" else {"a": "bb", "bb": "ccc"}
+                self.runner.run("--termkit-jobs", jobs, "ping", "a", "bb", "ccc", "--count", "2")
+                self.assertEqual(0, self.runner.exit_code)
+                self.assertEqual("a x2\nbb x2\nccc x2\n", self.runner.captured_output)
+                self.assertEqual(1 if jobs == "1" else 3, len(self.threads))
+
+    def test_continue_on_error(self):
+        self.runner.run("--termkit-jobs", "2", "ping", "a", "down", "ccc", "down2")
+        self.assertEqual(2, self.runner.exit_code)
+        self.assertEqual("a x1\ndown unreachable\nccc x1\ndown2 unreachable\n", self.runner.captured_output)
+
+    def test_fail_fast(self):
+        self.runner.run("--termkit-fail-fast", "ping", "a", "down", "ccc")
+        self.assertEqual(2, self.runner.exit_code)
+        self.assertEqual("a x1\ndown unreachable\n", self.runner.captured_output)
+
+    def test_results(self):
+        plan = self.app._childs[0].plan
+        parser = self.app._build_parser(None)
+        with configure(jobs=3):
+            results = MapPlan(plan, "hosts")(parser.parse_args(["ping", "a", "bb"]))
+        self.assertEqual(["a", "bb"], results)
+
+        with self.assertRaises(ValueError):
+            MapPlan(plan, "unknown")
+
+    def test_invalid_map(self):
+        def ping(hosts: Annotated[List[str], Positional(nargs="+")], count: int = 1, name: str = "a"):
+            pass
+
+        with self.assertRaisesRegex(ValueError, "Cannot map unknown parameter 'unknown' of 'ping'"):
+            self.app.add(ping, "other", map="unknown")
+        for parameter in ("count", "name"):
+            with self.assertRaisesRegex(ValueError, f"Cannot map parameter '{parameter}' of 'ping'"):
+                self.app.command(map=parameter)(ping)
+        self.app.add(ping, "valid", map="hosts")
+
+    def test_async_command(self):
+        self.following = {"a": "bb"}
+        self.runner.run("--termkit-jobs", "3", "fetch", "a", "bb")
+        self.assertEqual(0, self.runner.exit_code)
+        self.assertEqual("fetched a\nfetched bb\n", self.runner.captured_output)
+
+    def test_invalid_jobs(self):
+        self.runner.run("--termkit-jobs", "0", "ping", "a")
+        self.assertEqual(2, self.runner.exit_code)
+        self.assertIn("argument --termkit-jobs: invalid jobs count: '0'", self.runner.captured_output)
@@ -0,0 +1,93 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+# Modules only imported once parsers are built or features are used, never by importing termkit modules
+DEFERRED_MODULES = (
+    "argparse",
+    "inspect",
+    "getpass",
+    "asyncio",
+    "pickle",
+    "sqlite3",
+    "threading",
+    "concurrent.futures",
+    "termkit.parser",
+    "termkit.formatters",
+    "termkit.docstrings",
+    "termkit.conversions",
+    "termkit.engine",
+    "termkit.spec",
+    "termkit.cache",
+    "termkit.fanout",
+    "termkit.scheduler",
+    "termkit.resources",
+    "termkit.profiler",
+    "termkit.server",
+    "termkit.output",
+)
+
+# Coarse upper bound of termkit own modules import time (self time, in microseconds), an order of magnitude above
+# usual measures so slow machines never fail it while eager heavy imports still do
+IMPORT_TIME_BUDGET = 250_000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, *options, "-c", code], capture_output=True, text=True, check=True, env=env, cwd=ROOT
+    )
+
+
+class TestImport(TestCase):
+    def test_lazy_exports(self):
+        code = "\n".join(
+            [
+                "import sys",
+                "import termkit",
+                "assert 'termkit.core' not in sys.modules",
+                "from termkit import Termkit, Option, Flag, Prompt",
+                "app = Termkit('app-name')",
+                "@app.command()",
+                "def func(value=1): ...",
+                "print(','.join(m for m in ('argparse', 'inspect', 'getpass') if m in sys.modules))",
+            ]
+        )
+        self.assertEqual("", run_python(code).stdout.strip())
+
+    def test_unknown_export(self):
+        with self.assertRaises(ImportError):
+            from termkit import Unknown  # noqa: F401
+
+    def test_import_footprint(self):
+        code = "\n".join(
+            [
+                "import sys",
+                "import termkit.core, termkit.arguments, termkit.groups, termkit.prompt, termkit.utils",
+                f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))",
+            ]
+        )
+        self.assertEqual("", run_python(code).stdout.strip())
+
+    def test_import_time(self):
+        code = "import termkit.core, termkit.arguments, termkit.groups, termkit.prompt, termkit.utils"
+        result = run_python(code, "-X", "importtime")
+
+        total, imported = 0, set()
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, self_time, _, name = line.replace("|", ":").split(":")
+            if name.strip().split(".")[0] == "termkit":
+                total += int(self_time)
+            imported.add(name.strip())
+        self.assertEqual(set(), imported.intersection(DEFERRED_MODULES))
+        self.assertLess(total, IMPORT_TIME_BUDGET)
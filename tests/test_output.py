@@ -0,0 +1,87 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import io
+import subprocess
+import sys
+import textwrap
+from unittest import TestCase, mock
+
+from termkit.core import Termkit
+from termkit.output import Output
+from termkit.tests import TermkitRunner
+
+
+class TestOutput(TestCase):
+    def test_buffered_writes(self):
+        stream = io.StringIO()
+        output = Output(buffer_size=12, stream=stream)
+        with mock.patch.object(stream, "write", wraps=stream.write) as write:
+            output.print("abc", 1)
+            output.write("defg")
+            self.assertEqual(0, write.call_count)
+            output.writelines(["hi", "\n"])
+            self.assertEqual(1, write.call_count)
+            output.print("end", end="")
+            output.flush()
+            self.assertEqual(2, write.call_count)
+        self.assertEqual("abc 1\ndefghi\nend", stream.getvalue())
+
+    def test_injected(self):
+        app = Termkit("my-app")
+        outputs = []
+
+        @app.callback()
+        def setup(output: Output):
+            outputs.append(output)
+
+        @app.command()
+        def lines(count: int, out: "Output"):
+            outputs.append(out)
+            for i in range(count):
+                out.print(i)
+
+        runner = TermkitRunner(app)
+        self.assertEqual("0\n1\n2\n", runner.run("lines", "3").captured_output)
+        self.assertEqual("0\n1\n", runner.run("lines", "2").captured_output)
+        self.assertIs(outputs[0], outputs[1])
+        self.assertIs(outputs[2], outputs[3])
+        self.assertIsNot(outputs[0], outputs[2])
+
+        result = runner.run_many([["lines", "3"], ["lines", "2"]])
+        self.assertEqual(["0\n1\n2\n", "0\n1\n"], [r.captured_output for r in result])
+
+    def test_broken_pipe(self):
+        script = textwrap.dedent(
+            """\
+            import sys
+            from termkit import Output, Termkit
+
+            app = Termkit("my-app")
+
+            @app.command()
+            def buffered(out: Output):
+                for i in range(1_000_000):
+                    out.print(i)
+
+            @app.command()
+            def printed():
+                for i in range(1_000_000):
+                    print(i)
+
+            app()
+            """
+        )
+        for command in ("buffered", "printed"):
+            with self.subTest(command=command):
+                process = subprocess.Popen(
+                    [sys.executable, "-c", script, command], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+                )
+                self.assertEqual(b"0\n", process.stdout.readline())
+                process.stdout.close()
+                stderr = process.stderr.read()
+                process.stderr.close()
+                self.assertEqual(141, process.wait())
+                self.assertEqual(b"", stderr)
@@ -4,13 +4,16 @@ SPDX-License-Identifier: MIT
 """
 
 import argparse
+import io
 import textwrap
+import threading
+import time
 from typing import Annotated
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from termkit.arguments import Option, Positional
+from termkit.arguments import Nargs, Option, Positional
 from termkit.core import Termkit
-from termkit.parser import ArgumentHandler
+from termkit.parser import ArgumentHandler, TermkitParser
 from termkit.tests import TermkitRunner
 
 
@@ -162,3 +165,94 @@ class TestArgumentHandler(TestCase):
         )
 
         self.assertEqual(output, runner.captured_output)
+
+    def test_streamed_positional(self):
+        app = Termkit("app-name")
+        converted = []
+
+        def convert(value):
+            converted.append(value)
+            return int(value)
+
+        @app.command()
+        def func(values: Annotated[list, Positional(type=convert, nargs=Nargs.ONE_OR_MANY, stream=True)]):
+            print(len(converted))
+            for value in values:
+                print(value, len(converted))
+
+        runner = TermkitRunner(app)
+        with mock.patch("sys.stdin", io.StringIO("3\n4\n")):
+            runner.run("func", "1", "-", "2")
+        self.assertEqual("0\n1 1\n3 2\n4 3\n2 4\n", runner.captured_output)
+
+        runner.run("func", "1", "x")
+        self.assertEqual(2, runner.exit_code)
+        self.assertIn("app-name func: error: argument values: invalid convert value: 'x'", runner.captured_output)
+
+    def test_streamed_positional_delimiter(self):
+        app = Termkit("app-name")
+
+        @app.command()
+        def func(
+            values: Annotated[
+                list, Positional(nargs=Nargs.ZERO_OR_MANY, choices=["a", "b c"], stream=True, delimiter="\0")
+            ]
+        ):
+            print(list(values))
+
+        runner = TermkitRunner(app)
+        with mock.patch("sys.stdin", io.StringIO("a\0b c\0")):
+            runner.run("func", "-")
+        self.assertEqual("['a', 'b c']\n", runner.captured_output)
+
+        runner.run("func")
+        self.assertEqual("[]\n", runner.captured_output)
+
+        with mock.patch("sys.stdin", io.StringIO("a\0c")):
+            runner.run("func", "-")
+        self.assertIn("argument values: invalid choice: 'c'", runner.captured_output)
+
+        with self.assertRaises(ValueError):
+            Positional(stream=True)
+
+
+class TestTermkitParser(TestCase):
+    def test_help_memoized(self):
+        parser = TermkitParser(prog="my-app")
+        sub_parser = parser.add_subparsers(title="Commands", metavar="COMMAND")
+        sub_parser.add_parser("first", help="First command")
+
+        with mock.patch.object(argparse.HelpFormatter, "format_help", autospec=True, return_value="help") as render:
+            self.assertEqual("help", parser.format_help())
+            self.assertEqual("help", parser.format_help())
+            self.assertEqual(1, render.call_count)
+
+            sub_parser.add_parser("second", help="Second command")
+            parser.format_help()
+            parser.add_argument("--value")
+            parser.format_help()
+            self.assertEqual(3, render.call_count)
+
+        parser.add_argument("--other")
+        self.assertIn("second .... Second command", parser.format_help())
+        parser.set_help("Precomputed help")
+        self.assertEqual("Precomputed help", parser.format_help())
+
+    def test_concurrent_fill(self):
+        def populate(parser):
+            time.sleep(0.05)
+            parser.add_argument("--value")
+
+        parser = TermkitParser(prog="my-app")
+        parser.defer(populate)
+        results = []
+
+        def parse():
+            results.append(parser.parse_args(["--value", "1"]).value)
+
+        threads = [threading.Thread(target=parse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(["1"] * 4, results)
@@ -0,0 +1,114 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import json
+import os
+import pstats
+import tempfile
+import threading
+from unittest import TestCase
+
+from termkit import profiler
+from termkit.core import Termkit
+from termkit.tests import TermkitRunner
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.app = Termkit("my-app")
+
+        @self.app.callback()
+        def setup():
+            pass
+
+        @self.app.command()
+        def hello(name: str):
+            print(f"Hello {name}")
+
+        self.runner = TermkitRunner(self.app)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_json_report(self):
+        path = os.path.join(self.directory.name, "profile.json")
+        self.runner.run("--termkit-profile", path, "hello", "world")
+        self.assertEqual(0, self.runner.exit_code)
+        self.assertEqual("Hello world\n", self.runner.captured_output)
+
+        with open(path) as file:
+            phases = json.load(file)["phases"]
+        names = [phase["name"] for phase in phases if phase["name"] != "startup"]
+        self.assertEqual(["populate", "parse", "callback:setup", "command:hello"], names)
+        for phase in phases:
+            self.assertGreaterEqual(phase["wall"], 0)
+            self.assertGreaterEqual(phase["cpu"], 0)
+        self.assertTrue(all(isinstance(phase["peak"], int) for phase in phases if phase["name"] != "startup"))
+
+    def test_chrome_trace(self):
+        path = os.path.join(self.directory.name, "profile.trace.json")
+        self.runner.run(f"--termkit-profile={path}", "hello", "world")
+
+        with open(path) as file:
+            trace = json.load(file)
+        events = trace["traceEvents"]
+        self.assertIn("command:hello", [event["name"] for event in events])
+        self.assertTrue(all(event["ph"] == "X" and event["dur"] >= 0 for event in events))
+
+    def test_stderr_report(self):
+        self.runner.run("--termkit-profile", "-", "hello", "world")
+        lines = self.runner.captured_output.splitlines()
+        self.assertEqual("Hello world", lines[0])
+        self.assertEqual(["phase", "wall", "ms", "cpu", "ms", "peak", "KiB"], lines[1].split())
+        self.assertIn("command:hello", [line.split()[0] for line in lines[2:]])
+
+    def test_cprofile(self):
+        path = os.path.join(self.directory.name, "hello.prof")
+        self.runner.run("--termkit-profile", "-", "--termkit-cprofile", path, "hello", "world")
+        self.assertEqual(0, self.runner.exit_code)
+        stats = pstats.Stats(path)
+        self.assertIn("hello", [function for _, _, function in stats.stats])
+
+    def test_inactive(self):
+        with profiler.phase("anything"):
+            pass
+        self.assertIsNone(profiler._current.get())
+
+        self.runner.run("hello", "world")
+        self.assertEqual("Hello world\n", self.runner.captured_output)
+
+    def test_concurrent_phases(self):
+        app = Termkit("my-app")
+        barrier = threading.Barrier(2, timeout=5)
+
+        @app.callback(depends_on=[])
+        def first():
+            barrier.wait()
+
+        @app.callback(depends_on=[])
+        def second():
+            barrier.wait()
+
+        @app.command()
+        def hello():
+            pass
+
+        path = os.path.join(self.directory.name, "profile.json")
+        runner = TermkitRunner(app)
+        runner.run("--termkit-profile", path, "hello")
+        self.assertEqual(0, runner.exit_code, runner.captured_output)
+
+        with open(path) as file:
+            peaks = {phase["name"]: phase["peak"] for phase in json.load(file)["phases"]}
+        # Process wide peak cannot be told apart between concurrent phases
+        self.assertIsNone(peaks["callback:first"])
+        self.assertIsNone(peaks["callback:second"])
+        self.assertIsInstance(peaks["command:hello"], int)
+
+    def test_report_error(self):
+        path = os.path.join(self.directory.name, "missing", "profile.json")
+        self.runner.run("--termkit-profile", path, "hello", "world")
+        self.assertEqual(0, self.runner.exit_code)
+        self.assertIn("Hello world\n", self.runner.captured_output)
+        self.assertIn("termkit: warning: cannot write profile report", self.runner.captured_output)
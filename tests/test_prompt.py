@@ -0,0 +1,102 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from termkit.core import Termkit
+from termkit.prompt import AnswersFile, AssumeYes, EnvironmentAnswers, Prompt
+from termkit.tests import TermkitRunner
+
+
+class TestPrompt(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.answers = os.path.join(directory.name, "answers.json")
+        with open(self.answers, "w") as file:
+            json.dump({"Name?": "file name", "token": "secret"}, file)
+
+    def test_providers(self):
+        environ = {"TERMKIT_ANSWER_USER_NAME": "env name"}
+        with mock.patch.dict(os.environ, environ), Prompt.answer_with(AnswersFile(self.answers), EnvironmentAnswers()):
+            self.assertEqual("file name", Prompt.ask("Name?"))
+            self.assertEqual("env name", Prompt.ask("User name?"))
+            self.assertEqual("secret", Prompt.ask_secret("Token?", key="token"))
+            self.assertEqual("default", Prompt.ask("Other?", default="default"))
+            with self.assertRaises(SystemExit) as context:
+                Prompt.ask("Other?")
+            self.assertEqual(1, context.exception.code)
+            with self.assertRaises(SystemExit):
+                Prompt.ask("Continue?", confirm=True)
+
+        with Prompt.answer_with(AssumeYes()):
+            self.assertTrue(Prompt.ask("Continue?", confirm=True))
+
+    def test_interactive(self):
+        with mock.patch("builtins.input", return_value="") as ask:
+            self.assertEqual("default", Prompt.ask("Name?", default="default"))
+            ask.assert_called_once_with("Name? ")
+        # Environment answers are opt-in
+        with mock.patch.dict(os.environ, {"TERMKIT_ANSWER_NAME": "env name"}):
+            with mock.patch("builtins.input", return_value="typed") as ask:
+                self.assertEqual("typed", Prompt.ask("Name?"))
+                ask.assert_called_once()
+            with Prompt.answer_with(EnvironmentAnswers(), interactive=True), mock.patch("builtins.input") as ask:
+                self.assertEqual("env name", Prompt.ask("Name?"))
+                ask.assert_not_called()
+
+    def test_timeout(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, write_fd)
+        with open(read_fd) as stdin, mock.patch("sys.stdin", stdin):
+            self.assertEqual("default", Prompt.ask("Name?", default="default", timeout=0.01))
+            os.write(write_fd, b"typed\n")
+            self.assertEqual("typed", Prompt.ask("Name?", default="default", timeout=1))
+
+            # Lines already buffered by stdin are answers too
+            os.write(write_fd, b"first\nsecond\n")
+            self.assertEqual("first", Prompt.ask("Name?", timeout=1))
+            self.assertEqual("second", Prompt.ask("Name?", default="default", timeout=0.01))
+
+    def test_timeout_without_select(self):
+        with mock.patch("os.name", "nt"), mock.patch("builtins.input", return_value="typed") as ask:
+            self.assertEqual("typed", Prompt.ask("Name?", timeout=0.01))
+            ask.assert_called_once_with("Name? ")
+
+    def test_ask_async(self):
+        async def main():
+            with Prompt.answer_with(AnswersFile(self.answers)):
+                provided = await Prompt.ask_async("Name?")
+            with mock.patch("builtins.input", return_value="typed"):
+                typed = await asyncio.gather(Prompt.ask_async("Other?"), Prompt.ask_async("Token?", secret=True))
+            return provided, typed
+
+        with mock.patch("getpass.getpass", return_value="hidden"):
+            self.assertEqual(("file name", ["typed", "hidden"]), asyncio.run(main()))
+
+    def test_app_options(self):
+        app = Termkit("my-app")
+
+        @app.command()
+        def delete(name):
+            Prompt.ask(f"Delete {name}?", confirm=True)
+            print(Prompt.ask("Name?", default="none"))
+
+        runner = TermkitRunner(app)
+        with mock.patch("builtins.input") as ask:
+            runner.run("--termkit-yes", "delete", "x")
+            self.assertEqual("none\n", runner.captured_output)
+            runner.run("--termkit-yes", "--termkit-answers", self.answers, "delete", "x")
+            self.assertEqual("file name\n", runner.captured_output)
+            runner.run("--termkit-answers", self.answers, "delete", "x")
+            self.assertEqual(1, runner.exit_code)
+            with mock.patch.dict(os.environ, {"TERMKIT_ANSWER_DELETE_X": "y"}):
+                runner.run("--termkit-answers-env", "delete", "x")
+            self.assertEqual("none\n", runner.captured_output)
+            ask.assert_not_called()
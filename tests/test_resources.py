@@ -0,0 +1,168 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import threading
+from typing import Annotated, List
+from unittest import TestCase
+
+from termkit.arguments import Positional
+from termkit.core import Termkit
+from termkit.output import Output
+from termkit.tests import TermkitRunner
+
+
+class Session:
+    def __init__(self, events: list, token: str = "anonymous"):
+        self.events = events
+        self.token = token
+        self.events.append(f"open {token}")
+
+    def close(self):
+        self.events.append(f"close {self.token}")
+
+
+class TestResources(TestCase):
+    def setUp(self):
+        self.events = []
+        self.app = Termkit("my-app")
+        self.runner = TermkitRunner(self.app)
+
+    def test_injection(self):
+        sub_app = Termkit("sub-app")
+
+        @self.app.resource()
+        def token():
+            self.events.append("open token")
+            yield "secret"
+            self.events.append("close token")
+
+        @sub_app.resource()
+        def session(token) -> Session:
+            return Session(self.events, token)
+
+        @self.app.callback()
+        def login(client: Session):
+            self.events.append(f"login {client.token}")
+
+        @sub_app.command()
+        def fetch(path: str, http: Session, out: Output):
+            self.events.append(f"fetch {path}")
+            out.print(http.token)
+
+        self.app.add(sub_app)
+        self.runner.run("sub-app", "fetch", "/users")
+        self.assertEqual(0, self.runner.exit_code, self.runner.captured_output)
+        self.assertEqual("secret\n", self.runner.captured_output)
+        self.assertEqual(
+            ["open token", "open secret", "login secret", "fetch /users", "close secret", "close token"],
+            self.events,
+        )
+
+        # Resources are not arguments
+        self.runner.run("sub-app", "fetch", "--help")
+        self.assertNotIn("http", self.runner.captured_output)
+
+        # Unused resources are never created
+        self.events.clear()
+        self.runner.run("--help")
+        self.assertEqual([], self.events)
+
+    def test_closed_on_failure(self):
+        self.app.add_resource(lambda: Session(self.events), name="session")
+
+        @self.app.command()
+        def run(session):
+            exit(3)
+
+        self.runner.run("run")
+        self.assertEqual(3, self.runner.exit_code)
+        self.assertEqual(["open anonymous", "close anonymous"], self.events)
+
+    def test_keep_warm(self):
+        @self.app.resource(keep_warm=True)
+        def session() -> Session:
+            return Session(self.events)
+
+        @self.app.command()
+        def run(client: Session):
+            self.events.append("run")
+
+        for _ in range(2):
+            self.runner.run("run")
+            self.assertEqual(0, self.runner.exit_code)
+        self.assertEqual(["open anonymous", "run", "run"], self.events)
+
+        self.app.close_resources()
+        self.assertEqual("close anonymous", self.events[-1])
+
+        @self.app.resource()
+        def cold(session):
+            return session
+
+        self.app.add_resource(lambda cold: cold, name="warm", keep_warm=True)
+        with self.assertRaisesRegex(ValueError, "Warm resource 'warm' cannot depend on 'cold'"):
+            self.app._resources.warm(self.app._resources.lookup("warm"))
+
+    def test_shared_by_mapped_calls(self):
+        lock = threading.Lock()
+
+        @self.app.resource()
+        def session() -> Session:
+            with lock:
+                return Session(self.events)
+
+        @self.app.command(map="hosts")
+        def ping(hosts: Annotated[List[str], Positional(nargs="+")], session: Session):
+            print(hosts)
+
+        self.runner.run("--termkit-jobs", "3", "ping", "a", "b", "c")
+        self.assertEqual(0, self.runner.exit_code)
+        self.assertEqual("a\nb\nc\n", self.runner.captured_output)
+        self.assertEqual(["open anonymous", "close anonymous"], self.events)
+
+    def test_invalid_resources(self):
+        self.app.add_resource(lambda: None, name="session")
+        with self.assertRaisesRegex(ValueError, "Resource name 'session' already taken"):
+            self.app.add_resource(lambda: None, name="session")
+
+        self.app.add_resource(lambda: None, name="first", type=Session)
+        with self.assertRaisesRegex(ValueError, "Resource of type 'Session' already declared"):
+            self.app.add_resource(lambda: None, name="second", type=Session)
+
+    def test_circular_dependency(self):
+        for keep_warm in (False, True):
+            with self.subTest(keep_warm=keep_warm):
+                app = Termkit("my-app")
+                app.add_resource(lambda second: second, name="first", keep_warm=keep_warm)
+                app.add_resource(lambda first: first, name="second", keep_warm=keep_warm)
+
+                @app.command()
+                def run(first):
+                    pass
+
+                with self.assertRaisesRegex(ValueError, "Circular dependency of resource 'first'"):
+                    app.run(["run"])
+
+    def test_argument_named_after_resource(self):
+        self.app.add_resource(lambda: Session(self.events), name="session")
+
+        @self.app.command()
+        def run(session: str):
+            pass
+
+        with self.assertRaisesRegex(ValueError, "Parameter 'session' is annotated as an argument"):
+            self.app.run(["--help"])
+
+    def test_postponed_annotation(self):
+        @self.app.resource()
+        def session() -> Session:
+            return Session(self.events)
+
+        @self.app.command()
+        def run(client: "Session"):
+            print(client.token)
+
+        self.runner.run("run")
+        self.assertEqual("anonymous\n", self.runner.captured_output)
@@ -0,0 +1,65 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import sys
+import threading
+import time
+from unittest import TestCase
+
+from termkit.core import Termkit
+from termkit.tests import TermkitRunner
+
+app = Termkit("app-name")
+
+
+@app.command()
+def echo(value, delay: float = 0.0):
+    print(f"{value}-start")
+    time.sleep(delay)
+    print(f"{value}-end", file=sys.stderr)
+
+
+@app.command()
+def fail(code: int):
+    sys.exit(code)
+
+
+class TestTermkitRunner(TestCase):
+    def test_run_result(self):
+        runner = TermkitRunner(app)
+        result = runner.run("echo", "value")
+        self.assertEqual("value-start\nvalue-end\n", result.captured_output)
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(result.captured_output, runner.captured_output)
+
+    def test_concurrent_runs(self):
+        runner = TermkitRunner(app)
+        barrier = threading.Barrier(4)
+        results = {}
+
+        def run(value):
+            barrier.wait()
+            results[value] = runner.invoke(["echo", value, "--delay", "0.05"])
+
+        threads = [threading.Thread(target=run, args=(str(i),)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for value, result in results.items():
+            self.assertEqual(f"{value}-start\n{value}-end\n", result.captured_output)
+
+    def test_run_many(self):
+        runner = TermkitRunner(app)
+        invocations = [["echo", str(i)] for i in range(20)] + [["fail", "3"]]
+        for executor in ("thread", "process"):
+            results = runner.run_many(invocations, executor=executor, max_workers=4)
+            self.assertEqual([f"{i}-start\n{i}-end\n" for i in range(20)], [r.captured_output for r in results[:-1]])
+            self.assertEqual([0] * 20 + [3], [r.exit_code for r in results])
+
+    def test_run_many_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            TermkitRunner(app).run_many([["echo", "1"]], executor="unknown")
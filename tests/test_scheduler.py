@@ -0,0 +1,148 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from termkit.core import Termkit
+from termkit.output import Output
+from termkit.tests import TermkitRunner
+
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, event: str):
+        with self.lock:
+            self.events.append(event)
+
+    def test_concurrent_callbacks(self):
+        app = Termkit("my-app")
+        sub_app = Termkit("sub-app")
+        barrier = threading.Barrier(2, timeout=5)
+
+        @app.callback(depends_on=[])
+        def load_config():
+            # Waits for refresh_credentials, both are running at the same time
+            barrier.wait()
+            self.record("config")
+
+        @app.callback(depends_on=[])
+        def refresh_credentials():
+            barrier.wait()
+            self.record("credentials")
+
+        @sub_app.callback(depends_on=[load_config])
+        async def warm_cache(out: Output):
+            await asyncio.sleep(0)
+            self.assertIn("config", self.events)
+            self.record("cache")
+            out.print("warm")
+
+        @sub_app.callback()
+        def ordered():
+            # Callbacks without dependencies wait for every callback added before them
+            self.assertEqual(["cache", "config", "credentials"], sorted(self.events))
+            self.record("ordered")
+
+        @sub_app.command()
+        def run(out: Output):
+            self.record("command")
+            out.print("run")
+
+        app.add(sub_app)
+        runner = TermkitRunner(app)
+        runner.run("sub-app", "run")
+        self.assertEqual(0, runner.exit_code, runner.captured_output)
+        self.assertEqual("warm\nrun\n", runner.captured_output)
+        self.assertEqual(["ordered", "command"], self.events[3:])
+
+    def test_first_failure(self):
+        app = Termkit("my-app")
+
+        @app.callback(depends_on=[])
+        def slow():
+            time.sleep(0.05)
+            self.record("slow")
+
+        @app.callback(depends_on=[])
+        def failing():
+            print("invalid credentials")
+            exit(3)
+
+        @app.callback(depends_on=[slow])
+        def dependent():
+            self.record("dependent")
+
+        @app.command()
+        def run():
+            self.record("command")
+
+        runner = TermkitRunner(app)
+        runner.run("run")
+        self.assertEqual(3, runner.exit_code)
+        self.assertEqual("invalid credentials\n", runner.captured_output)
+        self.assertNotIn("dependent", self.events)
+        self.assertNotIn("command", self.events)
+
+    def test_invalid_dependencies(self):
+        app = Termkit("my-app")
+
+        @app.callback(depends_on=["second"])
+        def first():
+            pass
+
+        @app.callback(depends_on=["first", "unknown"])
+        def second():
+            pass
+
+        @app.command()
+        def run():
+            pass
+
+        # Dependencies are checked once the parser is built, help included
+        with self.assertRaisesRegex(ValueError, "depends on unknown 'unknown'"):
+            app.run(["--help"])
+        with self.assertRaisesRegex(ValueError, "depends on unknown 'unknown'"):
+            app.run(["run"])
+
+        app._callbacks[1].depends_on = ("first",)
+        with self.assertRaisesRegex(ValueError, "Circular dependency"):
+            app.run(["run"])
+
+    def test_same_name_callbacks(self):
+        app = Termkit("my-app")
+        sub_app = Termkit("sub-app")
+
+        @app.callback(depends_on=[])
+        def setup():
+            self.record("app setup")
+
+        parent_setup = setup
+
+        @sub_app.callback(depends_on=[parent_setup])
+        def setup():  # noqa: F811
+            self.record("sub-app setup")
+
+        @sub_app.command()
+        def run():
+            self.record("command")
+
+        app.add(sub_app)
+        runner = TermkitRunner(app)
+        runner.run("sub-app", "run")
+        self.assertEqual(0, runner.exit_code, runner.captured_output)
+        self.assertEqual(["app setup", "sub-app setup", "command"], self.events)
+
+        # Names matching several callbacks are rejected
+        other_app = Termkit("other-app")
+        other_app.add_callback(setup, depends_on=["setup"])
+        app.add(other_app)
+        with self.assertRaisesRegex(ValueError, "depends on ambiguous 'setup'"):
+            app.run(["sub-app", "run"])
@@ -0,0 +1,111 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import TestCase
+
+from termkit.core import Termkit
+from termkit.server import serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+app = Termkit("my-app")
+
+
+@app.command()
+def greet(name):
+    print(f"Hello {name} from {os.getpid()}")
+
+
+@app.command()
+def env(name):
+    print(os.environ.get(name), os.getcwd())
+
+
+@app.command()
+def fail(code: int):
+    print("failing", file=sys.stderr)
+    sys.exit(code)
+
+
+def run_client(path: str, *args: str, env: dict = None, cwd: str = ROOT) -> subprocess.CompletedProcess:
+    code = f"import sys\nfrom termkit.server import forward\nforward({path!r}, 'tests.test_server:app', sys.argv[1:])"
+    environ = dict(os.environ, PYTHONPATH=ROOT, **(env or {}))
+    return subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True, env=environ, cwd=cwd)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX") and hasattr(os, "fork"), "requires Unix sockets and fork")
+class TestServer(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "app.sock")
+
+    def start_server(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(devnull, 1)
+                os.dup2(devnull, 2)
+                serve(app, self.path)
+            finally:
+                os._exit(0)
+
+        def stop():
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
+        self.addCleanup(stop)
+        for _ in range(500):
+            if os.path.exists(self.path):
+                return pid
+            time.sleep(0.01)
+        self.fail("Server did not start")
+
+    def test_fallback_without_server(self):
+        result = run_client(self.path, "greet", "World")
+        self.assertEqual(0, result.returncode)
+        self.assertTrue(result.stdout.startswith("Hello World from "))
+
+    def test_forward(self):
+        server_pid = self.start_server()
+        result = run_client(self.path, "greet", "World")
+        self.assertEqual(0, result.returncode, result.stderr)
+        self.assertTrue(result.stdout.startswith("Hello World from "))
+        self.assertNotEqual(str(server_pid), result.stdout.split()[-1])
+
+        with tempfile.TemporaryDirectory() as cwd:
+            result = run_client(self.path, "env", "TERMKIT_VALUE", env={"TERMKIT_VALUE": "forwarded"}, cwd=cwd)
+            self.assertEqual(f"forwarded {os.path.realpath(cwd)}\n", result.stdout)
+
+    def test_forward_exit_code(self):
+        self.start_server()
+        result = run_client(self.path, "fail", "3")
+        self.assertEqual(3, result.returncode)
+        self.assertEqual("failing\n", result.stderr)
+
+        result = run_client(self.path, "unknown")
+        self.assertEqual(2, result.returncode)
+        self.assertIn("invalid choice: 'unknown'", result.stderr)
+
+    def test_forward_options(self):
+        self.start_server()
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as batch:
+            batch.write("greet first\ngreet second\n")
+        self.addCleanup(os.unlink, batch.name)
+
+        result = run_client(self.path, "--termkit-batch", batch.name)
+        self.assertEqual(0, result.returncode, result.stderr)
+        lines = [line.rsplit(" from ", 1)[0] for line in result.stdout.splitlines()]
+        self.assertEqual(["Hello first", "Hello second"], lines)
+        self.assertEqual("my-app: line 1: exit 0\nmy-app: line 2: exit 0\n", result.stderr)
@@ -0,0 +1,189 @@
+"""
+Copyright 2023, Thomas Mahé <contact@tmahe.dev>
+SPDX-License-Identifier: MIT
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import textwrap
+from typing import Annotated
+from unittest import TestCase, mock
+
+from termkit import spec
+from termkit.arguments import Flag, Option
+from termkit.core import Termkit, _Command
+from termkit.groups import ArgumentGroup, MutuallyExclusiveGroup
+from termkit.tests import TermkitRunner
+
+
+def build_app(directory: str, lazy: bool = False) -> Termkit:
+    app = Termkit("my-app", parser_cache=directory, lazy=lazy)
+    sub_app = Termkit("sub-app", description="Sub application")
+    app.add(sub_app)
+    group = ArgumentGroup("Output")
+    exclusive = MutuallyExclusiveGroup(parent=group)
+
+    @app.callback()
+    def verbose(verbose: Annotated[bool, Flag("--verbose", group=group)] = False):
+        if verbose:
+            print("verbose")
+
+    @sub_app.command()
+    def func(
+        name,
+        count: Annotated[int, Option("-c", "--count", group=group)] = 1,
+        json: Annotated[bool, Flag("--json", group=exclusive)] = False,
+        yaml: Annotated[bool, Flag("--yaml", group=exclusive)] = False,
+    ):
+        """
+        Print name
+
+        :param count: Number of prints
+        """
+        for _ in range(count):
+            print(name, json, yaml)
+
+    @app.command()
+    def other(value=2):
+        """Other command"""
+        print(value)
+
+    return app
+
+
+class TestParserCache(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    add_parser = staticmethod(argparse._SubParsersAction.add_parser)
+
+    def assert_same_output(self, *args):
+        cold = TermkitRunner(build_app(self.directory))
+        cold.run(*args)
+        for lazy in (False, True):
+            warm = TermkitRunner(build_app(self.directory, lazy=lazy))
+            with mock.patch.object(_Command, "_populate") as populate:
+                warm.run(*args)
+                populate.assert_not_called()
+            self.assertEqual(cold.captured_output, warm.captured_output)
+            self.assertEqual(cold.exit_code, warm.exit_code)
+        return cold.captured_output
+
+    def test_cache_file(self):
+        TermkitRunner(build_app(self.directory)).run("--help")
+        self.assertEqual(["my-app.spec"], os.listdir(self.directory))
+
+    def test_warm_help(self):
+        output = self.assert_same_output("sub-app", "func", "--help")
+        expected = textwrap.dedent("""\
+        usage: my-app sub-app func [-h] [-c COUNT] [--json | --yaml] name
+
+        Print name
+
+        Positionals:
+          name
+
+        Output:
+          -c, --count COUNT  Number of prints
+          --json
+          --yaml
+
+        Options:
+          -h, --help         Show this help message and exit
+        """)
+        self.assertEqual(expected, output)
+        self.assert_same_output("--help")
+        self.assert_same_output("sub-app", "--help")
+
+    def test_warm_help_without_child_parsers(self):
+        TermkitRunner(build_app(self.directory)).run("sub-app", "--help")
+        expected = TermkitRunner(build_app(self.directory)).run("sub-app", "--help").captured_output
+        runner = TermkitRunner(build_app(self.directory, lazy=True))
+        with mock.patch("argparse._SubParsersAction.add_parser", autospec=True) as add_parser:
+            add_parser.side_effect = self.add_parser
+            runner.run("sub-app", "--help")
+            self.assertEqual(["sub-app"], [c.args[1] for c in add_parser.call_args_list])
+        self.assertEqual(expected, runner.captured_output)
+        self.assertIn("func .... Print name", expected)
+
+    def test_warm_dispatch(self):
+        output = self.assert_same_output("sub-app", "--verbose", "func", "Hello", "--yaml")
+        self.assertEqual("verbose\nHello False True\n", output)
+        output = self.assert_same_output("sub-app", "func", "Hello", "--yaml", "--json")
+        self.assertIn("argument --json: not allowed with argument --yaml", output)
+        self.assertEqual("3\n", self.assert_same_output("other", "--value", "3"))
+
+    def test_invalidation(self):
+        TermkitRunner(build_app(self.directory)).run("--help")
+        app = build_app(self.directory)
+
+        @app.command()
+        def new_command():
+            ...
+
+        runner = TermkitRunner(app)
+        with mock.patch.object(_Command, "_populate", autospec=True, side_effect=_Command._populate) as populate:
+            runner.run("--help")
+            populate.assert_called()
+        self.assertIn("new_command", runner.captured_output)
+
+    def assert_populated(self, app: Termkit, populated: bool = True):
+        with mock.patch.object(_Command, "_populate", autospec=True, side_effect=_Command._populate) as populate:
+            TermkitRunner(app).run("--help")
+            self.assertEqual(populated, populate.called)
+
+    def test_compact_spec(self):
+        app = build_app(self.directory)
+        parser = app._new_parser()
+        app._populate(parser)
+        _, _, _, attributes, _ = spec.dump_parser(parser)["actions"][-1]
+        # Attributes left to argparse defaults are not dumped
+        self.assertNotIn("required", attributes)
+        self.assertNotIn("choices", attributes)
+
+    def test_type_module_invalidation(self):
+        with open(os.path.join(self.directory, "termkit_spec_types.py"), "w") as module:
+            module.write("def upper(value):\n    return value.upper()\n")
+        sys.path.insert(0, self.directory)
+        self.addCleanup(sys.path.remove, self.directory)
+        self.addCleanup(sys.modules.pop, "termkit_spec_types", None)
+        import termkit_spec_types
+
+        def build() -> Termkit:
+            app = Termkit("my-app", parser_cache=os.path.join(self.directory, "cache"))
+
+            @app.command()
+            def shout(name: Annotated[str, Option("--name", type=termkit_spec_types.upper)] = "a"):
+                print(name)
+
+            return app
+
+        self.assert_populated(build())
+        self.assert_populated(build(), populated=False)
+        runner = TermkitRunner(build()).run("shout", "--name", "hello")
+        self.assertEqual("HELLO\n", runner.captured_output)
+
+        stat = os.stat(termkit_spec_types.__file__)
+        os.utime(termkit_spec_types.__file__, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assert_populated(build())
+
+    def test_untrusted_spec(self):
+        self.assert_populated(build_app(self.directory))
+        self.assert_populated(build_app(self.directory), populated=False)
+
+        path = os.path.join(self.directory, "my-app.spec")
+        if hasattr(os, "geteuid"):
+            os.chmod(path, 0o666)
+            self.assert_populated(build_app(self.directory))
+
+        # Globals of modules not recorded along with the spec are refused
+        with open(path, "wb") as file:
+            pickle.dump((spec.fingerprint([], ["argparse"]), ["argparse"]), file)
+            pickle.dump({"groups": os.system}, file)
+        self.assertIsNone(spec.read(path, [], [], {}))
+        self.assert_populated(build_app(self.directory))